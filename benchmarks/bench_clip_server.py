@@ -0,0 +1,149 @@
+"""
+Load test for the clip server: many concurrent clip fetches, some of them byte ranges
+and some revalidations with If-None-Match, and report throughput and latency.
+
+Usage:
+    python benchmarks/bench_clip_server.py [--concurrency 1000] [--requests 20000]
+                                           [--range-fraction 0.2] [--revalidate-fraction 0.2]
+                                           [--workers 1] [--url http://127.0.0.1:8080]
+
+Without --url, a server is started on a free local port with `python -m utils.clip_server`
+and stopped afterwards. The client runs in this process, so on a single core it competes
+with the server for CPU; point --url at a server on another machine for clean numbers.
+Needs aiohttp: pip install -r requirements-server.txt
+"""
+import argparse
+import asyncio
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+import aiohttp
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(session, url: str, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with session.get(f"{url}/healthz") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"The clip server at {url} did not come up")
+        await asyncio.sleep(0.25)
+
+
+async def clip_urls(session, url: str) -> list:
+    """URLs of every clip the server lists."""
+    async with session.get(f"{url}/syllables") as response:
+        syllables = [s["syllable"] for s in (await response.json())["syllables"]]
+    urls = []
+    for syllable in syllables:
+        async with session.get(f"{url}/syllables/{syllable}") as response:
+            urls += [url + clip["url"] for clip in (await response.json())["clips"]]
+    return urls
+
+
+async def run_load(url: str, n_requests: int, concurrency: int, range_fraction: float,
+                   revalidate_fraction: float) -> dict:
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_until_up(session, url)
+        urls = await clip_urls(session, url)
+        etags = {}
+        for clip in urls[:200]:
+            async with session.head(clip) as response:
+                etags[clip] = response.headers.get("ETag")
+
+        rng = random.Random(0)
+        jobs = []
+        for _ in range(n_requests):
+            clip = rng.choice(urls)
+            draw = rng.random()
+            if draw < range_fraction:
+                start = rng.randrange(0, 4096)
+                jobs.append((clip, {"Range": f"bytes={start}-{start + 8191}"}))
+            elif draw < range_fraction + revalidate_fraction and etags:
+                clip = rng.choice(list(etags))
+                jobs.append((clip, {"If-None-Match": etags[clip]}))
+            else:
+                jobs.append((clip, {}))
+
+        latencies = np.empty(n_requests)
+        statuses = Counter()
+        received = 0
+        queue = iter(enumerate(jobs))
+
+        async def worker():
+            nonlocal received
+            for i, (clip, headers) in queue:
+                start = time.perf_counter()
+                async with session.get(clip, headers=headers) as response:
+                    received += len(await response.read())
+                    statuses[response.status] += 1
+                latencies[i] = time.perf_counter() - start
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "requests": n_requests,
+        "seconds": elapsed,
+        "latencies": latencies,
+        "statuses": dict(sorted(statuses.items())),
+        "bytes": received,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--range-fraction", type=float, default=0.2)
+    parser.add_argument("--revalidate-fraction", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "utils.clip_server", "--port", str(port), "--workers", str(args.workers)],
+            cwd=Path(__file__).parent.parent, stdout=subprocess.DEVNULL,
+        )
+    try:
+        result = asyncio.run(run_load(url, args.requests, args.concurrency,
+                                      args.range_fraction, args.revalidate_fraction))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies_ms = result["latencies"] * 1e3
+    print(f"{result['requests']} requests, {args.concurrency} concurrent, in {result['seconds']:.2f} s")
+    print(f"  throughput: {result['requests'] / result['seconds']:8.0f} req/s, "
+          f"{result['bytes'] / result['seconds'] / 1e6:.1f} MB/s")
+    print("  latency ms: " + ", ".join(
+        f"p{q} {np.percentile(latencies_ms, q):.1f}" for q in (50, 95, 99)
+    ) + f", max {latencies_ms.max():.1f}")
+    print(f"  statuses: {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
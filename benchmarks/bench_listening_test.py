@@ -0,0 +1,37 @@
+"""
+Time listening-test generation on the sample dataset.
+
+Usage:
+    python benchmarks/bench_listening_test.py [--questions 50] [--repeat 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.main_functions import load_dataset
+from utils.listening_test import DistractorIndex, ListeningTest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    dataset = load_dataset()
+    start = time.perf_counter()
+    engine = ListeningTest(dataset, DistractorIndex(dataset))
+    print(f"distractor index: {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+    for level in [None, "easy", "very_hard"]:
+        best = float("inf")
+        for seed in range(args.repeat):
+            start = time.perf_counter()
+            engine.generate(args.questions, level=level, seed=seed)
+            best = min(best, time.perf_counter() - start)
+        print(f"{args.questions} questions, level={level}: {best * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
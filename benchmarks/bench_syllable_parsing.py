@@ -0,0 +1,70 @@
+"""
+Compare the row-wise syllable parsing in preprocess() with the batch parse_syllables().
+
+Usage:
+    python benchmarks/bench_syllable_parsing.py [--sizes 2000,100000,1000000] [--max-rowwise 100000]
+
+The row-wise path builds a pd.Series per row and is very slow at 1M rows, so by default
+it is only timed up to --max-rowwise rows.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+import pandas as pd
+from utils.reference_lists import consonants_ref, vowels_ref, tone_marks
+from utils.helping_functions import ascii_to_pinyin_full, split_pinyin_syllable, parse_syllables, PinyinConverter
+from benchmarks.synthetic import synthetic_syllables
+
+
+def rowwise_parse(syllables: pd.Series) -> pd.DataFrame:
+    """The pre-batch preprocess() path: one pd.Series per row, twice."""
+    df = pd.DataFrame({"syllable": syllables})
+    df[["initial_consonant", "final_vowel", "tone"]] = df["syllable"].apply(
+        lambda s: pd.Series(split_pinyin_syllable(s, consonants_ref))
+    )
+    df["pinyin"] = df["syllable"].apply(
+        lambda s: pd.Series(ascii_to_pinyin_full(s, tone_marks, vowels_ref))
+    )
+    return df
+
+
+# preprocess() shares one converter across datasets, so its tables are built outside the timing
+converter = PinyinConverter(consonants_ref, vowels_ref, tone_marks)
+
+
+def batch_parse(syllables: pd.Series) -> pd.DataFrame:
+    """The batch path used by preprocess()."""
+    return parse_syllables(syllables, consonants_ref, vowels_ref, tone_marks, converter)
+
+
+def time_call(func, *args, repeat: int = 3) -> float:
+    """Best wall-clock time of func(*args) over repeat runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000,100000,1000000")
+    parser.add_argument("--max-rowwise", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'row-wise (s)':>14} {'batch (s)':>12} {'speedup':>9}")
+    for n_rows in [int(n) for n in args.sizes.split(",")]:
+        syllables = synthetic_syllables(n_rows)
+        batch = time_call(batch_parse, syllables)
+        if n_rows <= args.max_rowwise:
+            rowwise = time_call(rowwise_parse, syllables, repeat=1)
+            print(f"{n_rows:>10} {rowwise:>14.3f} {batch:>12.4f} {rowwise / batch:>8.0f}x")
+        else:
+            print(f"{n_rows:>10} {'skipped':>14} {batch:>12.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
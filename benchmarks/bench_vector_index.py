@@ -0,0 +1,52 @@
+"""
+Time nearest-neighbour queries of the exact and IVF indexes on synthetic embeddings,
+and report the IVF recall against exact search.
+
+Usage:
+    python benchmarks/bench_vector_index.py [--sizes 2000,100000] [--queries 200] [--k 10]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+from benchmarks.synthetic import synthetic_embeddings
+from utils.vector_index import BruteForceIndex, IVFIndex
+
+
+def per_query_ms(index, queries, k, **options) -> float:
+    """Mean latency of single-vector queries, in milliseconds."""
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k, **options)
+    return (time.perf_counter() - start) / len(queries) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000,100000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    for n_rows in [int(n) for n in args.sizes.split(",")]:
+        vectors = synthetic_embeddings(n_rows)
+        queries = vectors[np.random.default_rng(1).choice(n_rows, args.queries, replace=False)]
+        exact = BruteForceIndex(vectors)
+        start = time.perf_counter()
+        ivf = IVFIndex(vectors)
+        build_s = time.perf_counter() - start
+
+        truth, _ = exact.search(queries, args.k)
+        print(f"{n_rows} vectors: exact {per_query_ms(exact, queries, args.k):.3f} ms/query, "
+              f"IVF build {build_s:.2f} s ({ivf.n_lists} lists)")
+        for n_probe in [4, 8, 16]:
+            found, _ = ivf.search(queries, args.k, n_probe=n_probe)
+            recall = np.mean([len(np.intersect1d(a, b)) / args.k for a, b in zip(truth, found)])
+            print(f"  IVF n_probe={n_probe}: {per_query_ms(ivf, queries, args.k, n_probe=n_probe):.3f} ms/query, "
+                  f"recall@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
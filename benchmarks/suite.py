@@ -0,0 +1,229 @@
+"""
+Offline benchmark suite for the dataset and playback hot paths, with a regression gate.
+
+Usage:
+    python benchmarks/suite.py [--sizes 2000,100000,1000000] [--repeat 5] [--only preprocess,grid]
+                               [--output benchmarks/results/latest.json]
+                               [--baseline benchmarks/results/baseline.json] [--threshold 0.25]
+
+Every case runs on synthetic corpora generated from reference_lists; audio is served
+from placeholder files, so no dataset, network or browser is needed. Each case is
+timed best-of-repeat and the results are written as JSON:
+    {"meta": {...}, "results": {"preprocess[2000]": {"seconds": 0.012, "repeat": 5}, ...}}
+With --baseline, a case slower than its baseline time by more than --threshold (and by
+more than --min-delta seconds, to ignore noise on tiny cases) is reported as a
+regression and the script exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Time the audio_cache path, not an audio pack that happens to be built locally
+_placeholder_dir = Path(tempfile.mkdtemp(prefix="pindrill-bench-"))
+os.environ["PINDRILL_AUDIO_PACK"] = str(_placeholder_dir / "none.pack")
+
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+import pandas as pd
+from utils.reference_lists import consonants_ref, vowels_ref, tone_marks
+from utils.helping_functions import ascii_to_pinyin_full, split_pinyin_syllable, generate_syllable_grid
+from utils.main_functions import AudioFileDataset, audio_cache, play_a_syllable, play_multiple_speakers
+from utils.bootstrap import level_grid_definitions
+from utils.confusion_analytics import count_confusions, synthetic_attempts
+from benchmarks.synthetic import synthetic_label_frame, synthetic_syllables
+
+# Syllables looked up and rows played per run of the playback cases
+lookups_per_run = 20
+plays_per_run = 200
+
+
+class StubStreamlit:
+    """Stands in for the streamlit module: counts calls and the bytes handed to st.audio."""
+
+    def __init__(self):
+        self.calls = 0
+        self.audio_bytes = 0
+
+    def write(self, *args, **kwargs):
+        self.calls += 1
+
+    def audio(self, data, **kwargs):
+        self.calls += 1
+        self.audio_bytes += len(data)
+
+
+def placeholder_dataset(n_rows: int) -> AudioFileDataset:
+    """Preprocessed synthetic dataset whose clips are placeholder files (hard links where possible)."""
+    frame = synthetic_label_frame(n_rows)
+    audio_dir = _placeholder_dir / f"audio-{n_rows}"
+    audio_dir.mkdir(exist_ok=True)
+    template = audio_dir / "template.mp3"
+    template.write_bytes(os.urandom(20_000))  # about the size of a TrAT clip
+    for name in frame["Name"].unique():
+        target = audio_dir / name
+        if not target.exists():
+            try:
+                os.link(template, target)
+            except OSError:
+                shutil.copyfile(template, target)
+    dataset = AudioFileDataset(None, df=frame.assign(audio_dir=str(audio_dir)))
+    dataset.preprocess()
+    return dataset
+
+
+# Each case maps a size to (prepare, run): prepare() is untimed and its result is passed to run()
+def case_preprocess(n_rows):
+    frame = synthetic_label_frame(n_rows)
+    return (lambda: AudioFileDataset(None, df=frame.copy()),
+            lambda dataset: dataset.preprocess())
+
+
+def case_split_pinyin_syllable(n_rows):
+    syllables = synthetic_syllables(n_rows).tolist()
+    return (lambda: None,
+            lambda _: [split_pinyin_syllable(s, consonants_ref) for s in syllables])
+
+
+def case_ascii_to_pinyin_full(n_rows):
+    syllables = synthetic_syllables(n_rows).tolist()
+    return (lambda: None,
+            lambda _: [ascii_to_pinyin_full(s, tone_marks, vowels_ref) for s in syllables])
+
+
+def case_syllable_lookup(n_rows):
+    dataset = placeholder_dataset(n_rows)
+    chosen = random.Random(0).sample(dataset.syllables(), lookups_per_run)
+    stub = StubStreamlit()
+
+    def run(_):
+        for syllable in chosen:
+            play_multiple_speakers(dataset.df, syll=syllable, st=stub, index=dataset.index)
+    run(None)  # time lookups with the clips already cached
+    return lambda: None, run
+
+
+def case_clip_bytes(n_rows, cold: bool):
+    dataset = placeholder_dataset(n_rows)
+    labels = random.Random(0).sample(list(dataset.df.index), min(plays_per_run, len(dataset.df)))
+    stub = StubStreamlit()
+
+    def prepare():
+        if cold:
+            audio_cache.clear()
+
+    def run(_):
+        for label in labels:
+            play_a_syllable(dataset.df, n=label, st=stub)
+    run(None)
+    return prepare, run
+
+
+def case_confusion_matrices(n_rows):
+    played, picked = synthetic_attempts(n_rows)
+    return lambda: None, lambda _: count_confusions(played, picked)
+
+
+def case_syllable_grid(level):
+    consonants, vowels = level_grid_definitions()[level]
+    return lambda: None, lambda _: generate_syllable_grid(consonants, vowels)
+
+
+def suite(sizes):
+    """(name, case factory) of every benchmark for the given corpus sizes."""
+    cases = []
+    for n_rows in sizes:
+        cases += [
+            (f"preprocess[{n_rows}]", lambda n=n_rows: case_preprocess(n)),
+            (f"split_pinyin_syllable[{n_rows}]", lambda n=n_rows: case_split_pinyin_syllable(n)),
+            (f"ascii_to_pinyin_full[{n_rows}]", lambda n=n_rows: case_ascii_to_pinyin_full(n)),
+            (f"syllable_lookup[{n_rows}]", lambda n=n_rows: case_syllable_lookup(n)),
+            (f"clip_bytes_cold[{n_rows}]", lambda n=n_rows: case_clip_bytes(n, cold=True)),
+            (f"clip_bytes_warm[{n_rows}]", lambda n=n_rows: case_clip_bytes(n, cold=False)),
+            (f"confusion_matrices[{n_rows}]", lambda n=n_rows: case_confusion_matrices(n)),
+        ]
+    cases += [(f"syllable_grid[{level}]", lambda l=level: case_syllable_grid(l)) for level in level_grid_definitions()]
+    return cases
+
+
+def time_case(prepare, run, repeat: int) -> float:
+    """Best wall-clock time of run(prepare()) over repeat runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        state = prepare()
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list:
+    """Names of the cases that regressed against baseline, printing a comparison table."""
+    regressions = []
+    print(f"\n{'case':<34} {'baseline (s)':>13} {'now (s)':>11} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]["seconds"], result["seconds"]
+        change = now / before - 1.0 if before > 0 else 0.0
+        regressed = change > threshold and now - before > min_delta
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<34} {before:>13.5f} {now:>11.5f} {change:>+7.0%}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="comma-separated case name prefixes to run")
+    parser.add_argument("--output", default=str(Path(__file__).parent / "results" / "latest.json"))
+    parser.add_argument("--baseline", default=None, help="results JSON of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--min-delta", type=float, default=0.0005, help="ignore slowdowns below this many seconds")
+    args = parser.parse_args()
+
+    prefixes = [p for p in args.only.split(",") if p]
+    results = {}
+    try:
+        for name, factory in suite([int(n) for n in args.sizes.split(",")]):
+            if prefixes and not any(name.startswith(p) for p in prefixes):
+                continue
+            prepare, run = factory()
+            seconds = time_case(prepare, run, args.repeat)
+            results[name] = {"seconds": seconds, "repeat": args.repeat}
+            print(f"{name:<34} {seconds:>11.5f} s", flush=True)
+    finally:
+        shutil.rmtree(_placeholder_dir, ignore_errors=True)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+    output.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
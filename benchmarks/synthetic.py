@@ -0,0 +1,52 @@
+"""
+Synthetic label corpora for benchmarks, generated from the reference lists.
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+import pandas as pd
+from utils.reference_lists import consonants_ref, vowels_ref
+
+speakers = ["FV1", "FV2", "FV3", "MV1", "MV2", "MV3"]
+tones = ["1", "2", "3", "4"]
+
+
+def synthetic_syllables(n_rows: int, seed: int = 0) -> pd.Series:
+    """Draw n_rows ASCII syllables (initial + final + tone) from the reference lists."""
+    rng = np.random.default_rng(seed)
+    initials = np.array([""] + list(consonants_ref), dtype=object)
+    finals = np.array(vowels_ref, dtype=object)
+    tone_arr = np.array(tones, dtype=object)
+    syllables = (
+        initials[rng.integers(len(initials), size=n_rows)]
+        + finals[rng.integers(len(finals), size=n_rows)]
+        + tone_arr[rng.integers(len(tone_arr), size=n_rows)]
+    )
+    return pd.Series(syllables, name="syllable")
+
+
+def synthetic_label_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a label frame shaped like TrATLabelFile.csv (Name, class, fold), plus a corpus
+    column: the n-th repeat of a Name goes to corpus "synthetic<n>", so clip keys are unique.
+    """
+    rng = np.random.default_rng(seed)
+    syllables = synthetic_syllables(n_rows, seed).to_numpy()
+    speaker_arr = np.array(speakers, dtype=object)[rng.integers(len(speakers), size=n_rows)]
+    names = pd.Series(syllables + "_" + speaker_arr + "_MP3.mp3")
+    return pd.DataFrame({
+        "Name": names,
+        "class": rng.integers(0, 2, size=n_rows),
+        "fold": rng.integers(1, 5, size=n_rows),
+        "corpus": "synthetic" + names.groupby(names).cumcount().astype(str),
+    })
+
+
+def synthetic_embeddings(n_rows: int, dims: int = 28, n_clusters: int = 1280, seed: int = 0) -> np.ndarray:
+    """Unit-length float32 vectors scattered around n_clusters centres, like clips around syllables."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_clusters, dims))
+    vectors = centres[rng.integers(n_clusters, size=n_rows)] + 0.5 * rng.normal(size=(n_rows, dims))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
@@ -1,19 +1,34 @@
 """Streamlit App for Playing Mandarin Syllables"""
 
+import random
 import sys
+import time
+import uuid
 from pathlib import Path
+from typing import TYPE_CHECKING
 sys.path.append(str(Path(__file__).parent.parent))
 import streamlit as st
 from streamlit_option_menu import option_menu
-from utils.main_functions import AudioFileDataset, play_a_syllable, play_multiple_speakers
-from utils.reference_lists import easy_consonants, medium_consonants, hard_consonants, very_hard_consonants, easy_vowels, medium_vowels, hard_vowels, very_hard_vowels
-from utils.helping_functions import generate_syllable_grid
+from utils.bootstrap import get_app_state
+from utils.configs import embeddings_filename, show_render_timings, default_audio_variant
+from utils.instrumentation import RunTimer, metrics, start_metrics_server
+# The playback, listening test, scheduler, speaking, embedding and transcoding modules are
+# imported by the functions that use them (see python -m utils.bootstrap for the breakdown)
+if TYPE_CHECKING:  # names in the return annotations only
+	from utils.listening_test import ListeningTest
+	from utils.scheduler import Scheduler
+	from utils.speaking import ReferenceContours
+	from utils.embeddings import ClipSimilarity
 
-# Load and augment dataset
-# TODO: Move hardcoded paths and filenames to configs.py
-dataset_filename = Path(__file__).parent.parent / "data" / "sample" / "TrATLabelFile.csv"
-dataset = AudioFileDataset(dataset_filename)
-dataset.preprocess()
+# Time the sections of this script run; with PINDRILL_METRICS=1 they are also exported on localhost
+timer = RunTimer()
+start_metrics_server()
+
+# Dataset, level lookups and grids; built once per process and shared by every session.
+# With several corpora configured, the dataset is merged from their fold shards.
+with timer.section("dataset"):
+	state = get_app_state()
+	dataset = state.dataset
 
 # Helping variables
 row_number_help = (
@@ -25,6 +40,370 @@ syllable_choice_help = (
 	"Pick a syllable from the dropdown to play it uttered by six speakers."
 )
 
+tab_labels = ["Easy", "Medium", "Hard", "Very Hard", "Shuffle"]
+tab_icons = ["1-circle", "2-circle", "3-circle", "4-circle", "shuffle"]
+# Dataset level behind each tab; Shuffle draws from all levels
+tab_levels = {"Easy": "easy", "Medium": "medium", "Hard": "hard", "Very Hard": "very_hard", "Shuffle": None}
+
+
+def learner_id() -> str:
+	"""Name entered in the sidebar, or an anonymous id for this session."""
+	if "anonymous_id" not in st.session_state:
+		st.session_state["anonymous_id"] = f"guest-{uuid.uuid4().hex[:8]}"
+	return st.session_state.get("learner_name") or st.session_state["anonymous_id"]
+
+
+@st.cache_resource
+def get_clip_similarity(_dataset, dataset_id: int) -> "ClipSimilarity":
+	"""Acoustic similarity search over the clips, or None if the embeddings have not been built."""
+	from utils.embeddings import ClipSimilarity, load_embeddings
+	embeddings = load_embeddings(embeddings_filename, _dataset.keys.tolist())
+	return ClipSimilarity(_dataset, embeddings) if embeddings is not None else None
+
+
+@st.cache_resource
+def get_listening_test(_dataset, dataset_id: int) -> "ListeningTest":
+	"""Listening test engine with its distractor index, built once per dataset."""
+	from utils.listening_test import DistractorIndex, ListeningTest
+	return ListeningTest(_dataset, DistractorIndex(_dataset, get_clip_similarity(_dataset, dataset_id)))
+
+
+@st.cache_resource
+def get_reference_contours(_dataset, dataset_id: int) -> "ReferenceContours":
+	"""Reference pitch contours per syllable, or None if the contour store has not been built."""
+	from utils.main_functions import get_contour_store
+	from utils.speaking import ReferenceContours
+	store = get_contour_store()
+	return ReferenceContours(_dataset, store) if store is not None else None
+
+
+def review_queue(level: str = None) -> str:
+	"""Name under which a level's review states are saved in the progress store."""
+	return level or "shuffle"
+
+
+def get_scheduler(tab_label: str, level: str = None) -> "Scheduler":
+	"""
+	This learner's spaced-repetition queue over the syllables of a level, restored from
+	the progress store; syllables without a saved state are new and due now.
+	"""
+	key = f"scheduler_{learner_id()}_{tab_label}"
+	if key not in st.session_state:
+		from utils.main_functions import get_progress_store
+		from utils.scheduler import Scheduler
+		options = state.syllable_options[level]
+		members = set(options)
+		saved = get_progress_store().review_states(learner_id(), review_queue(level))
+		scheduler = Scheduler.from_records([record for record in saved if record[0] in members])
+		scheduler.add(options)
+		st.session_state[key] = scheduler
+	return st.session_state[key]
+
+
+# Self-assessment buttons and the SM-2 quality they record
+review_grades = {"Again": 1, "Hard": 3, "Good": 4, "Easy": 5}
+
+
+def render_practice_drill(tab_label: str, level: str = None) -> None:
+	"""Drill the syllables of a level in the order chosen by the spaced-repetition scheduler."""
+	from utils.main_functions import get_progress_store, play_a_syllable, plot_tone_contour, show_tips
+	scheduler = get_scheduler(tab_label, level)
+	key = f"drill_{tab_label}"
+	drill = st.session_state.setdefault(key, {"item": None, "row": None, "revealed": False})
+	if drill["item"] is None:
+		item = scheduler.next_item()
+		if item is None:
+			wait = max(0, scheduler.next_due_at() - time.time())
+			st.success(f"All caught up! The next syllable is due in {wait / 60:.0f} minutes.")
+			return
+		# Any of the speakers may utter the drilled syllable
+		drill["item"] = item
+		drill["row"] = int(random.choice(dataset.index.rows(syllable=item)))
+
+	st.write(f"Syllables due now: {scheduler.due_count()} of {len(scheduler)}")
+	indx_number = dataset.df.index[drill["row"]]
+	play_a_syllable(dataset.df, n=indx_number, show_character=False, st=st)
+	if not drill["revealed"]:
+		if st.button("Show answer", key=f"{key}_reveal"):
+			drill["revealed"] = True
+			st.rerun()
+		return
+
+	st.write(f"You heard: **{dataset.df.loc[indx_number, 'pinyin']}**")
+	plot_tone_contour(dataset.df, indx_number, st)
+	show_tips(dataset.df, indx_number, st)
+	st.write("How well did you recognise it?")
+	for column, (label, quality) in zip(st.columns(len(review_grades)), review_grades.items()):
+		if column.button(label, key=f"{key}_{label}"):
+			review = scheduler.review(drill["item"], quality)
+			get_progress_store().save_review_states(
+				learner_id(), review_queue(level), [(drill["item"],) + tuple(review)]
+			)
+			st.session_state[key] = {"item": None, "row": None, "revealed": False}
+			st.rerun()
+
+
+def render_listening_test(tab_label: str, level: str = None) -> None:
+	"""Run a multiple-choice listening test over the clips of a level (all levels if None)."""
+	from utils.main_functions import get_progress_store, play_a_syllable, show_tips
+	engine = get_listening_test(dataset, id(dataset))
+	key = f"listening_test_{tab_label}"
+	n_questions = st.number_input("Number of questions:", min_value=5, max_value=50, value=10, step=5, key=f"{key}_n")
+	if st.button("Start a new test", key=f"{key}_start"):
+		st.session_state[key] = {
+			"questions": engine.generate(int(n_questions), level=level),
+			"current": 0,
+			"score": 0,
+			"choice": None,
+			"results": [],
+		}
+	test = st.session_state.get(key)
+	if test is None:
+		st.write("Start a test, listen to each clip, and pick the syllable you heard.")
+		return
+
+	questions = test["questions"]
+	if test["current"] >= len(questions):
+		st.success(f"Test complete! You scored {test['score']} out of {len(questions)}.")
+		if not test.get("rescheduled"):
+			# Feed the answers into this level's practice queue: misses come back soon
+			scheduler = get_scheduler(tab_label, level)
+			scheduler.bulk_reschedule((answer, 4 if correct else 1) for answer, correct in test["results"])
+			get_progress_store().save_review_states(learner_id(), review_queue(level), scheduler.to_records())
+			test["rescheduled"] = True
+		return
+
+	question = questions[test["current"]]
+	pinyin = engine.distractor_index.pinyin
+	# Answer latency is measured from the first time the question is shown
+	test.setdefault("shown_at", {}).setdefault(test["current"], time.monotonic())
+	st.write(f"Question {test['current'] + 1} of {len(questions)} — score so far: {test['score']}")
+	play_a_syllable(dataset.df, n=dataset.df.index[question.row], show_character=False, st=st)
+	if test["choice"] is None:
+		choice = st.radio(
+			"What did you hear?", question.options, format_func=pinyin.get,
+			index=None, horizontal=True, key=f"{key}_q{test['current']}",
+		)
+		if st.button("Submit", key=f"{key}_submit", disabled=choice is None):
+			test["choice"] = choice
+			test["score"] += int(choice == question.answer)
+			test["results"].append((question.answer, choice == question.answer))
+			get_progress_store().record_attempt(
+				learner_id(), question.row, question.answer, level, choice,
+				correct=choice == question.answer,
+				latency_ms=(time.monotonic() - test["shown_at"][test["current"]]) * 1000,
+			)
+			st.rerun()
+	else:
+		if test["choice"] == question.answer:
+			st.success(f"Correct! It was {pinyin[question.answer]}.")
+		else:
+			st.error(f"Not quite — you picked {pinyin[test['choice']]}, it was {pinyin[question.answer]}.")
+			show_tips(dataset.df, dataset.df.index[question.row], st, expanded=True)
+		if st.button("Next question", key=f"{key}_next"):
+			test["current"] += 1
+			test["choice"] = None
+			st.rerun()
+
+def select_tab(section: str) -> str:
+	"""
+	Tab bar for a section. Unlike st.tabs, which builds the content of every tab on
+	each rerun, only the content of the selected tab is built.
+	"""
+	return option_menu(
+		None, tab_labels, icons=tab_icons, default_index=0,
+		orientation="horizontal", key=f"tabs_{section}",
+	)
+
+
+def render_syllable_grid(tab_label: str) -> None:
+	"""Show the consonant x vowel grid of a level, precomputed in the app state."""
+	with timer.section("grid"):
+		st.dataframe(state.grids[tab_levels[tab_label]], use_container_width=True)
+
+
+def render_explore(tab_label: str, level: str = None) -> None:
+	"""Explore the syllables of a level, by syllable or by row."""
+	from utils.main_functions import (get_contour_store, play_a_syllable, play_multiple_speakers, play_sprite,
+	                                  plot_speaker_contours, plot_tone_contour, show_tips, syllable_sprite)
+	if tab_label != "Shuffle":
+		render_syllable_grid(tab_label)
+		st.write("Ready to explore these syllables?")
+		# If yes is checked, start exploring
+		if not st.checkbox("Yes", key=f"yes_start_{tab_label}"):
+			return
+	mode = st.radio("Select mode:", 
+		["Same syllable uttered by multiple speakers", 
+		 "One syllable uttered by a single speaker"],
+		key=f"mode_{tab_label}",
+	)
+	if mode == "Same syllable uttered by multiple speakers":
+		syll_choice = st.selectbox(
+			"Pick a syllable:", 
+			state.syllable_options[level], 
+			help=syllable_choice_help,
+			key=f"syllable_{tab_label}",
+		)
+		# One player for all clips saves a media request and a widget per speaker
+		combined = st.toggle("One player for all clips", value=True, key=f"sprite_{tab_label}")
+		with timer.section("audio"):
+			if combined:
+				tone_set = st.toggle("Include all four tones", key=f"tone_set_{tab_label}")
+				variant = st.session_state.get("audio_variant", default_audio_variant)
+				sprite = syllable_sprite(dataset, syll_choice, tone_set, variant)
+				play_sprite(sprite, st, key=f"sprite_play_{tab_label}")
+			else:
+				play_multiple_speakers(dataset.df, syll=syll_choice, st=st, index=dataset.index)
+		if get_contour_store() is not None:
+			st.write("Pitch of each speaker, relative to their own average pitch:")
+			plot_speaker_contours(dataset, dataset.index.rows(syllable=syll_choice), st)
+		show_tips(dataset.df, dataset.df.index[dataset.index.rows(syllable=syll_choice)[0]], st)
+	elif mode == "One syllable uttered by a single speaker":
+		level_rows = state.level_rows[level]
+		row_num = st.number_input(
+			"Enter row index (0-based):", 
+			min_value=0, 
+			max_value=len(level_rows)-1, 
+			step=1,
+			help=row_number_help,
+			key=f"row_{tab_label}",
+		)
+		indx_number = dataset.df.index[level_rows[int(row_num)]]
+		with timer.section("audio"):
+			play_a_syllable(dataset.df, n=indx_number, show_character=True, st=st)
+		plot_tone_contour(dataset.df, indx_number, st)
+		show_tips(dataset.df, indx_number, st)
+		render_closest_clips(level_rows[int(row_num)])
+
+
+def render_closest_clips(row: int, k: int = 3) -> None:
+	"""Play the clips of other syllables that sound most like the clip at row."""
+	from utils.main_functions import play_a_syllable
+	similarity = get_clip_similarity(dataset, id(dataset))
+	if similarity is None:
+		return
+	with st.expander("Acoustically closest syllables"):
+		for closest in similarity.closest_clips(row, k):
+			play_a_syllable(dataset.df, n=dataset.df.index[closest], show_character=True, st=st)
+
+
+def render_practice_listening(tab_label: str, level: str = None) -> None:
+	"""Show the syllable grid of a level and drill it with spaced repetition."""
+	if tab_label != "Shuffle":
+		# Combine the level's consonants and vowels into a syllable list and display those in a grid
+		render_syllable_grid(tab_label)
+	render_practice_drill(tab_label, level)
+
+
+def record_and_score(syllable: str, key: str) -> dict:
+	"""Record the learner saying a syllable and score it against the reference speakers."""
+	references = get_reference_contours(dataset, id(dataset))
+	if references is None:
+		st.warning("Speaking practice needs the contour store: run `python -m utils.contour_store` first.")
+		return None
+	# st.audio_input is only available in recent Streamlit versions
+	recorder = getattr(st, "audio_input", None)
+	recording = (recorder("Record yourself:", key=key) if recorder is not None else
+				 st.file_uploader("Upload a recording (WAV):", type=["wav"], key=key))
+	if recording is None:
+		return None
+	from utils.pitch import analysis_sample_rate, decode_clip
+	from utils.speaking import score_recording
+	samples = decode_clip(recording.getvalue())
+	with timer.section("scoring"):
+		result = score_recording(samples, analysis_sample_rate, syllable, references)
+	if result is None:
+		st.warning("We could not hear a voiced syllable in that recording. Please try again.")
+		return None
+
+	from utils.main_functions import get_pinyin_converter
+	st.metric("Score", f"{result['score']:.0f} / 100")
+	heard = syllable[:-1] + result["heard_tone"]
+	if heard != syllable:
+		st.write(f"Your tone sounded closest to **{get_pinyin_converter().to_marked(heard)}**.")
+	st.write(f"Closest reference speaker: {result['closest_speaker']}")
+	st.line_chart(
+		{"You": result["contour"], result["closest_speaker"]: result["reference_contour"]},
+		x_label="Time (normalized)", y_label="Pitch (semitones from median)",
+	)
+	return result
+
+
+def render_practice_speaking(tab_label: str, level: str = None) -> None:
+	"""Listen to a syllable, record it, and compare your pitch contour with the six speakers."""
+	from utils.main_functions import play_a_syllable, show_tips
+	syllable = st.selectbox(
+		"Pick a syllable:", state.syllable_options[level], help=syllable_choice_help, key=f"speak_syllable_{tab_label}",
+	)
+	rows = dataset.index.rows(syllable=syllable)
+	play_a_syllable(dataset.df, n=dataset.df.index[rows[0]], show_character=True, st=st)
+	show_tips(dataset.df, dataset.df.index[rows[0]], st)
+	record_and_score(syllable, key=f"speak_record_{tab_label}_{syllable}")
+
+
+def render_speaking_test(tab_label: str, level: str = None) -> None:
+	"""Say a sequence of syllables of a level and get a pronunciation score for each."""
+	key = f"speaking_test_{tab_label}"
+	n_prompts = st.number_input("Number of syllables:", min_value=3, max_value=20, value=5, key=f"{key}_n")
+	if st.button("Start a new test", key=f"{key}_start"):
+		st.session_state[key] = {
+			"prompts": random.sample(state.syllable_options[level], min(int(n_prompts), len(state.syllable_options[level]))),
+			"current": 0,
+			"scores": [],
+		}
+	test = st.session_state.get(key)
+	if test is None:
+		st.write("Start a test, then record yourself saying each syllable shown.")
+		return
+
+	prompts = test["prompts"]
+	if test["current"] >= len(prompts):
+		st.success(f"Test complete! Your average score is {sum(test['scores']) / len(prompts):.0f} / 100.")
+		return
+
+	from utils.main_functions import get_pinyin_converter
+	syllable = prompts[test["current"]]
+	st.write(f"Syllable {test['current'] + 1} of {len(prompts)}: say **{get_pinyin_converter().to_marked(syllable)}**")
+	result = record_and_score(syllable, key=f"{key}_record_{test['current']}")
+	if result is not None and st.button("Next syllable", key=f"{key}_next"):
+		test["scores"].append(result["score"])
+		test["current"] += 1
+		st.rerun()
+
+
+def render_settings() -> None:
+	"""Sidebar settings: learner name, audio quality, and the learner's progress per level."""
+	from utils.main_functions import get_progress_store
+	from utils.transcode import bandwidth_variants
+	st.text_input("Learner name:", key="learner_name", help="Your progress is saved under this name.")
+	variants = list(bandwidth_variants.values())
+	bandwidth = st.selectbox(
+		"Audio quality:", list(bandwidth_variants), key="bandwidth",
+		index=variants.index(default_audio_variant) if default_audio_variant in variants else 0,
+		help="On a slow connection, pick a smaller, silence-trimmed version of the clips.",
+	)
+	st.session_state["audio_variant"] = bandwidth_variants[bandwidth]
+	with st.expander("My progress"):
+		level_progress = get_progress_store().level_summary(learner_id())
+		if level_progress:
+			st.dataframe(
+				[{"Level": p["level"], "Attempts": p["attempts"], "Accuracy": f"{p['accuracy']:.0%}",
+				  "Mean time (s)": round(p["mean_latency_ms"] / 1000, 1)} for p in level_progress],
+				hide_index=True,
+			)
+		else:
+			st.write("Take a listening test to start tracking your progress.")
+
+
+# Content builder of each menu section with tabs
+section_renderers = {
+	"Explore Syllables": render_explore,
+	"Practice Listening": render_practice_listening,
+	"Listening Test": render_listening_test,
+	"Practice Speaking": render_practice_speaking,
+	"Speaking Test": render_speaking_test,
+}
+
 # Streamlit app layout
 st.title("🎧 PinDrill")
 st.subheader("A Mandarin Syllable Player")
@@ -35,7 +414,7 @@ st.subheader("A Mandarin Syllable Player")
 st.sidebar.title("Menu")
 
 
-with st.sidebar:
+with st.sidebar, timer.section("sidebar"):
 	selected = option_menu(
 		"Menu",
 		["Explore Syllables", "Practice Listening", "Listening Test", "Practice Speaking", "Speaking Test", "About App"],
@@ -44,234 +423,15 @@ with st.sidebar:
 		default_index=0,
 		orientation="vertical"
 	)
+	render_settings()
 
-tab_labels = ["Easy", "Medium", "Hard", "Very Hard", "Shuffle"]
+if selected in section_renderers:
+	tab_label = select_tab(selected)
+	with timer.section(f"page: {selected}"):
+		st.write(f"{selected} — {tab_label}")
+		section_renderers[selected](tab_label, tab_levels[tab_label])
 
-if selected == "Explore Syllables":
-	tabs = st.tabs(tab_labels)
-	for i, tab in enumerate(tabs):
-		with tab:
-			st.write(f"Explore Syllables — {tab_labels[i]}")
-			if tab_labels[i] == "Easy":
-				temp_df = generate_syllable_grid(easy_consonants, easy_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-				st.write("Ready to explore these syllables?")
-
-                # If yes is checked, start exploring
-				if st.checkbox("Yes", key=f"yes_start_{tab_labels[i]}"):
-					del temp_df  # Clear the temporary DataFrame
-					mode = st.radio("Select mode:", 
-					 ["Same syllable uttered by multiple speakers", 
-					   "One syllable uttered by a single speaker"],
-					   key=f"mode_{tab_labels[i]}",
-				 )
-					if mode == "Same syllable uttered by multiple speakers":
-						syll_choice = st.selectbox(
-                            "Pick a syllable:", 
-                            sorted(dataset.df_easy["syllable"].unique()), 
-                            help=syllable_choice_help
-                            )
-						play_multiple_speakers(dataset.df_easy, syll=syll_choice, st=st)
-						
-					elif mode == "One syllable uttered by a single speaker":
-						row_num = st.number_input(
-                            "Enter row index (0-based):", 
-                            min_value=0, 
-                            max_value=len(dataset.df_easy)-1, 
-                            step=1,
-                            help=row_number_help)
-						indx_number = dataset.df_easy.index[int(row_num)]
-						play_a_syllable(dataset.df_easy, n=indx_number, show_character=True, st=st)
-
-			elif tab_labels[i] == "Medium":
-				temp_df = generate_syllable_grid(medium_consonants, medium_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-				st.write("Ready to explore these syllables?")
-				# If yes is checked, start exploring
-				if st.checkbox("Yes", key=f"yes_start_{tab_labels[i]}"):
-					del temp_df  # Clear the temporary DataFrame
-					mode = st.radio("Select mode:", 
-					 ["Same syllable uttered by multiple speakers", 
-					   "One syllable uttered by a single speaker"],
-					   key=f"mode_{tab_labels[i]}",
-				 )
-					if mode == "Same syllable uttered by multiple speakers":
-						syll_choice = st.selectbox(
-							"Pick a syllable:", 
-							sorted(dataset.df_medium["syllable"].unique()), 
-							help=syllable_choice_help
-						)
-						play_multiple_speakers(dataset.df_medium, syll=syll_choice, st=st)
-						
-					elif mode == "One syllable uttered by a single speaker":
-						row_num = st.number_input(
-							"Enter row index (0-based):", 
-							min_value=0, 
-							max_value=len(dataset.df_medium)-1, 
-							step=1,
-							help=row_number_help)
-						indx_number = dataset.df_medium.index[int(row_num)]
-						play_a_syllable(dataset.df_medium, n=indx_number, show_character=True, st=st)
-
-			elif tab_labels[i] == "Hard":
-				temp_df = generate_syllable_grid(hard_consonants, hard_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-				st.write("Ready to explore these syllables?")
-				# If yes is checked, start exploring
-				if st.checkbox("Yes", key=f"yes_start_{tab_labels[i]}"):
-					del temp_df  # Clear the temporary DataFrame
-					mode = st.radio("Select mode:", 
-						["Same syllable uttered by multiple speakers", 
-						 "One syllable uttered by a single speaker"],
-					   key=f"mode_{tab_labels[i]}",
-					)
-					if mode == "Same syllable uttered by multiple speakers":
-						syll_choice = st.selectbox(
-							"Pick a syllable:", 
-							sorted(dataset.df_hard["syllable"].unique()), 
-							help=syllable_choice_help
-						)
-						play_multiple_speakers(dataset.df_hard, syll=syll_choice, st=st)
-					elif mode == "One syllable uttered by a single speaker":
-						row_num = st.number_input(
-							"Enter row index (0-based):", 
-							min_value=0, 
-							max_value=len(dataset.df_hard)-1, 
-							step=1,
-							help=row_number_help)
-						indx_number = dataset.df_hard.index[int(row_num)]
-						play_a_syllable(dataset.df_hard, n=indx_number, show_character=True, st=st)
-
-			elif tab_labels[i] == "Very Hard":
-				temp_df = generate_syllable_grid(very_hard_consonants, very_hard_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-				st.write("Ready to explore these syllables?")
-				# If yes is checked, start exploring
-				if st.checkbox("Yes", key=f"yes_start_{tab_labels[i]}"):
-					del temp_df  # Clear the temporary DataFrame
-					mode = st.radio("Select mode:", 
-						["Same syllable uttered by multiple speakers", 
-						 "One syllable uttered by a single speaker"],
-					   key=f"mode_{tab_labels[i]}",
-					)
-					if mode == "Same syllable uttered by multiple speakers":
-						syll_choice = st.selectbox(
-							"Pick a syllable:", 
-							sorted(dataset.df_very_hard["syllable"].unique()), 
-							help=syllable_choice_help
-						)
-						play_multiple_speakers(dataset.df_very_hard, syll=syll_choice, st=st)
-					elif mode == "One syllable uttered by a single speaker":
-						row_num = st.number_input(
-							"Enter row index (0-based):", 
-							min_value=0, 
-							max_value=len(dataset.df_very_hard)-1, 
-							step=1,
-							help=row_number_help)
-						indx_number = dataset.df_very_hard.index[int(row_num)]
-						play_a_syllable(dataset.df_very_hard, n=indx_number, show_character=True, st=st)
-
-			elif tab_labels[i] == "Shuffle":
-				mode = st.radio("Select mode:", 
-					 ["Same syllable uttered by multiple speakers", 
-					   "One syllable uttered by a single speaker"],
-					   key=f"mode_{tab_labels[i]}",
-				 )
-				if mode == "Same syllable uttered by multiple speakers":
-					syll_choice = st.selectbox(
-						"Pick a syllable:", 
-						sorted(dataset.df["syllable"].unique()), 
-						help=syllable_choice_help
-						)
-					play_multiple_speakers(dataset.df, syll=syll_choice, st=st)
-				elif mode == "One syllable uttered by a single speaker":
-					row_num = st.number_input(
-						"Enter row index (0-based):", 
-						min_value=0, 
-						max_value=len(dataset.df)-1, 
-						step=1,
-						help=row_number_help)
-					indx_number = dataset.df[int(row_num)]
-					play_a_syllable(dataset.df, n=indx_number, show_character=True, st=st)
-
-elif selected == "Practice Listening":
-	tabs = st.tabs(tab_labels)
-	for i, tab in enumerate(tabs):
-		with tab:
-			st.write(f"Practice Listening — {tab_labels[i]}")
-			if tab_labels[i] == "Easy":
-				# Combine the easy consonants and vowels into a syllable list and display those in a grid
-				temp_df = generate_syllable_grid(easy_consonants, easy_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-
-			elif tab_labels[i] == "Medium":
-				# Combine the medium consonants and vowels into a syllable list and display those in a grid
-				temp_df = generate_syllable_grid(medium_consonants, medium_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-
-			elif tab_labels[i] == "Hard":
-				# Combine the hard consonants and vowels into a syllable list and display those in a grid
-				temp_df = generate_syllable_grid(hard_consonants, hard_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-
-			elif tab_labels[i] == "Very Hard":
-				# Combine the very hard consonants and vowels into a syllable list and display those in a grid
-				temp_df = generate_syllable_grid(very_hard_consonants, very_hard_vowels)
-				st.dataframe(temp_df, use_container_width=True)
-
-			elif tab_labels[i] == "Shuffle":
-				st.info("Content under development. Stay tuned for updates!")
-
-elif selected == "Listening Test":
-	tabs = st.tabs(tab_labels)
-	for i, tab in enumerate(tabs):
-		with tab:
-			st.write(f"Listening Test — {tab_labels[i]}")
-			if tab_labels[i] == "Easy":
-				st.info("Content under development. Stay tuned for updates!")
-			elif tab_labels[i] == "Medium":
-				st.info("Content under development. Stay tuned for updates!")
-			elif tab_labels[i] == "Hard":
-				st.info("Content under development. Stay tuned for updates!")
-			elif tab_labels[i] == "Very Hard":
-				st.info("Content under development. Stay tuned for updates!")
-			elif tab_labels[i] == "Shuffle":
-				st.info("Content under development. Stay tuned for updates!")
-
-elif selected == "Practice Speaking":
-	tabs = st.tabs(tab_labels)
-	for i, tab in enumerate(tabs):
-		with tab:
-			st.write(f"Practice Speaking — {tab_labels[i]}")
-			if tab_labels[i] == "Easy":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Medium":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Hard":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Very Hard":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Shuffle":
-				st.info("This is some time away. Let us see.")
-
-elif selected == "Speaking Test":
-	tabs = st.tabs(tab_labels)
-	for i, tab in enumerate(tabs):
-		with tab:
-			st.write(f"Speaking Test — {tab_labels[i]}")
-			if tab_labels[i] == "Easy":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Medium":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Hard":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Very Hard":
-				st.info("This is some time away. Let us see.")
-			elif tab_labels[i] == "Shuffle":
-				st.info("This is some time away. Let us see.")
-
-
-elif selected == "About App":
+if selected == "About App":
 	st.markdown("""
 ## 🎉 About PinDrill
 
@@ -279,7 +439,7 @@ Welcome to **PinDrill** — your interactive playground for Mandarin pronunciati
 
 - 🏆 **Track Your Progress:** PinDrill keeps tabs on your learning journey. Watch your skills level up as you go!
 - 🎯 **Graded Learning:** Four challenge zones await: Easy, Medium, Hard, and Very Hard. Plus, hit **Shuffle** for a wild ride through all levels!
-- 📹 **Coming Soon:** Get ready to record your own audio and test your pronunciation against the pros. 
+- 🎙️ **Speak and Compare:** Record your own audio and see how your tones compare with the pros.
 			 
 Ready to drill, and skill up your Mandarin? Let’s go! 🚀
 			 
@@ -301,4 +461,20 @@ st.markdown(
 
 # --- Footer with Chinese proverb about learning
 st.markdown('---')
-st.markdown('**学而不思则罔，思而不学则殆。**  \n*Learning without thought is labor lost; thought without learning is perilous.*  \n— Confucius')
\ No newline at end of file
+st.markdown('**学而不思则罔，思而不学则殆。**  \n*Learning without thought is labor lost; thought without learning is perilous.*  \n— Confucius')
+
+if show_render_timings:
+	with st.sidebar.expander("Render timings"):
+		st.dataframe(timer.report(), hide_index=True)
+		st.write("Process startup:")
+		st.dataframe([{"stage": stage, "ms": round(seconds * 1000, 2)} for stage, seconds in state.startup],
+					 hide_index=True)
+
+timer.finish()
+if metrics.enabled and st.sidebar.checkbox("Show debug panel", key="debug_panel"):
+	with st.sidebar.expander("Debug panel", expanded=True):
+		st.write("This run:")
+		st.dataframe(timer.report(), hide_index=True)
+		st.write("All sessions, recent runs:")
+		st.dataframe(metrics.summary(), hide_index=True)
+		st.text(metrics.prometheus_text())
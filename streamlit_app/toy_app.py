@@ -5,15 +5,12 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 import streamlit as st
-import pandas as pd
-import os
-from utils.main_functions import play_a_syllable, play_multiple_speakers, AudioFileDataset
+from utils.bootstrap import get_app_state
+from utils.main_functions import play_a_syllable, play_multiple_speakers, plot_tone_contour
 
-# Load and augment dataset
-# TODO: Move hardcoded paths and filenames to configs.py
-dataset_filename = Path(__file__).parent.parent / "data" / "sample" / "TrATLabelFile.csv"
-dataset = AudioFileDataset(dataset_filename)
-dataset.preprocess()
+# Dataset and syllable options; built once per process and shared by every session
+state = get_app_state()
+dataset = state.dataset
 
 row_number_help = """Select the row number - from 0 to 1919 - of the syllable you want to play. 
 80 syllables in 4 tones are uttered by six speakers. If you increment the row number you will
@@ -32,10 +29,10 @@ mode = st.radio("Select mode:",
 if mode == "Play same syllable uttered by multiple speakers":
     syll_choice = st.selectbox(
         "Pick a syllable:", 
-        sorted(dataset.df["syllable"].unique()), 
+        state.syllable_options[None], 
         help=syllable_choice_help
         )
-    play_multiple_speakers(dataset.df, syll=syll_choice, st=st)
+    play_multiple_speakers(dataset.df, syll=syll_choice, st=st, index=dataset.index)
 
 elif mode == "Play a syllable uttered by a single speaker":
     row_num = st.number_input(
@@ -45,6 +42,7 @@ elif mode == "Play a syllable uttered by a single speaker":
         step=1,
         help=row_number_help)
     play_a_syllable(dataset.df, n=int(row_num), show_character=True, st=st)
+    plot_tone_contour(dataset.df, int(row_num), st)
 
 # --- Footer with Chinese proverb about learning
 st.markdown('---')
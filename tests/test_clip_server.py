@@ -0,0 +1,72 @@
+import asyncio
+import pandas as pd
+import pytest
+pytest.importorskip("aiohttp")
+from aiohttp import test_utils
+from utils.clip_server import ClipCatalog, create_app
+from utils.main_functions import AudioFileDataset
+
+names = ["ma1_FV1_MP3.mp3", "ma1_MV1_MP3.mp3", "shi4_FV1_MP3.mp3"]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    for i, name in enumerate(names):
+        (audio_dir / name).write_bytes(bytes(range(256)) * (i + 4))
+    variant = tmp_path / "opus16.opus"
+    variant.write_bytes(b"variant" * 100)
+    frame = pd.DataFrame({"Name": names, "fold": 1, "audio_dir": str(audio_dir), "corpus": "test"})
+    dataset = AudioFileDataset(None, df=frame)
+    dataset.preprocess()
+    return ClipCatalog(dataset, {("test/ma1_FV1_MP3.mp3", "opus16"): variant})
+
+
+def fetch(catalog, path, headers=None):
+    """(status, headers, body) of one GET request to an in-process server over catalog."""
+    async def request():
+        async with test_utils.TestClient(test_utils.TestServer(create_app(catalog))) as client:
+            async with client.get(path, headers=headers or {}) as response:
+                return response.status, response.headers, await response.read()
+    return asyncio.run(request())
+
+
+def test_clip_is_served_with_validators(catalog):
+    status, headers, body = fetch(catalog, "/clips/test/ma1_FV1_MP3.mp3")
+    assert status == 200 and body == bytes(range(256)) * 4
+    assert headers["ETag"] and "max-age" in headers["Cache-Control"]
+
+
+def test_range_request_gets_partial_content(catalog):
+    status, headers, body = fetch(catalog, "/clips/test/ma1_MV1_MP3.mp3", {"Range": "bytes=10-19"})
+    assert status == 206 and body == bytes(range(10, 20))
+    assert headers["Content-Range"] == f"bytes 10-19/{256 * 5}"
+
+
+def test_matching_etag_gets_not_modified(catalog):
+    etag = fetch(catalog, "/clips/test/shi4_FV1_MP3.mp3")[1]["ETag"]
+    status, _, body = fetch(catalog, "/clips/test/shi4_FV1_MP3.mp3", {"If-None-Match": etag})
+    assert status == 304 and body == b""
+
+
+def test_metadata_etag_gets_not_modified(catalog):
+    status, headers, _ = fetch(catalog, "/syllables/ma1")
+    assert status == 200
+    assert fetch(catalog, "/syllables/ma1", {"If-None-Match": headers["ETag"]})[0] == 304
+
+
+@pytest.mark.parametrize("path", [
+    "/clips/test/xi1_FV1_MP3.mp3",      # not in the dataset
+    "/clips/other/ma1_FV1_MP3.mp3",     # another corpus
+    "/clips/test/ma1_FV1_MP3.mp3?variant=opus8",  # variant not transcoded
+    "/clips/test/ma1_MV1_MP3.mp3?variant=opus16",  # clip without variants
+    "/syllables/xi1",
+])
+def test_unknown_clips_and_variants_are_not_found(catalog, path):
+    assert fetch(catalog, path)[0] == 404
+
+
+def test_variant_is_served(catalog):
+    status, _, body = fetch(catalog, "/clips/test/ma1_FV1_MP3.mp3?variant=opus16")
+    assert status == 200 and body == b"variant" * 100
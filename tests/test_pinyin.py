@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.helping_functions import PinyinConverter, ascii_to_pinyin_full, parse_syllables
+from utils.reference_lists import consonants_ref, vowels_ref, tone_marks
+
+
+@pytest.fixture(scope="module")
+def converter():
+    return PinyinConverter(consonants_ref, vowels_ref, tone_marks)
+
+
+def all_syllables(tones="1234"):
+    return [initial + final + tone for initial in [""] + consonants_ref for final in vowels_ref for tone in tones]
+
+
+def test_marked_and_back_round_trips(converter):
+    for syllable in all_syllables():
+        assert converter.to_ascii(converter.to_marked(syllable)) == syllable
+
+
+def test_v_spellings_convert_like_u_umlaut(converter):
+    assert converter.to_marked("lv3") == converter.to_marked("lü3") == "lǚ"
+    assert converter.to_ascii(converter.to_marked("nve4")) == "nüe4"
+
+
+def test_unmarked_syllables_lose_their_tone_number(converter):
+    assert converter.to_marked("ma5") == converter.to_marked("ma") == "ma"
+    assert converter.to_ascii("ma") == "ma"
+
+
+@pytest.mark.parametrize("syllable", ["zhi3", "lv4", "xiong1", "er2", "Ma1", " hao3", "abc", "q9"])
+def test_matches_ascii_to_pinyin_full(converter, syllable):
+    assert converter.to_marked(syllable) == ascii_to_pinyin_full(syllable, tone_marks, vowels_ref)
+
+
+def test_convert_many_keeps_index_and_missing_values(converter):
+    syllables = pd.Series(["zhi3", np.nan, "zhi3", "lv4"], index=[10, 11, 12, 13], name="syllable")
+    marked = converter.convert_many(syllables)
+    assert marked.index.tolist() == [10, 11, 12, 13] and marked.name == "syllable"
+    assert marked[10] == marked[12] == "zhǐ" and marked[13] == "lǜ" and pd.isna(marked[11])
+    assert converter.convert_many(marked.dropna().tolist(), to="ascii") == ["zhi3", "zhi3", "lü4"]
+    with pytest.raises(ValueError):
+        converter.convert_many(["zhi3"], to="numbers")
+
+
+def test_parse_syllables_uses_the_converter(converter):
+    syllables = pd.Series(all_syllables("12345"), dtype=object)
+    parsed = parse_syllables(syllables, consonants_ref, vowels_ref, tone_marks, converter)
+    assert parsed["pinyin"].tolist() == [ascii_to_pinyin_full(s, tone_marks, vowels_ref) for s in syllables]
@@ -0,0 +1,90 @@
+import pytest
+from utils.progress_store import ProgressStore
+from utils.scheduler import ReviewState, Scheduler, seconds_per_day, sm2_update
+
+
+def test_intervals_grow_one_six_then_by_easiness():
+    state = ReviewState()
+    state = sm2_update(state, 5, now=0.0)
+    assert (state.repetitions, state.interval_days) == (1, 1.0)
+    state = sm2_update(state, 5, now=0.0)
+    assert (state.repetitions, state.interval_days) == (2, 6.0)
+    state = sm2_update(state, 5, now=100.0)
+    assert state.repetitions == 3
+    assert state.interval_days == pytest.approx(6.0 * state.easiness)
+    assert state.due_at == pytest.approx(100.0 + state.interval_days * seconds_per_day)
+
+
+@pytest.mark.parametrize("quality, change", [(5, 0.1), (4, 0.0), (3, -0.14), (2, -0.32), (0, -0.8)])
+def test_easiness_update(quality, change):
+    assert sm2_update(ReviewState(), quality, now=0.0).easiness == pytest.approx(2.5 + change)
+
+
+def test_easiness_never_drops_below_floor():
+    state = ReviewState()
+    for _ in range(10):
+        state = sm2_update(state, 0, now=0.0)
+    assert state.easiness == pytest.approx(1.3)
+
+
+def test_failed_review_restarts_and_comes_back_soon():
+    state = ReviewState(easiness=2.5, interval_days=15.0, repetitions=3)
+    state = sm2_update(state, 2, now=1000.0, relearn_delay=60.0)
+    assert (state.repetitions, state.interval_days, state.due_at) == (0, 0.0, 1060.0)
+
+
+def test_quality_is_clamped():
+    assert sm2_update(ReviewState(), 9, now=0.0) == sm2_update(ReviewState(), 5, now=0.0)
+    assert sm2_update(ReviewState(), -3, now=0.0) == sm2_update(ReviewState(), 0, now=0.0)
+
+
+def test_scheduler_picks_most_overdue_item():
+    scheduler = Scheduler(["ba1", "ba2", "ba3"], now=0.0)
+    assert scheduler.next_item(now=0.0) == "ba1"
+    scheduler.review("ba1", 5, now=0.0)
+    assert scheduler.next_item(now=0.0) == "ba2"
+    scheduler.review("ba2", 1, now=0.0)
+    scheduler.review("ba3", 5, now=0.0)
+    assert scheduler.next_item(now=0.0) is None
+    assert scheduler.next_item(now=60.0) == "ba2"
+    assert scheduler.due_count(now=seconds_per_day) == 3
+
+
+def test_records_round_trip():
+    scheduler = Scheduler(["ma1", "ma2"], now=0.0)
+    scheduler.review("ma1", 4, now=0.0)
+    restored = Scheduler.from_records(scheduler.to_records())
+    assert restored.states == scheduler.states
+    assert restored.next_item(now=0.0) == "ma2"
+
+
+def test_review_states_persist_per_learner_and_queue(tmp_path):
+    store = ProgressStore(tmp_path / "progress.sqlite3")
+    scheduler = Scheduler(["ma1", "ma2"], now=0.0)
+    scheduler.review("ma1", 5, now=0.0)
+    store.save_review_states("ana", "easy", scheduler.to_records())
+    state = scheduler.review("ma1", 5, now=10.0)
+    store.save_review_states("ana", "easy", [("ma1",) + tuple(state)])
+    store.close()
+
+    reopened = ProgressStore(tmp_path / "progress.sqlite3")
+    restored = Scheduler.from_records(reopened.review_states("ana", "easy"))
+    assert restored.states == scheduler.states
+    assert reopened.review_states("ana", "hard") == []
+    assert reopened.review_states("ben", "easy") == []
+    reopened.close()
+
+
+def test_review_states_include_states_not_written_yet(tmp_path):
+    store = ProgressStore(tmp_path / "progress.sqlite3", flush_interval=60.0)
+    store.save_review_states("ana", "easy", [("ma1", 2.5, 1.0, 1, 100.0)])
+    store.flush()
+    store.save_review_states("ana", "easy", [("ma1", 2.6, 6.0, 2, 200.0), ("ma2", 2.5, 0.0, 0, 0.0)])
+    store.save_review_states("ana", "hard", [("zhi3", 2.5, 1.0, 1, 50.0)])
+    # Read while the writer still waits for more items to batch
+    assert store.review_states("ana", "easy") == [("ma1", 2.6, 6.0, 2, 200.0), ("ma2", 2.5, 0.0, 0, 0.0)]
+    assert store.review_states("ben", "easy") == []
+    store.flush()
+    assert store._pending_states == {}
+    assert store.review_states("ana", "easy") == [("ma1", 2.6, 6.0, 2, 200.0), ("ma2", 2.5, 0.0, 0, 0.0)]
+    store.close()
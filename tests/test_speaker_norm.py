@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from utils.speaker_norm import SpeakerNormalizer, SpeakerStats
+
+
+def fake_store(store_dir, contours, mtimes=None):
+    """Stands in for a ContourStore over the given contours, one clip key per contour."""
+    offsets = np.concatenate(([0], np.cumsum([len(c) for c in contours]))).astype(np.int64)
+    column = np.concatenate(contours).astype(np.float32)
+    return SimpleNamespace(
+        store_dir=store_dir,
+        names=[f"TrAT/clip{i}" for i in range(len(contours))],
+        mtimes=np.asarray(mtimes if mtimes is not None else np.arange(len(contours)), dtype=np.int64),
+        sizes=np.full(len(contours), 1000, dtype=np.int64),
+        contours=column,
+        contour_offsets=offsets,
+        contour=lambda entry: column[offsets[entry]:offsets[entry + 1]],
+    )
+
+
+@pytest.fixture
+def clips():
+    rng = np.random.default_rng(0)
+    contours = [rng.uniform(80, 300, size=rng.integers(20, 60)) for _ in range(9)]
+    for contour in contours:
+        contour[rng.random(len(contour)) < 0.2] = np.nan  # unvoiced frames
+    speakers = ["FV1", "MV1", "FV2"] * 3
+    return contours, speakers
+
+
+def frames_of(contours, speakers):
+    """(float32 frames as stored, speaker codes, speakers) of a full from_frames run over contours."""
+    names, codes = np.unique(speakers, return_inverse=True)
+    return np.concatenate(contours).astype(np.float32), np.repeat(codes, [len(c) for c in contours]), names.tolist()
+
+
+def assert_same_stats(stats, expected):
+    order = [stats.code_of[s] for s in expected.speakers]
+    assert stats.count[order].tolist() == expected.count.tolist()
+    np.testing.assert_allclose(stats.mean[order], expected.mean)
+    np.testing.assert_allclose(stats.std[order], expected.std)
+    np.testing.assert_allclose(stats.minimum[order], expected.minimum)
+    np.testing.assert_allclose(stats.maximum[order], expected.maximum)
+
+
+def test_added_clip_updates_cached_stats_like_a_full_run(tmp_path, clips, monkeypatch):
+    contours, speakers = clips
+    SpeakerNormalizer(fake_store(tmp_path, contours[:-1]), speakers[:-1])
+
+    full = SpeakerStats.from_frames(*frames_of(contours, speakers))
+    store = fake_store(tmp_path, contours)
+    monkeypatch.setattr(SpeakerStats, "from_frames", classmethod(lambda *args: pytest.fail("recomputed")))
+    incremental = SpeakerNormalizer(store, speakers).stats
+    assert_same_stats(incremental, full)
+    assert len(SpeakerStats.load(tmp_path / "speaker_stats.npz").clips) == len(contours)
+
+
+def test_new_speaker_is_added_incrementally(tmp_path, clips):
+    contours, speakers = clips
+    speakers = speakers[:-1] + ["MV9"]
+    SpeakerNormalizer(fake_store(tmp_path, contours[:-1]), speakers[:-1])
+    incremental = SpeakerNormalizer(fake_store(tmp_path, contours), speakers)
+    assert_same_stats(incremental.stats, SpeakerStats.from_frames(*frames_of(contours, speakers)))
+    assert np.isfinite(incremental.contour(len(contours) - 1, "zscore")).any()
+
+
+def test_changed_clip_rebuilds_the_stats(tmp_path, clips):
+    contours, speakers = clips
+    SpeakerNormalizer(fake_store(tmp_path, contours), speakers)
+    changed = [c * 1.5 if i == 0 else c for i, c in enumerate(contours)]
+    mtimes = np.arange(len(contours))
+    mtimes[0] += 1
+    stats = SpeakerNormalizer(fake_store(tmp_path, changed, mtimes), speakers).stats
+    assert_same_stats(stats, SpeakerStats.from_frames(*frames_of(changed, speakers)))
@@ -0,0 +1,90 @@
+"""
+Shared, size-bounded in-memory cache of audio file bytes with LRU eviction.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class AudioCache:
+    def __init__(self, max_bytes: int):
+        """Cache file contents up to max_bytes in total, evicting least recently used first."""
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path) -> bytes:
+        """Return the bytes of path, reading the file only on a cache miss."""
+        key = str(path)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        # Read outside the lock so a slow volume does not block other readers
+        data = Path(path).read_bytes()
+        self._put(key, data)
+        return data
+
+    def _put(self, key: str, data: bytes) -> None:
+        """Insert data and evict from the cold end until the cache fits again."""
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = data
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def __contains__(self, path) -> bool:
+        with self._lock:
+            return str(path) in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def warm_up(self, paths, max_workers: int = 8) -> int:
+        """
+        Preload paths into the cache using a thread pool.
+        Paths already cached are skipped. Returns the number of files read.
+        """
+        pending = [p for p in dict.fromkeys(str(p) for p in paths) if p not in self]
+
+        def load(key):
+            self._put(key, Path(key).read_bytes())
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(load, pending))
+        return len(pending)
+
+    def stats(self) -> dict:
+        """Counters for hits, misses, evictions, entries and bytes held."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached entries; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
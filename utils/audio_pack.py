@@ -0,0 +1,118 @@
+"""
+Single-file audio pack for the clips of the dataset.
+
+A pack is one binary blob holding every clip back to back, plus an index
+(``<pack>.idx.npz``) mapping each clip key (``<corpus>/<Name>``) to its offset and length.
+At runtime the blob is memory-mapped and clips are served as zero-copy memoryview
+slices, so playback needs no per-clip open() and reads stay in the page cache.
+
+Build the pack for the app's dataset (configs.corpora, else the sample) with:
+    python -m utils.audio_pack
+"""
+import mmap
+import os
+import shutil
+import sys
+from pathlib import Path
+import numpy as np
+from utils.utils import atomic_write
+
+
+def pack_index_path(pack_path) -> Path:
+    """Index file stored next to a pack."""
+    pack_path = Path(pack_path)
+    return pack_path.with_name(pack_path.name + ".idx.npz")
+
+
+def build_audio_pack(names, paths, pack_path) -> int:
+    """
+    Concatenate the files in paths into pack_path, in the given order, and write the
+    offset/length index keyed by names. Returns the total size of the pack in bytes.
+    """
+    pack_path = Path(pack_path)
+    names = list(names)
+    offsets = np.zeros(len(names), dtype=np.int64)
+    lengths = np.zeros(len(names), dtype=np.int64)
+
+    def write_pack(out):
+        for i, path in enumerate(paths):
+            offsets[i] = out.tell()
+            with open(path, "rb") as clip:
+                shutil.copyfileobj(clip, out)
+            lengths[i] = out.tell() - offsets[i]
+
+    atomic_write(pack_path, write_pack)
+    atomic_write(pack_index_path(pack_path), lambda f: np.savez(
+        f, names=np.array(names, dtype=str), offsets=offsets, lengths=lengths))
+    return int(lengths.sum())
+
+
+class AudioPack:
+    def __init__(self, pack_path):
+        """Memory-map a pack built by build_audio_pack and load its index."""
+        self.pack_path = Path(pack_path)
+        with np.load(pack_index_path(self.pack_path), allow_pickle=False) as index:
+            names = index["names"].tolist()
+            offsets = index["offsets"]
+            lengths = index["lengths"]
+        self._file = open(self.pack_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if len(names) and int((offsets + lengths).max()) > size:
+            self._file.close()
+            raise ValueError(f"Index of {self.pack_path} does not match the pack; rebuild it.")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if size else memoryview(b"")
+        self._ranges = {
+            name: (offset, offset + length)
+            for name, offset, length in zip(names, offsets.tolist(), lengths.tolist())
+        }
+
+    def __contains__(self, name) -> bool:
+        return name in self._ranges
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def get(self, name: str) -> memoryview:
+        """Zero-copy view of the clip stored under name. Raises KeyError if absent."""
+        start, end = self._ranges[name]
+        return self._view[start:end]
+
+    def prefetch(self, names) -> int:
+        """Ask the kernel to read the pages of the named clips ahead of use."""
+        if self._mmap is None or not hasattr(mmap, "MADV_WILLNEED"):
+            return 0
+        count = 0
+        for name in names:
+            if name not in self._ranges:
+                continue
+            start, end = self._ranges[name]
+            # madvise needs a page-aligned start
+            aligned = start - start % mmap.PAGESIZE
+            self._mmap.madvise(mmap.MADV_WILLNEED, aligned, end - aligned)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """Release the views, the mapping and the file."""
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.configs import audio_pack_filename
+    from utils.main_functions import load_app_dataset, clip_path
+
+    dataset = load_app_dataset()
+    records = dataset.df.to_dict("records")
+    size = build_audio_pack(dataset.keys, [clip_path(r) for r in records], audio_pack_filename)
+    print(f"Wrote {len(records)} clips ({size / 1e6:.1f} MB) to {audio_pack_filename}")
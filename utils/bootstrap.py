@@ -0,0 +1,149 @@
+"""
+Process-wide application state for the Streamlit apps, built once on first use.
+
+get_app_state() loads the dataset (the mounted corpora if configured, else the sample),
+starts the audio warm-up, and precomputes what every rerun needs: the rows and sorted
+syllable options of each level, and the consonant x vowel grid of each level. The
+result is an immutable AppState shared by all sessions in the process: its mappings
+are read-only views, its row arrays are not writeable and its option lists are tuples.
+
+pandas and the rest of the dataset code are imported by the first get_app_state() call,
+not when this module is imported. Each stage of the build is timed; the breakdown is
+kept in AppState.startup and recorded as the "startup" metric. For the import side of
+a cold start, run
+    python -m utils.bootstrap [--modules streamlit_app.streamlit_app]
+which imports the app (running its first page in bare mode) in a fresh interpreter
+and prints the time spent in each top-level package, from python -X importtime,
+followed by the bootstrap stages.
+"""
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+project_root = Path(__file__).parent.parent
+
+
+class AppState(NamedTuple):
+    dataset: object             # preprocessed AudioFileDataset
+    level_rows: Mapping         # level (None for all levels) -> read-only row positions
+    syllable_options: Mapping   # level (None for all levels) -> sorted tuple of syllables
+    grids: Mapping              # level -> consonant x vowel grid (a shared DataFrame: do not modify)
+    startup: tuple              # (stage, seconds) for each stage of the build
+
+
+def level_grid_definitions() -> dict:
+    """
+    Consonants and vowels shown in the syllable grid of each level: those of
+    main_functions.level_definitions, without the zero initial "Ø".
+    """
+    from utils.main_functions import level_definitions
+    return {
+        level: ([c for c in consonants if c != "Ø"], vowels)
+        for level, (consonants, vowels) in level_definitions.items()
+    }
+
+
+def build_app_state() -> AppState:
+    """Load the dataset and precompute the per-level lookups, timing each stage."""
+    stages = []
+    started = time.perf_counter()
+
+    def lap(stage):
+        nonlocal started
+        now = time.perf_counter()
+        stages.append((stage, now - started))
+        started = now
+
+    from utils.helping_functions import cached_syllable_grid
+    from utils.main_functions import level_definitions, load_app_dataset, warm_up_audio
+    lap("imports")
+    dataset = load_app_dataset()
+    lap("dataset")
+    warm_up_audio(dataset)
+    lap("audio warm-up")
+
+    levels = [None] + list(level_definitions)
+    level_rows = {}
+    for level in levels:
+        rows = dataset.level_rows(level).view()
+        rows.flags.writeable = False
+        level_rows[level] = rows
+    syllable_options = {level: tuple(dataset.syllables(level)) for level in levels}
+    lap("levels")
+    grids = {
+        level: cached_syllable_grid(tuple(consonants), tuple(vowels))
+        for level, (consonants, vowels) in level_grid_definitions().items()
+    }
+    lap("grids")
+
+    from utils.instrumentation import metrics
+    for stage, seconds in stages:
+        metrics.observe("startup", seconds, stage=stage)
+    return AppState(
+        dataset=dataset,
+        level_rows=MappingProxyType(level_rows),
+        syllable_options=MappingProxyType(syllable_options),
+        grids=MappingProxyType(grids),
+        startup=tuple(stages),
+    )
+
+
+# The state shared by every session in the process, built on first use
+_app_state = None
+_app_state_lock = threading.Lock()
+
+
+def get_app_state() -> AppState:
+    """Return the process-wide AppState, building it on the first call."""
+    global _app_state
+    if _app_state is None:
+        with _app_state_lock:
+            if _app_state is None:
+                _app_state = build_app_state()
+    return _app_state
+
+
+def import_time_breakdown(modules) -> list:
+    """
+    Import modules in a fresh interpreter with -X importtime and return the time spent
+    importing each top-level package as (package, seconds), slowest first. Each module's
+    own (self) time is counted for its package, so the time of a module that imports
+    others is not counted twice, however deeply they are nested.
+    """
+    code = f"import sys; sys.path.insert(0, {str(project_root)!r}); " + "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=project_root, check=True)
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _, name = line.split("|")
+        own = own.split(":")[1].strip()
+        if not own.isdigit():
+            continue  # the header line
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(own) / 1e6
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+if __name__ == "__main__":
+    import argparse
+    sys.path.append(str(project_root))
+
+    parser = argparse.ArgumentParser(description="Report the import and startup time of the app.")
+    parser.add_argument("--modules", default="streamlit_app.streamlit_app")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    breakdown = import_time_breakdown(args.modules.split(","))
+    print(f"Imports in a fresh interpreter: {sum(s for _, s in breakdown) * 1e3:.0f} ms")
+    for package, seconds in breakdown[:args.top]:
+        print(f"  {package:<28}{seconds * 1e3:8.1f} ms")
+    state = get_app_state()
+    print(f"Bootstrap: {sum(s for _, s in state.startup) * 1e3:.0f} ms")
+    for stage, seconds in state.startup:
+        print(f"  {stage:<28}{seconds * 1e3:8.1f} ms")
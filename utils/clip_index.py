@@ -0,0 +1,76 @@
+"""
+Inverted index over the clips of a preprocessed dataset.
+
+Each indexed column is integer-coded (codes + sorted categories) and every value gets
+a posting list: the sorted row positions holding that value. Lookups on several
+columns intersect posting lists instead of scanning the frame with boolean masks.
+"""
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+# Columns indexed by default
+index_columns = ["syllable", "speaker", "tone", "initial_consonant", "final_vowel"]
+
+
+class ClipIndex:
+    def __init__(self, df: pd.DataFrame, columns=index_columns):
+        """Build codes and posting lists for columns of df. Positions refer to df's rows."""
+        self.n_rows = len(df)
+        self.codes = {}
+        self.categories = {}
+        self.postings = {}
+        for col in columns:
+            self.add_column(col, df[col])
+
+    def add_column(self, name: str, values) -> None:
+        """Integer-code a column and build one posting list per distinct value."""
+        codes, categories = pd.factorize(values, sort=True)
+        codes = codes.astype(np.int32)
+        # A stable sort by code lays out each value's rows contiguously and in order
+        order = np.argsort(codes, kind="stable").astype(np.int64)
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        starts = np.searchsorted(codes[order], 0) + np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self.codes[name] = codes
+        self.categories[name] = np.asarray(categories, dtype=object)
+        self.postings[name] = {
+            value: order[start:start + count]
+            for value, start, count in zip(categories.tolist(), starts.tolist(), counts.tolist())
+        }
+
+    def add_postings(self, name: str, postings: dict) -> None:
+        """Register extra posting lists (e.g. difficulty levels) that are not a single column."""
+        self.postings[name] = {key: np.unique(rows).astype(np.int64) for key, rows in postings.items()}
+
+    def posting(self, name: str, value) -> np.ndarray:
+        """
+        Row positions where name equals value. A list or tuple of values returns the union.
+        Unknown values give an empty array.
+        """
+        table = self.postings[name]
+        if isinstance(value, (list, tuple, set, frozenset)):
+            parts = [table[v] for v in value if v in table]
+            return reduce(np.union1d, parts) if parts else np.empty(0, dtype=np.int64)
+        return table.get(value, np.empty(0, dtype=np.int64))
+
+    def rows(self, **criteria) -> np.ndarray:
+        """
+        Sorted row positions matching every criterion, e.g.
+        rows(tone="2", final_vowel="ian", level="hard").
+        Posting lists are intersected smallest first.
+        """
+        if not criteria:
+            return np.arange(self.n_rows, dtype=np.int64)
+        lists = sorted((self.posting(name, value) for name, value in criteria.items()), key=len)
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), lists)
+
+    def values(self, column: str, rows=None) -> np.ndarray:
+        """Decoded values of column at rows (all rows if None)."""
+        codes = self.codes[column] if rows is None else self.codes[column][rows]
+        return self.categories[column][codes]
+
+    def unique(self, column: str, rows=None) -> list:
+        """Sorted distinct values of column among rows (all rows if None)."""
+        if rows is None:
+            return self.categories[column].tolist()
+        return self.categories[column][np.unique(self.codes[column][rows])].tolist()
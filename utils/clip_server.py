@@ -0,0 +1,262 @@
+"""
+Headless HTTP service for the clips and their syllable metadata, independent of Streamlit.
+
+Routes:
+    GET /clips/{corpus}/{name}   the clip file; ?variant=opus16 serves a transcoded variant
+    GET /syllables               every syllable with its Pinyin, levels and clip count
+    GET /syllables/{syllable}    one syllable: its parts, pronunciation tips and clips
+    GET /healthz                 liveness probe
+    GET /metrics                 Prometheus text (when PINDRILL_METRICS=1)
+
+Clips are sent with aiohttp's FileResponse: the body goes out with sendfile(), and
+ETag/Last-Modified, conditional requests (304) and byte ranges (206) are handled
+there. Metadata responses are serialized once per syllable and carry a content-hash
+ETag. Clips are addressed by their key "<corpus>/<Name>", which is looked up in the
+dataset before any path is built, so only clips of the dataset can be fetched.
+
+Needs the optional aiohttp package (>= 3.9), listed in requirements-server.txt:
+    pip install -r requirements-server.txt
+    python -m utils.clip_server [--host 127.0.0.1] [--port 8080] [--workers N]
+With --workers, each worker process loads the dataset and they share the port (SO_REUSEPORT).
+"""
+import hashlib
+import json
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from utils.drill_tips import tips_for
+from utils.instrumentation import metrics
+from utils.main_functions import clip_path, get_variant_paths, level_definitions, load_app_dataset
+
+try:
+    from aiohttp import web
+except ImportError:  # optional dependency
+    web = None
+
+# Cache lifetimes sent to clients and intermediaries, in seconds
+clip_max_age = 86400
+metadata_max_age = 300
+
+
+class ClipCatalog:
+    def __init__(self, dataset, variant_paths: dict = None):
+        """
+        Clip lookup and syllable metadata of a preprocessed AudioFileDataset.
+        variant_paths maps (clip key, variant) to the variant's file, as get_variant_paths() does.
+        """
+        self.dataset = dataset
+        self.variant_paths = variant_paths or {}
+        self.variants = {}
+        for key, variant in sorted(self.variant_paths):
+            self.variants.setdefault(key, []).append(variant)
+        df = dataset.df
+        self.rows = {key: row for row, key in enumerate(dataset.keys)}
+        self._names = df["Name"].to_numpy()
+        self._folds = df["fold"].to_numpy()
+        self._audio_dirs = df["audio_dir"].to_numpy(dtype=object) if "audio_dir" in df.columns else None
+        self._syllable_bodies = {}
+        self._index_body = None
+
+    def clip_file(self, key: str, variant: str = None) -> Path:
+        """File of the clip with key (or of its variant), or None if the dataset has no such clip."""
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if variant:
+            return self.variant_paths.get((key, variant))
+        audio_dir = self._audio_dirs[row] if self._audio_dirs is not None else None
+        return clip_path({"Name": self._names[row], "fold": self._folds[row], "audio_dir": audio_dir})
+
+    def index_body(self) -> bytes:
+        """JSON list of the syllables with their Pinyin, levels and clip counts."""
+        if self._index_body is None:
+            index = self.dataset.index
+            levels = {
+                level: set(index.unique("syllable", self.dataset.level_rows(level)))
+                for level in level_definitions
+            }
+            pinyin = self.dataset.df["pinyin"].to_numpy()
+            syllables = []
+            for syllable in index.unique("syllable"):
+                rows = index.rows(syllable=syllable)
+                syllables.append({
+                    "syllable": syllable,
+                    "pinyin": str(pinyin[rows[0]]),
+                    "levels": [level for level, members in levels.items() if syllable in members],
+                    "clips": len(rows),
+                })
+            self._index_body = _dumps({"syllables": syllables})
+        return self._index_body
+
+    def syllable_body(self, syllable: str) -> bytes:
+        """JSON description of one syllable and its clips, or None if it is not in the dataset."""
+        body = self._syllable_bodies.get(syllable)
+        if body is None:
+            rows = self.dataset.index.rows(syllable=syllable)
+            if len(rows) == 0:
+                return None
+            df = self.dataset.df
+            first = df.iloc[rows[0]]
+            clips = [
+                {
+                    "key": key,
+                    "speaker": str(speaker),
+                    "url": f"/clips/{key}",
+                    "variants": self.variants.get(key, []),
+                }
+                for key, speaker in zip(self.dataset.keys[rows], df["speaker"].to_numpy()[rows])
+            ]
+            tips = tips_for(first["initial_tip"], first["final_tip"]) if "initial_tip" in df.columns else []
+            body = _dumps({
+                "syllable": syllable,
+                "pinyin": str(first["pinyin"]),
+                "initial_consonant": str(first["initial_consonant"]),
+                "final_vowel": str(first["final_vowel"]),
+                "tone": str(first["tone"]),
+                "tips": tips,
+                "clips": clips,
+            })
+            self._syllable_bodies[syllable] = body
+        return body
+
+
+def _dumps(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=_json_default).encode()
+
+
+def _json_default(value):
+    """numpy scalars in the metadata serialize as their Python values."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+@lru_cache(maxsize=4096)
+def _etag(body: bytes) -> str:
+    """Content hash of a metadata body; the bodies are cached objects, so this is computed once each."""
+    return hashlib.sha1(body).hexdigest()
+
+
+def _json_response(request, body: bytes):
+    """A cacheable JSON response, or 304 Not Modified when the client's ETag matches."""
+    etag = _etag(body)
+    headers = {"Cache-Control": f"public, max-age={metadata_max_age}"}
+    if_none_match = request.if_none_match
+    if if_none_match and any(tag.value in (etag, "*") for tag in if_none_match):
+        response = web.Response(status=304, headers=headers)
+    else:
+        response = web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+    response.etag = etag
+    return response
+
+
+async def get_clip(request):
+    catalog = request.app["catalog"]
+    key = f"{request.match_info['corpus']}/{request.match_info['name']}"
+    path = catalog.clip_file(key, request.query.get("variant"))
+    if path is None:
+        raise web.HTTPNotFound()
+    return web.FileResponse(path, headers={"Cache-Control": f"public, max-age={clip_max_age}"})
+
+
+async def list_syllables(request):
+    return _json_response(request, request.app["catalog"].index_body())
+
+
+async def get_syllable(request):
+    body = request.app["catalog"].syllable_body(request.match_info["syllable"])
+    if body is None:
+        raise web.HTTPNotFound()
+    return _json_response(request, body)
+
+
+async def healthz(request):
+    return web.Response(text="ok")
+
+
+async def get_metrics(request):
+    if not metrics.enabled:
+        raise web.HTTPNotFound()
+    return web.Response(text=metrics.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+
+def _stamp_start():
+    """Middleware noting when each request started, for _record_request."""
+    @web.middleware
+    async def middleware(request, handler):
+        request["started_at"] = time.perf_counter()
+        return await handler(request)
+
+    return middleware
+
+
+async def _record_request(request, response):
+    """
+    Count requests by route and status, and time them up to the response headers.
+    Runs as the response is prepared, when FileResponse has settled on 200, 206 or 304.
+    """
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource is not None else "unmatched"
+    metrics.inc("clip_server_requests", route=route, status=response.status)
+    if "started_at" in request:
+        metrics.observe("clip_server_request", time.perf_counter() - request["started_at"], route=route)
+
+
+def create_app(catalog: ClipCatalog):
+    """The aiohttp application serving catalog."""
+    if web is None:
+        raise RuntimeError("The clip server needs aiohttp: pip install -r requirements-server.txt")
+    app = web.Application(middlewares=[_stamp_start()])
+    app.on_response_prepare.append(_record_request)
+    app["catalog"] = catalog
+    app.router.add_get("/clips/{corpus}/{name}", get_clip)
+    app.router.add_get("/syllables", list_syllables)
+    app.router.add_get("/syllables/{syllable}", get_syllable)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", get_metrics)
+    return app
+
+
+def load_catalog() -> ClipCatalog:
+    """Catalog of the dataset the app serves: the mounted corpora if configured, else the sample."""
+    return ClipCatalog(load_app_dataset(), get_variant_paths())
+
+
+def serve(host: str, port: int, reuse_port: bool = False) -> None:
+    """Load the catalog and serve it until interrupted."""
+    catalog = load_catalog()
+    web.run_app(create_app(catalog), host=host, port=port, reuse_port=reuse_port,
+                access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.configs import clip_server_port
+
+    parser = argparse.ArgumentParser(description="Serve the clips and syllable metadata over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=clip_server_port)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if web is None:
+        sys.exit("The clip server needs aiohttp: pip install -r requirements-server.txt")
+    print(f"Serving clips on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    if args.workers == 1:
+        serve(args.host, args.port)
+    else:
+        workers = [
+            multiprocessing.Process(target=serve, args=(args.host, args.port, True), daemon=True)
+            for _ in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,69 @@
+"""
+Paths, filenames and settings used across the PinDrill apps.
+Settings can be overridden with environment variables or a .env file.
+"""
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Repository root
+project_root = Path(__file__).parent.parent
+
+# Data directory for sample files
+data_dir = Path(os.environ.get("PINDRILL_DATA_DIR", project_root / "data" / "sample"))
+
+# Label file for the TrAT sample
+dataset_filename = data_dir / "TrATLabelFile.csv"
+
+# Corpora to mount side by side, as semicolon-separated name=label_file|audio_root entries, e.g.
+# "TrAT=data/sample/TrATLabelFile.csv|data/sample/TrAT;extra=/mnt/extra/labels.csv|/mnt/extra/audio".
+# Audio of fold f is expected in <audio_root>/<root folder name>-fold<f>/. Empty uses dataset_filename only.
+corpora = os.environ.get("PINDRILL_CORPORA", "")
+
+# Fold shards of the merged corpora, built by `python -m utils.corpus_loader`
+corpus_shard_dir = Path(os.environ.get("PINDRILL_SHARD_DIR", data_dir / "shards"))
+
+# Folds of the corpora the apps load, comma-separated, e.g. "1,2". Only those fold shards
+# are read into memory; empty loads every fold (the whole corpus)
+corpus_folds = [int(f) for f in os.environ.get("PINDRILL_CORPUS_FOLDS", "").split(",") if f.strip()]
+
+# In-memory audio cache size, in megabytes
+audio_cache_max_bytes = int(os.environ.get("PINDRILL_AUDIO_CACHE_MB", "256")) * 1024 * 1024
+
+# Clips to preload at startup: comma-separated levels and/or folds,
+# e.g. "easy", "fold1,fold2" or "all". Empty disables warm-up.
+audio_warmup = os.environ.get("PINDRILL_AUDIO_WARMUP", "")
+audio_warmup_workers = int(os.environ.get("PINDRILL_AUDIO_WARMUP_WORKERS", "8"))
+
+# Single-file audio pack built by `python -m utils.audio_pack`; used when present
+audio_pack_filename = Path(os.environ.get("PINDRILL_AUDIO_PACK", data_dir / "TrAT.pack"))
+
+# Decoded waveforms and pitch contours built by `python -m utils.contour_store`
+contour_store_dir = Path(os.environ.get("PINDRILL_CONTOUR_STORE", data_dir / "contour_store"))
+
+# SQLite database holding learner progress
+progress_db_filename = Path(os.environ.get("PINDRILL_PROGRESS_DB", project_root / "progress.sqlite3"))
+
+# Show per-section render timings in the sidebar
+show_render_timings = os.environ.get("PINDRILL_SHOW_TIMINGS", "") == "1"
+
+# Acoustic clip embeddings built by `python -m utils.embeddings`
+embeddings_filename = Path(os.environ.get("PINDRILL_EMBEDDINGS", data_dir / "embeddings.npz"))
+
+# Record metrics (section timings, cache counters) and serve them for Prometheus on localhost
+metrics_enabled = os.environ.get("PINDRILL_METRICS", "") == "1"
+metrics_port = int(os.environ.get("PINDRILL_METRICS_PORT", "9464"))
+
+# Low-bitrate variants built by `python -m utils.transcode`, and the variant served by default
+audio_variants_dir = Path(os.environ.get("PINDRILL_AUDIO_VARIANTS_DIR", data_dir / "variants"))
+default_audio_variant = os.environ.get("PINDRILL_AUDIO_VARIANT", "original")
+
+# Pronunciation tips and Mandarin-Telugu contrast tables
+drill_tips_filename = data_dir / "drill_tips.csv"
+l1_consonants_filename = data_dir / "mandarin_telugu_consonants.csv"
+l1_vowels_filename = data_dir / "mandarin_telugu_vowels.csv"
+
+# Port of the headless clip server, `python -m utils.clip_server`
+clip_server_port = int(os.environ.get("PINDRILL_CLIP_SERVER_PORT", "8080"))
@@ -0,0 +1,268 @@
+"""
+Confusion matrices over listening-test attempts, and difficulty levels derived from them.
+
+Each attempt pairs the syllable played with the syllable the learner picked. Both are
+split into initial, final and tone codes (positions in the inventories below), and the
+initial x initial, final x final and tone x tone matrices are counted with np.bincount
+over the flattened (played, picked) index. Attempts are read from the progress
+database already grouped by (syllable, answer), so only the distinct pairs are parsed
+and their counts become bincount weights.
+
+Each initial and final gets an error rate from its matrix row: the share of attempts on
+it where a different initial (or final) was picked. The rate is shrunk toward the overall
+error rate when a sound has few attempts. The sounds are ranked by error rate and dealt
+into easy/medium/hard/very_hard levels of the same sizes as the hand-curated lists in
+reference_lists.py. Sounds with fewer than min_attempts attempts keep their curated level.
+The result is written as Python assignments that can replace those lists.
+
+    python -m utils.confusion_analytics [--db progress.sqlite3 | --synthetic 10000000]
+                                        [--min-attempts 50] [--output derived_levels.py]
+"""
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from utils.helping_functions import parse_syllables
+from utils.reference_lists import (easy_consonants, medium_consonants, hard_consonants, very_hard_consonants,
+                                   easy_vowels, medium_vowels, hard_vowels, very_hard_vowels,
+                                   consonants_ref, vowels_ref, tones_ref, tone_marks,
+                                   confusable_consonants, confusable_vowels)
+
+levels = ["easy", "medium", "hard", "very_hard"]
+
+# Hand-curated level lists, in level order
+curated_consonants = {"easy": easy_consonants, "medium": medium_consonants,
+                      "hard": hard_consonants, "very_hard": very_hard_consonants}
+curated_vowels = {"easy": easy_vowels, "medium": medium_vowels,
+                  "hard": hard_vowels, "very_hard": very_hard_vowels}
+
+# Sound inventories: a part's code is its position here; "Ø" is the zero initial
+initials = ["Ø"] + [c for level in levels for c in curated_consonants[level]]
+finals = [v for level in levels for v in curated_vowels[level]]
+tones = list(tones_ref)
+
+
+class ConfusionMatrices(NamedTuple):
+    initials: np.ndarray    # [played, picked] attempt counts over the initials inventory
+    finals: np.ndarray      # same over finals
+    tones: np.ndarray       # same over tones
+    attempts: int           # attempts counted (pairs with an unknown part are skipped)
+
+
+def _codes(values, inventory: list) -> np.ndarray:
+    """Positions of values in inventory as int16, -1 for values not in it."""
+    lookup = pd.Series(np.arange(len(inventory), dtype=np.int16), index=inventory)
+    return pd.Series(values).map(lookup).fillna(-1).to_numpy(dtype=np.int16)
+
+
+def encode_syllables(syllables) -> np.ndarray:
+    """
+    Split ASCII syllables ("zhang1", "lv3") into part codes.
+    Returns an int16 array of shape (3, n): initial, final and tone codes, -1 if unknown.
+    """
+    parsed = parse_syllables(pd.Series(syllables, dtype=object), consonants_ref, vowels_ref, tone_marks)
+    initial = parsed["initial_consonant"].fillna("").replace("", "Ø")
+    final = parsed["final_vowel"].fillna("").str.replace("v", "ü")
+    return np.stack([_codes(initial, initials), _codes(final, finals), _codes(parsed["tone"], tones)])
+
+
+def confusion_matrix(played: np.ndarray, picked: np.ndarray, size: int, weights: np.ndarray = None) -> np.ndarray:
+    """size x size counts of (played, picked) code pairs; pairs with a -1 code are ignored."""
+    valid = (played >= 0) & (picked >= 0)
+    index = played[valid].astype(np.int64) * size + picked[valid]
+    counts = np.bincount(index, weights=None if weights is None else weights[valid], minlength=size * size)
+    return counts.astype(np.int64).reshape(size, size)
+
+
+def count_confusions(played: np.ndarray, picked: np.ndarray, weights: np.ndarray = None) -> ConfusionMatrices:
+    """Confusion matrices of attempts given as (3, n) part codes, optionally weighted by attempt counts."""
+    matrices = [
+        confusion_matrix(played[part], picked[part], len(inventory), weights)
+        for part, inventory in enumerate([initials, finals, tones])
+    ]
+    known = (played >= 0).all(axis=0) & (picked >= 0).all(axis=0)
+    attempts = int(known.sum() if weights is None else weights[known].sum())
+    return ConfusionMatrices(*matrices, attempts)
+
+
+def load_attempt_pairs(db_path, user_id: str = None) -> tuple:
+    """
+    Distinct (syllable, answer) pairs of the recorded attempts with their counts, grouped
+    in SQLite: (played codes, picked codes, counts) ready for count_confusions.
+    """
+    query = "SELECT syllable, answer, COUNT(*) FROM attempts"
+    params = ()
+    if user_id is not None:
+        query += " WHERE user_id = ?"
+        params = (user_id,)
+    connection = sqlite3.connect(db_path)
+    try:
+        rows = connection.execute(query + " GROUP BY syllable, answer", params).fetchall()
+    finally:
+        connection.close()
+    if not rows:
+        empty = np.empty((3, 0), dtype=np.int16)
+        return empty, empty, np.empty(0, dtype=np.int64)
+    syllables, answers, counts = zip(*rows)
+    return encode_syllables(syllables), encode_syllables(answers), np.array(counts, dtype=np.int64)
+
+
+def _partner_table(inventory: list, curated: dict, groups: list) -> tuple:
+    """
+    For each sound, the sounds it is mistaken for in synthetic attempts: the other members
+    of its confusable groups, or else the other sounds of its curated level.
+    Returns (partners padded with -1, number of partners per sound).
+    """
+    position = {sound: i for i, sound in enumerate(inventory)}
+    level_of = {sound: level for level, sounds in curated.items() for sound in sounds}
+    partners = []
+    for sound in inventory:
+        found = {other for group in groups if sound in group for other in group if other != sound}
+        if not found:
+            found = {other for other in curated.get(level_of.get(sound), []) if other != sound}
+        partners.append(sorted(position[other] for other in found if other in position))
+    width = max(len(p) for p in partners)
+    table = np.full((len(inventory), width), -1, dtype=np.int16)
+    for i, p in enumerate(partners):
+        table[i, :len(p)] = p
+    return table, np.array([len(p) for p in partners])
+
+
+def _confuse(rng, played: np.ndarray, error_rate: np.ndarray, partners: np.ndarray, n_partners: np.ndarray):
+    """Picked codes: each played code is swapped for one of its partners with its error rate."""
+    picked = played.copy()
+    swap = (rng.random(len(played)) < error_rate[played]) & (n_partners[played] > 0)
+    choice = (rng.random(swap.sum()) * n_partners[played[swap]]).astype(np.int64)
+    picked[swap] = partners[played[swap], choice]
+    return picked
+
+
+def synthetic_attempts(n: int, seed: int = 0, base_error: float = 0.05) -> tuple:
+    """
+    n synthetic attempts as (played, picked) part codes of shape (3, n), for testing.
+    Each sound's hidden error rate grows with its curated level (with some noise), and
+    mistakes go to the sound's confusable partners; tones 2 and 3 are mixed up the most.
+    """
+    rng = np.random.default_rng(seed)
+    played = np.stack([
+        rng.integers(len(initials), size=n, dtype=np.int16),
+        rng.integers(len(finals), size=n, dtype=np.int16),
+        rng.integers(1, len(tones), size=n, dtype=np.int16),  # no neutral-tone clips
+    ])
+    picked = np.empty_like(played)
+    for part, (inventory, curated, groups) in enumerate([
+        (initials, curated_consonants, confusable_consonants),
+        (finals, curated_vowels, confusable_vowels),
+    ]):
+        level_index = np.array([
+            next((i for i, level in enumerate(levels) if sound in curated[level]), 0) for sound in inventory
+        ])
+        error_rate = base_error * (1 + level_index) * rng.uniform(0.8, 1.2, size=len(inventory))
+        partners, n_partners = _partner_table(inventory, curated, groups)
+        picked[part] = _confuse(rng, played[part], error_rate, partners, n_partners)
+    tone_partners = np.array([[0], [4], [3], [2], [1]], dtype=np.int16)
+    tone_error = np.array([0.0, 0.04, 0.12, 0.12, 0.06])
+    picked[2] = _confuse(rng, played[2], tone_error, tone_partners, np.array([0, 1, 1, 1, 1]))
+    return played, picked
+
+
+def error_rates(matrix: np.ndarray, prior_weight: float = 20.0) -> tuple:
+    """
+    Per played sound: (attempts, smoothed error rate). The raw rate is shrunk toward the
+    overall error rate as if prior_weight attempts at that rate had been added.
+    """
+    attempts = matrix.sum(axis=1)
+    errors = attempts - np.diag(matrix)
+    overall = errors.sum() / max(attempts.sum(), 1)
+    return attempts, (errors + prior_weight * overall) / (attempts + prior_weight)
+
+
+def derive_levels(matrix: np.ndarray, inventory: list, curated: dict, min_attempts: int = 50,
+                  prior_weight: float = 20.0) -> dict:
+    """
+    Deal the curated sounds into levels of the curated sizes by ascending error rate.
+    Sounds with fewer than min_attempts attempts stay in their curated level.
+    """
+    attempts, rates = error_rates(matrix, prior_weight)
+    position = {sound: i for i, sound in enumerate(inventory)}
+    derived = {level: [s for s in curated[level] if attempts[position[s]] < min_attempts] for level in levels}
+    ranked = sorted(
+        (s for level in levels for s in curated[level] if attempts[position[s]] >= min_attempts),
+        key=lambda s: rates[position[s]],
+    )
+    for level in levels:
+        free = len(curated[level]) - len(derived[level])
+        derived[level] += ranked[:free]
+        ranked = ranked[free:]
+    return derived
+
+
+def top_confusions(matrix: np.ndarray, inventory: list, k: int = 10) -> list:
+    """The k most frequent off-diagonal (played, picked, count) pairs."""
+    off = matrix.copy()
+    np.fill_diagonal(off, 0)
+    flat = np.argsort(off, axis=None)[::-1][:k]
+    return [(inventory[i], inventory[j], int(off[i, j])) for i, j in zip(*np.unravel_index(flat, off.shape)) if off[i, j]]
+
+
+def format_level_lists(consonant_levels: dict, vowel_levels: dict, header: str = "") -> str:
+    """Python assignments in the layout of reference_lists.py."""
+    def quoted(sounds):
+        return "[" + ", ".join(f'"{s}"' for s in sounds) + "]"
+
+    lines = [f"# {line}" for line in header.splitlines()]
+    lines.append("# Consonants")
+    lines += [f"{level}_consonants = {quoted(consonant_levels[level])}" for level in levels]
+    lines.append("")
+    lines.append("# Vowels")
+    lines += [f"{level}_vowels = {quoted(vowel_levels[level])}" for level in levels]
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    import argparse
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.configs import progress_db_filename
+
+    parser = argparse.ArgumentParser(description="Derive difficulty levels from listening-test confusions.")
+    parser.add_argument("--db", default=str(progress_db_filename))
+    parser.add_argument("--user", default=None, help="Only this learner's attempts")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use this many synthetic attempts instead of --db")
+    parser.add_argument("--min-attempts", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Write the level lists here instead of printing them")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.synthetic:
+        played, picked = synthetic_attempts(args.synthetic)
+        weights, source = None, f"{args.synthetic} synthetic attempts"
+    else:
+        played, picked, weights = load_attempt_pairs(args.db, args.user)
+        source = f"attempts in {args.db}"
+    loaded = time.perf_counter()
+    matrices = count_confusions(played, picked, weights)
+    counted = time.perf_counter()
+    print(f"Loaded {source} in {loaded - start:.2f} s; "
+          f"counted {matrices.attempts} attempts in {counted - loaded:.2f} s")
+
+    for name, matrix, inventory in [("Initials", matrices.initials, initials),
+                                    ("Finals", matrices.finals, finals),
+                                    ("Tones", matrices.tones, tones)]:
+        print(f"{name}, most confused (played -> picked):")
+        for played_sound, picked_sound, count in top_confusions(matrix, inventory, k=5):
+            print(f"  {played_sound} -> {picked_sound}: {count}")
+
+    consonant_levels = derive_levels(matrices.initials, initials, curated_consonants, args.min_attempts)
+    vowel_levels = derive_levels(matrices.finals, finals, curated_vowels, args.min_attempts)
+    text = format_level_lists(
+        consonant_levels, vowel_levels,
+        header=f"Derived from {matrices.attempts} attempts by python -m utils.confusion_analytics",
+    )
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"Wrote the level lists to {args.output}")
+    else:
+        print(text)
@@ -0,0 +1,168 @@
+"""
+Precomputed decoded waveforms and pitch contours for every clip in the dataset.
+
+The store is a directory of flat float32 ``.npy`` columns plus a manifest:
+    waveforms-<build>.npy   all mono waveforms at pitch.analysis_sample_rate, back to back
+    contours-<build>.npy    all F0 contours (Hz, NaN where unvoiced), back to back
+    manifest.npz            clip key, source mtime/size, CSR-style offsets into both columns
+                            and the build id of the column files
+Each build writes new column files and then swaps the manifest, so readers never see
+a manifest paired with the columns of another build.
+Entries are looked up by clip key ("<corpus>/<Name>", see main_functions.clip_key)
+through ContourStore.row_of. The columns are memory-mapped on open, so reading a
+contour costs a slice, not any DSP.
+
+Build or update the store for the app's dataset (configs.corpora, else the sample) with:
+    python -m utils.contour_store
+"""
+import os
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from utils.pitch import analysis_sample_rate, hop_length, decode_clip, pitch_contour
+from utils.utils import atomic_write
+
+STORE_VERSION = 2
+
+
+def _analyse_clip(path: str):
+    """Worker: decode one clip and track its pitch."""
+    samples = decode_clip(path)
+    return samples, pitch_contour(samples)
+
+
+def _save_npy(path: Path, array: np.ndarray) -> None:
+    """Write an .npy file atomically."""
+    atomic_write(path, lambda f: np.save(f, array))
+
+
+def _save_npz(path: Path, **arrays) -> None:
+    """Write an .npz file atomically."""
+    atomic_write(path, lambda f: np.savez(f, **arrays))
+
+
+class ContourStore:
+    def __init__(self, store_dir):
+        """Open a store written by build_contour_store; the float32 columns are memory-mapped."""
+        self.store_dir = Path(store_dir)
+        with np.load(self.store_dir / "manifest.npz", allow_pickle=False) as manifest:
+            if int(manifest["version"]) != STORE_VERSION:
+                raise ValueError(f"{self.store_dir} was built by another store version; rebuild it.")
+            self.names = manifest["names"].tolist()
+            self.mtimes = manifest["mtimes"]
+            self.sizes = manifest["sizes"]
+            self.wave_offsets = manifest["wave_offsets"]
+            self.contour_offsets = manifest["contour_offsets"]
+            self.sample_rate = int(manifest["sample_rate"])
+            self.hop_length = int(manifest["hop_length"])
+            self.build = str(manifest["build"])
+        self.waveforms = np.load(self.store_dir / f"waveforms-{self.build}.npy", mmap_mode="r")
+        self.contours = np.load(self.store_dir / f"contours-{self.build}.npy", mmap_mode="r")
+        self.row_of = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def waveform(self, row: int) -> np.ndarray:
+        """Mono waveform of entry row at self.sample_rate."""
+        return self.waveforms[self.wave_offsets[row]:self.wave_offsets[row + 1]]
+
+    def contour(self, row: int) -> np.ndarray:
+        """F0 contour of entry row, one value per hop_length samples."""
+        return self.contours[self.contour_offsets[row]:self.contour_offsets[row + 1]]
+
+    def contour_times(self, row: int) -> np.ndarray:
+        """Frame times in seconds for contour(row)."""
+        n = self.contour_offsets[row + 1] - self.contour_offsets[row]
+        return np.arange(n) * self.hop_length / self.sample_rate
+
+
+def open_contour_store(store_dir):
+    """Open the store in store_dir, or return None if it has not been built."""
+    if not (Path(store_dir) / "manifest.npz").exists():
+        return None
+    return ContourStore(store_dir)
+
+
+def build_contour_store(names, paths, store_dir, max_workers: int = None) -> int:
+    """
+    Build or update the store in store_dir for the clips (names[i], paths[i]); names are clip keys.
+    Clips whose source file has the same mtime and size as in the existing store are
+    reused; the rest are decoded and analysed by a process pool with max_workers
+    processes (all cores by default). Returns the number of clips analysed.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    names = list(names)
+    paths = [str(p) for p in paths]
+    stats = [os.stat(p) for p in paths]
+    mtimes = np.array([s.st_mtime_ns for s in stats], dtype=np.int64)
+    sizes = np.array([s.st_size for s in stats], dtype=np.int64)
+
+    try:
+        previous = open_contour_store(store_dir)
+    except (OSError, ValueError, KeyError):
+        previous = None
+    if previous is not None and previous.sample_rate != analysis_sample_rate:
+        previous = None
+
+    waves = [None] * len(names)
+    contours = [None] * len(names)
+    todo = []
+    for i, name in enumerate(names):
+        j = previous.row_of.get(name) if previous is not None else None
+        if j is not None and previous.mtimes[j] == mtimes[i] and previous.sizes[j] == sizes[i]:
+            waves[i] = np.asarray(previous.waveform(j))
+            contours[i] = np.asarray(previous.contour(j))
+        else:
+            todo.append(i)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(_analyse_clip, [paths[i] for i in todo], chunksize=16)
+            for i, (samples, contour) in zip(todo, results):
+                waves[i] = samples
+                contours[i] = contour
+    elif previous is not None and previous.names == names:
+        return 0
+
+    wave_offsets = np.concatenate(([0], np.cumsum([len(w) for w in waves]))).astype(np.int64)
+    contour_offsets = np.concatenate(([0], np.cumsum([len(c) for c in contours]))).astype(np.int64)
+    empty = np.empty(0, dtype=np.float32)
+    wave_column = np.concatenate(waves).astype(np.float32) if waves else empty
+    contour_column = np.concatenate(contours).astype(np.float32) if contours else empty
+    del previous
+
+    build = uuid.uuid4().hex[:12]
+    _save_npy(store_dir / f"waveforms-{build}.npy", wave_column)
+    _save_npy(store_dir / f"contours-{build}.npy", contour_column)
+    _save_npz(
+        store_dir / "manifest.npz",
+        version=np.array(STORE_VERSION),
+        build=np.array(build),
+        names=np.array(names, dtype=str),
+        mtimes=mtimes,
+        sizes=sizes,
+        wave_offsets=wave_offsets,
+        contour_offsets=contour_offsets,
+        sample_rate=np.array(analysis_sample_rate),
+        hop_length=np.array(hop_length),
+    )
+    # Column files of earlier builds are no longer referenced
+    for old_column in list(store_dir.glob("waveforms-*.npy")) + list(store_dir.glob("contours-*.npy")):
+        if not old_column.stem.endswith(build):
+            old_column.unlink()
+    return len(todo)
+
+
+if __name__ == "__main__":
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.configs import contour_store_dir
+    from utils.main_functions import load_app_dataset, clip_path
+
+    dataset = load_app_dataset()
+    records = dataset.df.to_dict("records")
+    analysed = build_contour_store(dataset.keys, [clip_path(r) for r in records], contour_store_dir)
+    print(f"Analysed {analysed} of {len(records)} clips into {contour_store_dir}")
@@ -0,0 +1,239 @@
+"""
+Multi-corpus dataset loader with fold shards.
+
+Several label files (each with Name and fold columns) and their audio roots are
+ingested in chunks and merged into one logical dataset, split into one shard per
+fold. Each shard is a dataset artifact (see dataset_artifact) holding the derived
+label columns plus corpus and audio_dir, so a clip's file is audio_dir / Name.
+Names must be unique within a corpus (ingest rejects duplicates); across corpora a
+clip is identified by its key "<corpus>/<Name>".
+
+A manifest lists the rows, corpora, speakers and syllables of every shard. Queries
+use it to skip shards that cannot match, and only the remaining shards are loaded
+(and kept in a small LRU cache), so a query never needs the full corpus in memory.
+Ingest reads the label files in chunks. The apps, however, hold their whole dataset
+in memory: they load every fold shard unless configs.corpus_folds names some folds.
+
+Ingest the corpora configured in configs.corpora with:
+    python -m utils.corpus_loader
+"""
+import hashlib
+import json
+import sys
+import tempfile
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from utils.dataset_artifact import (ARTIFACT_VERSION, categorical_columns, file_sha256, load_artifact,
+                                    save_artifact)
+from utils.helping_functions import derive_label_columns, PinyinConverter
+from utils.drill_tips import attach_tip_codes, tip_files_hash
+from utils.reference_lists import consonants_ref, vowels_ref, tone_marks
+from utils.utils import atomic_write
+
+MANIFEST_VERSION = 1
+
+# Columns read from a label file, and their types
+label_dtypes = {"Name": str, "fold": np.int16}
+
+
+class CorpusSource(NamedTuple):
+    name: str           # corpus name, stored in the corpus column
+    label_file: Path    # CSV with at least Name and fold columns
+    audio_root: Path    # audio of fold f is in audio_root / f"{audio_root.name}-fold{f}"
+
+
+def parse_corpora(spec: str) -> list:
+    """Parse the configs.corpora setting into CorpusSources."""
+    sources = []
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        name, _, paths = entry.partition("=")
+        label_file, _, audio_root = paths.partition("|")
+        if not (name and label_file and audio_root):
+            raise ValueError(f"Corpus entry {entry!r} is not of the form name=label_file|audio_root")
+        name = name.strip()
+        # The name is the first part of the corpus's clip keys ("<corpus>/<Name>")
+        if "/" in name or name in {source.name for source in sources}:
+            raise ValueError(f"Corpus name {name!r} must be unique and must not contain '/'")
+        sources.append(CorpusSource(name, Path(label_file.strip()), Path(audio_root.strip())))
+    return sources
+
+
+def check_unique_keys(keys: pd.Series, seen: set = None) -> None:
+    """
+    Raise ValueError if a clip key ("<corpus>/<Name>") occurs twice in keys, or in keys
+    and seen (the keys read so far, updated in place).
+    """
+    duplicated = keys[keys.duplicated()]
+    if seen is not None:
+        duplicated = pd.concat([duplicated, keys[keys.isin(seen)]])
+        seen.update(keys)
+    if len(duplicated):
+        raise ValueError(f"Clip {duplicated.iloc[0]!r} is listed more than once; "
+                         "clip Names must be unique within a corpus")
+
+
+def sources_hash(sources) -> str:
+    """Fingerprint of the sources: their names, audio roots and label file contents, and the tip files."""
+    digest = hashlib.sha256(tip_files_hash().encode())
+    for source in sources:
+        digest.update(f"{source.name}\0{source.audio_root}\0{file_sha256(source.label_file)}\0".encode())
+    return digest.hexdigest()
+
+
+def _audio_dir(source: CorpusSource, fold: int) -> str:
+    return str(source.audio_root / f"{source.audio_root.name}-fold{fold}")
+
+
+def _shard_file(fold: int) -> str:
+    return f"fold-{fold}.npz"
+
+
+def ingest_corpora(sources, shard_dir, chunksize: int = 100_000) -> dict:
+    """
+    Read the label files of sources in chunks and write one shard per fold to shard_dir.
+    Each chunk is parsed and split by fold into spool files as it is read, so only
+    one chunk and then one fold are in memory at a time. Returns the manifest.
+    """
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    source_hash = sources_hash(sources)
+    spool = tempfile.TemporaryDirectory(dir=shard_dir, prefix="spool")
+    parts = defaultdict(list)
+    seen = set()
+    converter = PinyinConverter(consonants_ref, vowels_ref, tone_marks)
+    with spool:
+        for source in sources:
+            chunks = pd.read_csv(source.label_file, usecols=list(label_dtypes), dtype=label_dtypes,
+                                 chunksize=chunksize, encoding="utf-8-sig")
+            for chunk in chunks:
+                check_unique_keys(source.name + "/" + chunk["Name"], seen)
+                derive_label_columns(chunk, consonants_ref, vowels_ref, tone_marks, converter)
+                attach_tip_codes(chunk)
+                chunk["corpus"] = source.name
+                for fold, part in chunk.groupby("fold", sort=False):
+                    part = part.assign(audio_dir=_audio_dir(source, fold)).reset_index(drop=True)
+                    part_path = Path(spool.name) / f"{fold}-{len(parts[fold])}.npz"
+                    save_artifact(part, part_path, source_hash)
+                    parts[int(fold)].append(part_path)
+
+        shards = {}
+        for fold in sorted(parts):
+            shard = pd.concat([load_artifact(p, source_hash) for p in parts[fold]], ignore_index=True)
+            save_artifact(shard, shard_dir / _shard_file(fold), source_hash)
+            shards[str(fold)] = {
+                "file": _shard_file(fold),
+                "rows": len(shard),
+                "corpora": sorted(shard["corpus"].unique().tolist()),
+                "speakers": sorted(shard["speaker"].dropna().unique().tolist()),
+                "syllables": sorted(shard["syllable"].dropna().unique().tolist()),
+            }
+
+    manifest = {"version": MANIFEST_VERSION, "artifact_version": ARTIFACT_VERSION, "source_hash": source_hash,
+                "sources": [source.name for source in sources], "shards": shards}
+    atomic_write(shard_dir / "manifest.json", lambda f: json.dump(manifest, f), mode="w")
+    # Shards of folds that no longer exist
+    for old_shard in shard_dir.glob("fold-*.npz"):
+        if old_shard.name not in {shard["file"] for shard in shards.values()}:
+            old_shard.unlink()
+    return manifest
+
+
+class ShardedCorpus:
+    def __init__(self, shard_dir, max_loaded_shards: int = 4):
+        """Open the shards in shard_dir; at most max_loaded_shards are kept in memory."""
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / "manifest.json") as f:
+            self.manifest = json.load(f)
+        if (self.manifest["version"], self.manifest["artifact_version"]) != (MANIFEST_VERSION, ARTIFACT_VERSION):
+            raise ValueError(f"{self.shard_dir} was built by another loader version; re-ingest it.")
+        self.source_hash = self.manifest["source_hash"]
+        self.max_loaded_shards = max_loaded_shards
+        self._loaded = OrderedDict()
+        # Set views of the manifest for pruning
+        self._members = {
+            int(fold): {key: set(shard[key]) for key in ["corpora", "speakers", "syllables"]}
+            for fold, shard in self.manifest["shards"].items()
+        }
+
+    @property
+    def folds(self) -> list:
+        return sorted(self._members)
+
+    def __len__(self) -> int:
+        return sum(shard["rows"] for shard in self.manifest["shards"].values())
+
+    def shard(self, fold: int) -> pd.DataFrame:
+        """The rows of one fold, loaded on first use."""
+        if fold in self._loaded:
+            self._loaded.move_to_end(fold)
+            return self._loaded[fold]
+        path = self.shard_dir / self.manifest["shards"][str(fold)]["file"]
+        df = load_artifact(path, self.source_hash)
+        if df is None:
+            raise ValueError(f"Shard {path} is missing or stale; re-ingest the corpora.")
+        self._loaded[fold] = df
+        if len(self._loaded) > self.max_loaded_shards:
+            self._loaded.popitem(last=False)
+        return df
+
+    def candidate_folds(self, fold=None, corpus=None, speaker=None, syllable=None) -> list:
+        """Folds whose shard may hold rows matching the criteria, from the manifest alone."""
+        wanted = {"corpora": corpus, "speakers": speaker, "syllables": syllable}
+        folds = self.folds if fold is None else [f for f in np.atleast_1d(fold).tolist() if f in self._members]
+        return [
+            f for f in folds
+            if all(value is None or not self._members[f][key].isdisjoint(np.atleast_1d(value).tolist())
+                   for key, value in wanted.items())
+        ]
+
+    def query(self, fold=None, **criteria) -> pd.DataFrame:
+        """
+        Rows matching every criterion, e.g. query(fold=[1, 2], speaker="FV1", tone="3").
+        Criteria are column names with one value or a list of values.
+        """
+        pruning = {key: criteria.get(key) for key in ["corpus", "speaker", "syllable"]}
+        frames = []
+        for f in self.candidate_folds(fold, **pruning):
+            df = self.shard(f)
+            mask = np.ones(len(df), dtype=bool)
+            for column, value in criteria.items():
+                if value is not None:
+                    mask &= df[column].isin(np.atleast_1d(value)).to_numpy()
+            frames.append(df[mask])
+        if not frames:
+            return pd.DataFrame(columns=self.shard(self.folds[0]).columns) if self.folds else pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        # Shards have their own categories, which concat falls back to strings for
+        for column in categorical_columns:
+            if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype("category")
+        return df
+
+
+def open_corpus(sources, shard_dir, **options) -> ShardedCorpus:
+    """Open the shards of sources in shard_dir, ingesting them first if missing or stale."""
+    try:
+        corpus = ShardedCorpus(shard_dir, **options)
+        if corpus.source_hash == sources_hash(sources):
+            return corpus
+    except (OSError, ValueError, KeyError):
+        pass
+    ingest_corpora(sources, shard_dir)
+    return ShardedCorpus(shard_dir, **options)
+
+
+if __name__ == "__main__":
+    import time
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.configs import corpora, corpus_shard_dir, data_dir, dataset_filename
+
+    sources = parse_corpora(corpora) or [CorpusSource("TrAT", dataset_filename, data_dir / "TrAT")]
+    start = time.perf_counter()
+    manifest = ingest_corpora(sources, corpus_shard_dir)
+    print(f"Ingested {', '.join(manifest['sources'])} in {time.perf_counter() - start:.2f} s:")
+    for fold, shard in manifest["shards"].items():
+        print(f"  fold {fold}: {shard['rows']} rows, {len(shard['syllables'])} syllables, "
+              f"speakers {', '.join(shard['speakers'])}")
@@ -0,0 +1,85 @@
+"""
+Compiled, columnar artifact for the preprocessed dataset.
+
+The artifact is a NumPy ``.npz`` bundle written next to the processed label file.
+Low-cardinality text columns are stored as integer codes plus their categories, so
+loading the bundle yields pandas categoricals without re-parsing any strings. The
+SHA-256 of the source label CSV is stored with the columns; an artifact whose hash
+does not match the current CSV is stale and is ignored.
+"""
+import hashlib
+import zipfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from utils.utils import atomic_write
+
+# Bump when the layout of the bundle or the output of preprocess() changes
+ARTIFACT_VERSION = 3
+
+# Columns stored as codes + categories
+categorical_columns = ["syllable", "speaker", "initial_consonant", "final_vowel", "tone", "pinyin",
+                       "corpus", "audio_dir"]
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_artifact(df: pd.DataFrame, path, source_hash: str) -> None:
+    """
+    Write df to path as a typed .npz bundle tagged with source_hash.
+    The file is written to a temporary name first and then moved into place,
+    so concurrent readers never see a partially written artifact.
+    """
+    path = Path(path)
+    arrays = {
+        "__version__": np.array(ARTIFACT_VERSION),
+        "__source_hash__": np.array(source_hash),
+        "__columns__": np.array(list(df.columns), dtype=str),
+    }
+    for col in df.columns:
+        series = df[col]
+        if col in categorical_columns:
+            cat = pd.Categorical(series)
+            arrays[f"{col}.codes"] = cat.codes.astype(np.int32)
+            arrays[f"{col}.categories"] = np.asarray(cat.categories, dtype=str)
+        elif pd.api.types.is_numeric_dtype(series):
+            arrays[f"{col}.values"] = series.to_numpy()
+        else:
+            arrays[f"{col}.values"] = series.to_numpy(dtype=str)
+
+    atomic_write(path, lambda f: np.savez(f, **arrays))
+
+
+def load_artifact(path, source_hash: str):
+    """
+    Load the bundle at path as a DataFrame.
+    Returns None if the artifact is missing, unreadable, from another
+    ARTIFACT_VERSION, or was built from a label file with a different hash.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as bundle:
+            if int(bundle["__version__"]) != ARTIFACT_VERSION:
+                return None
+            if str(bundle["__source_hash__"]) != source_hash:
+                return None
+            data = {}
+            for col in bundle["__columns__"].tolist():
+                if col in categorical_columns:
+                    data[col] = pd.Categorical.from_codes(
+                        bundle[f"{col}.codes"], categories=bundle[f"{col}.categories"]
+                    )
+                else:
+                    data[col] = bundle[f"{col}.values"]
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+    return pd.DataFrame(data)
@@ -0,0 +1,136 @@
+"""
+Pronunciation tips and L1 (Telugu) contrasts for initials and finals.
+
+Three tables are merged into one tip table, keyed by the sound as preprocess() spells it:
+    - drill_tips.csv: "Mandarin Sound (Pinyin+IPA)" such as "b [p] (unasp.)" -> key "b"
+    - mandarin_telugu_consonants.csv / mandarin_telugu_vowels.csv: "Pinyin" -> key as is
+Headers are BOM-prefixed, so the files are read as utf-8-sig. Keys with "ü" are also
+reachable with "v", the ASCII spelling used in clip names.
+
+Each dataset row stores the tip-table position of its initial and its final
+(initial_tip, final_tip; -1 when there is none) as integer columns, which are saved
+in the dataset artifact. Looking up the tips of a clip is two array reads.
+"""
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from utils.configs import drill_tips_filename, l1_consonants_filename, l1_vowels_filename
+from utils.dataset_artifact import file_sha256
+
+tip_files = [drill_tips_filename, l1_consonants_filename, l1_vowels_filename]
+
+# Columns of the tip table and the source columns they come from
+drill_tip_columns = {
+    "Mandarin Sound (Pinyin+IPA)": "sound",
+    "Closest Anchor (Tel/Hin/Skt/Eng)": "anchor",
+    "Key Adjustment Needed": "adjustment",
+    "Quick Drill": "drill",
+    "Contrast Partner": "contrast_partner",
+    "Contrast Anchor": "contrast_anchor",
+    "Contrast Drill": "contrast_drill",
+}
+l1_columns = {
+    "Mandarin IPA": "ipa",
+    "Telugu": "l1_letter",
+    "Telugu IPA": "l1_ipa",
+    "Match": "match",
+    "Pronunciation Notes": "notes",
+}
+# Cell values that mean "nothing to say"
+empty_cells = ["", "-", "—"]
+
+
+def normalize_sound_key(label: str) -> str:
+    """Pinyin part of a sound label: "b [p] (unasp.)" -> "b", " Ü " -> "ü"."""
+    return str(label).strip().split(" ")[0].split("[")[0].strip().lower()
+
+
+def tip_files_hash() -> str:
+    """Combined SHA-256 of the tip files; part of the dataset artifact's source hash."""
+    return "".join(file_sha256(path) if path.exists() else "-" for path in tip_files)
+
+
+def _realign_short_rows(tips: pd.DataFrame) -> pd.DataFrame:
+    """
+    Some drill_tips.csv rows leave out the Quick Drill cell, so the contrast columns
+    start one column early (Quick Drill holds a sound such as "eng [ɤŋ]" and Contrast
+    Drill is empty). Shift those rows back into place.
+    """
+    shifted = tips["drill"].str.fullmatch(r"\S+ \[[^\]]+\].*", na=False) & tips["contrast_drill"].isna()
+    moved = ["drill", "contrast_partner", "contrast_anchor", "contrast_drill"]
+    tips.loc[shifted, moved] = tips.loc[shifted, moved].shift(1, axis=1).to_numpy()
+    return tips
+
+
+@lru_cache(maxsize=None)
+def get_tip_table() -> pd.DataFrame:
+    """
+    The merged tip table, one row per sound, parsed once per process.
+    Missing files give an empty table.
+    """
+    frames = []
+    for path, kind in [(l1_consonants_filename, "initial"), (l1_vowels_filename, "final")]:
+        if path.exists():
+            l1 = pd.read_csv(path, encoding="utf-8-sig", dtype=str).rename(columns=l1_columns)
+            frames.append(l1.assign(key=l1["Pinyin"].map(normalize_sound_key), kind=kind).drop(columns="Pinyin"))
+    table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["key", "kind"])
+
+    if drill_tips_filename.exists():
+        tips = pd.read_csv(drill_tips_filename, encoding="utf-8-sig", dtype=str)
+        tips = _realign_short_rows(tips.rename(columns=drill_tip_columns))
+        tips["key"] = tips["sound"].map(normalize_sound_key)
+        table = table.merge(tips, on="key", how="outer")
+    # Sounds only in drill_tips.csv (such as "ueng") are finals
+    table["kind"] = table["kind"].fillna("final")
+    table = table.replace(empty_cells, np.nan).drop_duplicates("key").reset_index(drop=True)
+    return table
+
+
+def _tip_index() -> pd.Index:
+    """Index from sound key (and its "v" spelling) to tip-table position."""
+    table = get_tip_table()
+    keys = table["key"].tolist()
+    positions = list(range(len(keys)))
+    aliases = [(k.replace("ü", "v"), i) for k, i in zip(keys, positions) if "ü" in k]
+    aliases = [(k, i) for k, i in aliases if k not in keys]
+    return pd.Series(positions + [i for _, i in aliases], index=keys + [k for k, _ in aliases])
+
+
+def attach_tip_codes(df: pd.DataFrame) -> pd.DataFrame:
+    """Add initial_tip and final_tip (tip-table positions, -1 if none) to df, in place. Returns df."""
+    index = _tip_index()
+    for column, target in [("initial_consonant", "initial_tip"), ("final_vowel", "final_tip")]:
+        values = pd.Series(df[column].astype(str).to_numpy()).str.lower()
+        df[target] = values.map(index).fillna(-1).astype(np.int16).to_numpy()
+    return df
+
+
+def tips_for(initial_tip: int, final_tip: int) -> list:
+    """Tip-table rows (as dicts without empty cells) for a clip's initial and final."""
+    table = get_tip_table()
+    return [
+        {k: v for k, v in table.iloc[int(code)].items() if isinstance(v, str)}
+        for code in (initial_tip, final_tip) if code >= 0
+    ]
+
+
+def format_tip(tip: dict) -> str:
+    """Markdown for one sound's tips."""
+    ipa = tip.get("ipa") or tip.get("sound", "").partition(" ")[2]
+    lines = [f"**{tip['key']}** {ipa}".rstrip()]
+    if "anchor" in tip:
+        lines.append(f"- Closest sound you know: {tip['anchor']}")
+    if "adjustment" in tip:
+        lines.append(f"- Adjust: {tip['adjustment']}")
+    if "drill" in tip:
+        lines.append(f"- Drill: {tip['drill']}")
+    if "contrast_partner" in tip:
+        anchor = f" ({tip['contrast_anchor']})" if "contrast_anchor" in tip else ""
+        drill = f": {tip['contrast_drill']}" if "contrast_drill" in tip else ""
+        lines.append(f"- Contrast with {tip['contrast_partner']}{anchor}{drill}")
+    if "l1_letter" in tip:
+        match = f" {tip['match']}" if "match" in tip else ""
+        notes = f" — {tip['notes']}" if "notes" in tip else ""
+        letter = " ".join(tip[k] for k in ("l1_letter", "l1_ipa") if k in tip)
+        lines.append(f"- Telugu: {letter}{match}{notes}")
+    return "\n".join(lines)
@@ -0,0 +1,190 @@
+"""
+Acoustic embeddings of the clips in the dataset, for "sounds like" searches.
+
+Each clip is summarised by the mean of its MFCCs (timbre: initial and final) and
+its pitch contour in semitones relative to its median (tone), see
+speaking.normalized_contour. Features are standardized with corpus statistics,
+the pitch block is weighted against the MFCC block, and each vector is scaled to
+unit length, so the dot product of two embeddings is their cosine similarity.
+
+The embeddings are one contiguous float32 matrix whose row i belongs to row i of
+AudioFileDataset.df, and they are saved with the clip keys they were built for.
+They are computed from the ContourStore (no decoding) and saved next to it. Build or refresh them with:
+    python -m utils.embeddings
+"""
+import sys
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from utils.pitch import analysis_sample_rate, hop_length
+from utils.speaking import normalized_contour
+from utils.utils import atomic_write
+from utils.vector_index import build_vector_index
+
+EMBEDDINGS_VERSION = 1
+
+# MFCC settings (coefficient 0, the overall level, is dropped)
+n_fft = 512
+n_mels = 26
+n_mfcc = 13
+# Points of the pitch contour block
+pitch_points = 16
+# Share of the squared vector length given to the pitch block
+pitch_weight = 0.5
+
+
+@lru_cache(maxsize=None)
+def mel_filterbank(sample_rate: int = analysis_sample_rate, n_fft: int = n_fft, n_mels: int = n_mels) -> np.ndarray:
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    mels = np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    hz = 700.0 * (10.0 ** (mels / 2595.0) - 1.0)
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, centre, upper = hz[:-2, None], hz[1:-1, None], hz[2:, None]
+    rising = (bins - lower) / (centre - lower)
+    falling = (upper - bins) / (upper - centre)
+    return np.maximum(0.0, np.minimum(rising, falling))
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n_in: int = n_mels, n_out: int = n_mfcc) -> np.ndarray:
+    """Orthonormal DCT-II basis, shape (n_in, n_out)."""
+    k = np.arange(n_out)[None, :]
+    n = np.arange(n_in)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2.0 / n_in)
+    basis[:, 0] /= np.sqrt(2.0)
+    return basis
+
+
+def mfcc(samples: np.ndarray, sample_rate: int = analysis_sample_rate, hop: int = hop_length) -> np.ndarray:
+    """MFCCs of a mono signal, shape (n_frames, n_mfcc), computed for all frames at once."""
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) < n_fft:
+        samples = np.pad(samples, (0, n_fft - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop]
+    power = np.abs(np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=1)) ** 2
+    log_mel = np.log(power @ mel_filterbank(sample_rate).T + 1e-10)
+    return log_mel @ _dct_matrix()
+
+
+def raw_features(samples: np.ndarray, f0: np.ndarray, sample_rate: int = analysis_sample_rate) -> np.ndarray:
+    """Unscaled feature vector of one clip: MFCC means (without c0), then the pitch contour."""
+    contour = normalized_contour(f0, pitch_points)
+    if contour is None:
+        contour = np.zeros(pitch_points)
+    return np.concatenate((mfcc(samples, sample_rate)[:, 1:].mean(axis=0), contour))
+
+
+class Embeddings:
+    def __init__(self, names, vectors: np.ndarray, mean: np.ndarray, scale: np.ndarray):
+        """Embedding matrix (row i = clip names[i]) and the scaling used to build it."""
+        self.names = list(names)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.mean = mean
+        self.scale = scale
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def embed(self, features: np.ndarray) -> np.ndarray:
+        """Embed raw feature vectors (n, d) or (d,) the same way as the corpus."""
+        scaled = (np.asarray(features, dtype=np.float64) - self.mean) * self.scale
+        norms = np.linalg.norm(scaled, axis=-1, keepdims=True)
+        return (scaled / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+    def embed_audio(self, samples: np.ndarray, f0: np.ndarray, sample_rate: int = analysis_sample_rate) -> np.ndarray:
+        """Embedding of a new recording, e.g. a learner's attempt."""
+        return self.embed(raw_features(samples, f0, sample_rate))
+
+    @classmethod
+    def from_features(cls, names, features: np.ndarray) -> "Embeddings":
+        """Standardize a raw feature matrix and weight the MFCC and pitch blocks."""
+        mean = features.mean(axis=0)
+        std = features.std(axis=0)
+        scale = 1.0 / np.where(std > 0, std, 1.0)
+        n_timbre = features.shape[1] - pitch_points
+        # Each block gets its share of the squared length, whatever its dimension
+        scale[:n_timbre] *= np.sqrt((1.0 - pitch_weight) / n_timbre)
+        scale[n_timbre:] *= np.sqrt(pitch_weight / pitch_points)
+        embeddings = cls(names, np.empty((0, features.shape[1])), mean, scale)
+        embeddings.vectors = embeddings.embed(features)
+        return embeddings
+
+    def save(self, path) -> None:
+        """Write the embeddings to an .npz file atomically."""
+        path = Path(path)
+        atomic_write(path, lambda f: np.savez(f, version=EMBEDDINGS_VERSION, names=np.array(self.names),
+                                              vectors=self.vectors, mean=self.mean, scale=self.scale))
+
+
+def build_embeddings(names, store) -> Embeddings:
+    """Embed the clips with keys names (in that order) from their stored waveforms and contours."""
+    features = []
+    for name in names:
+        entry = store.row_of[name]
+        features.append(raw_features(store.waveform(entry), store.contour(entry), store.sample_rate))
+    return Embeddings.from_features(names, np.array(features))
+
+
+def load_embeddings(path, names) -> Embeddings:
+    """
+    Load the embeddings saved at path. Returns None if there are none, they were
+    written by another version, or they are not aligned with names.
+    """
+    if not Path(path).exists():
+        return None
+    with np.load(path, allow_pickle=False) as saved:
+        if int(saved["version"]) != EMBEDDINGS_VERSION or saved["names"].tolist() != list(names):
+            return None
+        return Embeddings(saved["names"].tolist(), saved["vectors"], saved["mean"], saved["scale"])
+
+
+class ClipSimilarity:
+    def __init__(self, dataset, embeddings: Embeddings):
+        """Acoustic nearest-neighbour queries over the clips of dataset."""
+        self.dataset = dataset
+        self.embeddings = embeddings
+        self.index = build_vector_index(embeddings.vectors)
+
+    def closest_clips(self, row: int, k: int = 5, other_syllables: bool = True) -> list:
+        """
+        Row positions of the k clips that sound most like the clip at row, best first.
+        With other_syllables, clips of the same syllable are skipped.
+        """
+        syllable = self.dataset.index.values("syllable", [row])[0]
+        exclude = self.dataset.index.rows(syllable=syllable) if other_syllables else [row]
+        rows, _ = self.index.search(self.embeddings.vectors[row], k, exclude=[exclude])
+        return [int(r) for r in rows[0] if r >= 0]
+
+    def closest_syllables(self, syllable: str, k: int = 3) -> list:
+        """The k other syllables whose clips sound most like the clips of syllable, best first."""
+        own = self.dataset.index.rows(syllable=syllable)
+        centre = self.embeddings.vectors[own].mean(axis=0)
+        centre /= max(float(np.linalg.norm(centre)), 1e-12)
+        # Every syllable has a handful of clips, so a few times k clips cover k syllables
+        rows, _ = self.index.search(centre, 8 * k, exclude=[own])
+        found = []
+        for name in self.dataset.index.values("syllable", rows[0][rows[0] >= 0]).tolist():
+            if name not in found:
+                found.append(name)
+        return found[:k]
+
+
+if __name__ == "__main__":
+    import time
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.configs import embeddings_filename
+    from utils.main_functions import load_app_dataset, get_contour_store
+
+    dataset = load_app_dataset()
+    store = get_contour_store()
+    if store is None:
+        sys.exit("Build the contour store first: python -m utils.contour_store")
+    names = dataset.keys.tolist()
+    start = time.perf_counter()
+    embeddings = build_embeddings(names, store)
+    embeddings.save(embeddings_filename)
+    print(f"Embedded {len(embeddings)} clips ({embeddings.vectors.shape[1]} dims) "
+          f"in {time.perf_counter() - start:.1f} s -> {embeddings_filename}")
@@ -2,7 +2,53 @@
 Helper functions for Pinyin processing and grid generation.
 """
 import re
+from functools import lru_cache
+import numpy as np
 import pandas as pd
+from utils.instrumentation import metrics
+
+
+@lru_cache(maxsize=None)
+def _longest_first(refs: tuple) -> tuple:
+    """Return the reference list sorted longest-first, computed once per list."""
+    return tuple(sorted(refs, key=len, reverse=True))
+
+
+@lru_cache(maxsize=None)
+def _prefix_table(refs: tuple) -> tuple:
+    """
+    Group a reference list by length for longest-prefix lookups.
+    Returns ((length, frozenset_of_refs), ...) with the longest length first.
+    """
+    by_length = {}
+    for ref in refs:
+        by_length.setdefault(len(ref), set()).add(ref)
+    return tuple((n, frozenset(by_length[n])) for n in sorted(by_length, reverse=True))
+
+
+# ASCII Pinyin: letters (with 'ü') and an optional tone number
+_ascii_syllable_re = re.compile(r"([a-zü]+)([1-5])?$")
+
+
+def place_tone_mark(syl: str, tone: int, tone_marks: dict) -> str:
+    """
+    Place the tone mark on the appropriate vowel in the syllable.
+    Pinyin notation follows the principle of marking the most prominent vowel.
+    See: https://www.polyu.edu.hk/bepth/introduction-to-phonetics/spelling-rules-in-pinyin/
+    The rule: Mark priority a > e > o > i > u > 'ü'; special-case, the latter in iu/ui.
+    """
+    if 'iu' in syl:
+        idx = syl.index('u')
+    elif 'ui' in syl:
+        idx = syl.index('i')
+    else:
+        for vowel in ['a', 'e', 'o', 'i', 'u', 'ü']:
+            if vowel in syl:
+                idx = syl.index(vowel)
+                break
+    vowel_char = syl[idx]
+    return syl[:idx] + tone_marks[vowel_char][tone] + syl[idx+1:]
+
 
 def ascii_to_pinyin_full(syllable: str, tone_marks: dict, vowels_ref: list) -> str:
     """
@@ -10,7 +56,7 @@ def ascii_to_pinyin_full(syllable: str, tone_marks: dict, vowels_ref: list) -> s
     Ensures finals from vowels_ref are correctly processed.
     """
     s = syllable.strip().lower().replace('v', 'ü')
-    m = re.match(r"([a-zü]+)([1-5])?$", s)
+    m = _ascii_syllable_re.match(s)
     if not m:
         return syllable
     base, tone_str = m.groups()
@@ -22,7 +68,7 @@ def ascii_to_pinyin_full(syllable: str, tone_marks: dict, vowels_ref: list) -> s
 
     # Find which final matches from vowels_ref (longest first)
     match_final = None
-    for final in sorted(vowels_ref, key=len, reverse=True):
+    for final in _longest_first(tuple(vowels_ref)):
         # This code works only if longest vowels are checked first
         if base.endswith(final):
             match_final = final
@@ -31,27 +77,79 @@ def ascii_to_pinyin_full(syllable: str, tone_marks: dict, vowels_ref: list) -> s
     if not match_final:
         return base  # fallback: nothing matched
 
-    # Tone placement logic
-    def place_mark(syl: str, tone: int) -> str:
+    return place_tone_mark(base, tone, tone_marks)
+
+
+def pinyin_to_ascii_full(syllable: str, tone_marks: dict) -> str:
+    """
+    Convert marked Pinyin to ASCII Pinyin with a tone number, e.g. 'lǚ' -> 'lü3'.
+    Syllables without a tone mark are returned without a number.
+    """
+    s = syllable.strip().lower()
+    for vowel, marks in tone_marks.items():
+        for tone in range(1, 5):
+            if marks[tone] in s:
+                return s.replace(marks[tone], vowel) + str(tone)
+    return s
+
+
+class PinyinConverter:
+    """
+    Table-driven conversion between ASCII Pinyin with tone numbers and marked Pinyin.
+
+    The tables cover every (initial, final, tone) combination of the reference lists,
+    spelled with 'ü' or 'v', so conversions of known syllables are dict lookups. Other
+    inputs fall back to ascii_to_pinyin_full / pinyin_to_ascii_full through a bounded
+    LRU memo of memo_size entries.
+    """
+
+    def __init__(self, consonants, vowels_ref: list, tone_marks: dict, memo_size: int = 4096):
+        self.vowels_ref = list(vowels_ref)
+        self.tone_marks = tone_marks
+        self.to_marked_table = {}
+        self.to_ascii_table = {}
+        for initial in [''] + list(consonants):
+            for final in self.vowels_ref:
+                base = initial + final
+                for tone_str in ['', '1', '2', '3', '4', '5']:
+                    ascii_syllable = base + tone_str
+                    marked = ascii_to_pinyin_full(ascii_syllable, tone_marks, self.vowels_ref)
+                    self.to_marked_table[ascii_syllable] = marked
+                    if 'ü' in base:
+                        self.to_marked_table[ascii_syllable.replace('ü', 'v')] = marked
+                    # Unmarked syllables convert back without a tone number
+                    self.to_ascii_table.setdefault(marked, base if tone_str in ('', '5') else ascii_syllable)
+        self._to_marked_fallback = lru_cache(maxsize=memo_size)(
+            lambda syllable: ascii_to_pinyin_full(syllable, self.tone_marks, self.vowels_ref)
+        )
+        self._to_ascii_fallback = lru_cache(maxsize=memo_size)(
+            lambda syllable: pinyin_to_ascii_full(syllable, self.tone_marks)
+        )
+
+    def to_marked(self, syllable: str) -> str:
+        """ASCII to marked Pinyin, e.g. 'zhi3' -> 'zhǐ'."""
+        marked = self.to_marked_table.get(syllable)
+        return marked if marked is not None else self._to_marked_fallback(syllable)
+
+    def to_ascii(self, syllable: str) -> str:
+        """Marked to ASCII Pinyin, e.g. 'zhǐ' -> 'zhi3'."""
+        ascii_syllable = self.to_ascii_table.get(syllable)
+        return ascii_syllable if ascii_syllable is not None else self._to_ascii_fallback(syllable)
+
+    def convert_many(self, syllables, to: str = "marked"):
         """
-        Place the tone mark on the appropriate vowel in the syllable.
-        Pinyin notation follows the principle of marking the most prominent vowel.
-        See: https://www.polyu.edu.hk/bepth/introduction-to-phonetics/spelling-rules-in-pinyin/
-        The rule: Mark priority a > e > o > i > u > 'ü'; special-case, the latter in iu/ui.
+        Convert many syllables at once; to is "marked" or "ascii".
+        A pandas Series is converted once per unique value and returned as a Series;
+        any other iterable is returned as a list.
         """
-        if 'iu' in syl:
-            idx = syl.index('u')
-        elif 'ui' in syl:
-            idx = syl.index('i')
-        else:
-            for vowel in ['a', 'e', 'o', 'i', 'u', 'ü']:
-                if vowel in syl:
-                    idx = syl.index(vowel)
-                    break
-        vowel_char = syl[idx]
-        return syl[:idx] + tone_marks[vowel_char][tone] + syl[idx+1:]
-
-    return place_mark(base, tone)
+        if to not in ("marked", "ascii"):
+            raise ValueError(f"to must be 'marked' or 'ascii', not {to!r}")
+        convert = self.to_marked if to == "marked" else self.to_ascii
+        if isinstance(syllables, pd.Series):
+            codes, uniques = pd.factorize(syllables)
+            converted = np.array([convert(s) for s in uniques] + [np.nan], dtype=object)
+            return pd.Series(converted.take(codes), index=syllables.index, name=syllables.name)
+        return [convert(s) for s in syllables]
 
 
 def split_pinyin_syllable(syllable, consonants):
@@ -64,7 +162,7 @@ def split_pinyin_syllable(syllable, consonants):
 
     # Match consonant
     initial = ''
-    for c in sorted(consonants, key=len, reverse=True):
+    for c in _longest_first(tuple(consonants)):
         if base.startswith(c):
             initial = c
             break
@@ -75,6 +173,79 @@ def split_pinyin_syllable(syllable, consonants):
     return initial, final, tone
 
 
+def parse_syllables(syllables: pd.Series, consonants, vowels_ref: list, tone_marks: dict,
+                    converter: PinyinConverter = None) -> pd.DataFrame:
+    """
+    Batch version of split_pinyin_syllable and ascii_to_pinyin_full.
+    Each unique syllable is decomposed once, using a longest-prefix table built from
+    consonants, and the results are broadcast back to every row by its factorized code.
+    The marked Pinyin comes from converter, a PinyinConverter for the same lists
+    (one is built if it is not given).
+    Returns a DataFrame aligned with syllables, with columns
+    initial_consonant, final_vowel, tone and pinyin.
+    """
+    if converter is None:
+        converter = PinyinConverter(consonants, vowels_ref, tone_marks)
+    codes, uniques = pd.factorize(syllables)
+    initials_by_length = _prefix_table(tuple(consonants))
+
+    # One slot per unique syllable, plus a trailing NaN slot for missing values (code -1)
+    n_unique = len(uniques)
+    initial = np.empty(n_unique + 1, dtype=object)
+    final = np.empty(n_unique + 1, dtype=object)
+    tone = np.empty(n_unique + 1, dtype=object)
+    pinyin = np.empty(n_unique + 1, dtype=object)
+    initial[-1] = final[-1] = tone[-1] = pinyin[-1] = np.nan
+
+    for i, syllable in enumerate(uniques):
+        tone_str = syllable[-1] if syllable[-1].isdigit() else ''
+        base = syllable[:-1] if tone_str else syllable
+        initial_str = ''
+        for n, refs in initials_by_length:
+            if base[:n] in refs:
+                initial_str = base[:n]
+                break
+        initial[i] = initial_str
+        final[i] = base[len(initial_str):]
+        tone[i] = tone_str
+        pinyin[i] = converter.to_marked(syllable)
+
+    return pd.DataFrame(
+        {
+            "initial_consonant": initial.take(codes),
+            "final_vowel": final.take(codes),
+            "tone": tone.take(codes),
+            "pinyin": pinyin.take(codes),
+        },
+        index=syllables.index,
+    )
+
+
+def derive_label_columns(df: pd.DataFrame, consonants, vowels_ref: list, tone_marks: dict,
+                         converter: PinyinConverter = None) -> pd.DataFrame:
+    """
+    Add the columns derived from a label file's Name column to df, in place:
+    syllable, speaker, initial_consonant, final_vowel, tone and pinyin.
+    converter is passed on to parse_syllables. Returns df.
+    """
+    # Extract syllable and speaker from the 'Name' column
+    df[['syllable', 'speaker']] = df['Name'].str.extract(r'^(.*?)_(.*?)_')
+
+    # Split 'syllable' column into initial consonant, final vowel, and tone, and
+    # convert it to marked Pinyin. Each unique syllable is parsed only once.
+    parsed = parse_syllables(df['syllable'], consonants, vowels_ref, tone_marks, converter)
+    df[['initial_consonant', 'final_vowel', 'tone']] = parsed[['initial_consonant', 'final_vowel', 'tone']]
+    # Replace NaN or empty strings in 'consonant' with the zero initial symbol
+    df["initial_consonant"] = df["initial_consonant"].fillna("").replace("", "Ø")
+
+    df["pinyin"] = parsed["pinyin"]
+
+    # Convert 'tone' to string for consistency
+    df["tone"] = df["tone"].astype(str)
+    return df
+
+
+@metrics.timed_function("syllable_grid")
 def generate_syllable_grid(consonants, vowels):
     """
     Create a DataFrame with consonants (including '∅') as rows, vowels as columns,
@@ -88,3 +259,12 @@ def generate_syllable_grid(consonants, vowels):
     df = pd.DataFrame(data, index=consonants)
     df.index.name = "Initial"
     return df
+
+
+@lru_cache(maxsize=64)
+def cached_syllable_grid(consonants: tuple, vowels: tuple) -> pd.DataFrame:
+    """
+    Memoized generate_syllable_grid, keyed on the (consonants, vowels) pair.
+    The returned DataFrame is shared between callers and must not be modified.
+    """
+    return generate_syllable_grid(list(consonants), list(vowels))
@@ -0,0 +1,224 @@
+"""
+Lightweight instrumentation: timing of named sections of a Streamlit script run, and
+process-wide metrics (counters and rolling latency quantiles).
+
+Metrics are recorded only when enabled (PINDRILL_METRICS=1); when disabled, the
+decorators and context managers cost one attribute check per call. With metrics
+enabled, start_metrics_server() serves them in the Prometheus text format at
+http://127.0.0.1:<port>/metrics from a daemon thread.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from utils.configs import metrics_enabled, metrics_port
+
+# Quantiles reported for every histogram
+quantiles = [0.5, 0.95, 0.99]
+
+
+class RollingHistogram:
+    def __init__(self, window: int = 1024):
+        """Keep the last window observations for quantiles, plus the all-time count and sum."""
+        self._values = np.zeros(window)
+        self._next = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        self.count += 1
+        self.sum += value
+
+    def quantiles(self) -> dict:
+        """Quantiles of the observations in the window (empty if there are none)."""
+        if self.count == 0:
+            return {}
+        window = self._values[:min(self.count, len(self._values))]
+        return dict(zip(quantiles, np.quantile(window, quantiles).tolist()))
+
+
+def _escape(value) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, window: int = 1024):
+        """Process-wide counters and rolling histograms, keyed by name and labels."""
+        self.enabled = enabled
+        self.window = window
+        self.counters = {}
+        self.histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add value to a counter."""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Record a duration in a rolling histogram."""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = RollingHistogram(self.window)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def _timed(self, name: str, labels: dict):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        """Context manager recording the duration of the enclosed block."""
+        return self._timed(name, labels) if self.enabled else nullcontext()
+
+    def timed_function(self, name: str, **labels):
+        """Decorator recording the duration of every call."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._timed(name, labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def register_collector(self, collect) -> None:
+        """
+        Add a callable returning {name: value} gauges, read at export time.
+        Used for state that is already counted elsewhere, such as AudioCache.stats().
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def summary(self) -> list:
+        """One row per histogram: name, labels, count and quantiles in milliseconds."""
+        with self._lock:
+            items = [(key, h.count, h.quantiles()) for key, h in self.histograms.items()]
+        rows = []
+        for (name, labels), count, q in sorted(items):
+            row = {"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "count": count}
+            row.update({f"p{int(p * 100)} (ms)": round(v * 1000, 2) for p, v in q.items()})
+            rows.append(row)
+        return rows
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        def series(name, labels, extra=()):
+            pairs = [f'{k}="{_escape(v)}"' for k, v in list(labels) + list(extra)]
+            return f"pindrill_{name}" + ("{" + ",".join(pairs) + "}" if pairs else "")
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, h.count, h.sum, h.quantiles()) for key, h in self.histograms.items())
+            collectors = list(self._collectors)
+        lines = []
+        for (name, labels), value in counters:
+            lines.append(f"{series(name + '_total', labels)} {value}")
+        for (name, labels), count, total, q in histograms:
+            for p, value in q.items():
+                lines.append(f"{series(name + '_seconds', labels, [('quantile', p)])} {value:.6f}")
+            lines.append(f"{series(name + '_seconds_count', labels)} {count}")
+            lines.append(f"{series(name + '_seconds_sum', labels)} {total:.6f}")
+        for collect in collectors:
+            for name, value in collect().items():
+                lines.append(f"{series(name, ())} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every module and session in the process
+metrics = Metrics(enabled=metrics_enabled)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the app's console
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = metrics_port, host: str = "127.0.0.1"):
+    """
+    Serve metrics on host:port from a daemon thread, once per process.
+    Does nothing when metrics are disabled. Returns the server, or None.
+    """
+    global _metrics_server
+    if not metrics.enabled:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                return None  # Port taken, e.g. by another app process
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _metrics_server
+
+
+class RunTimer:
+    def __init__(self):
+        """Collect wall-clock durations of named sections during one script run."""
+        self.started_at = time.perf_counter()
+        self.sections = {}
+
+    @contextmanager
+    def section(self, name: str):
+        """
+        Time the enclosed block; repeated sections with the same name add up.
+        Each block is also recorded in the process-wide "section" histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.sections[name] = self.sections.get(name, 0.0) + elapsed
+            metrics.observe("section", elapsed, section=name)
+
+    def total(self) -> float:
+        """Seconds since the run started."""
+        return time.perf_counter() - self.started_at
+
+    def finish(self) -> None:
+        """Record the duration of the whole run in the "script_run" histogram."""
+        metrics.observe("script_run", self.total())
+
+    def report(self) -> list:
+        """Sections as [{"section": name, "ms": duration}], slowest first, plus the run total."""
+        rows = [{"section": name, "ms": round(seconds * 1000, 2)}
+                for name, seconds in sorted(self.sections.items(), key=lambda item: -item[1])]
+        rows.append({"section": "total", "ms": round(self.total() * 1000, 2)})
+        return rows
@@ -0,0 +1,123 @@
+"""
+Listening test engine: multiple-choice questions with confusable distractors.
+
+Distractors for every syllable are precomputed once into a DistractorIndex from the
+dataset's ClipIndex, so generating a question is a few dict and array lookups:
+    - tone: same initial and final, another tone (ma1 -> ma2, ma3, ma4)
+    - initial: same final and tone, a confusable initial (zhi3 -> zi3, ji3)
+    - final: same initial and tone, a confusable final (ban1 -> bang1)
+    - acoustic: the syllables whose clips sound closest, when a ClipSimilarity
+      over the clip embeddings is given
+"""
+import random
+from typing import NamedTuple
+from utils.reference_lists import confusable_consonants, confusable_vowels
+
+distractor_kinds = ["tone", "initial", "final", "acoustic"]
+
+
+class Question(NamedTuple):
+    row: int            # row position of the clip in dataset.df
+    answer: str         # ASCII syllable of the clip, e.g. "zhi3"
+    options: list       # ASCII syllables in display order, including answer
+
+
+def _partners(groups) -> dict:
+    """Map each member of the confusion groups to the other members of its groups."""
+    partners = {}
+    for group in groups:
+        for member in group:
+            partners.setdefault(member, [])
+            partners[member] += [other for other in group if other != member and other not in partners[member]]
+    return partners
+
+
+class DistractorIndex:
+    def __init__(self, dataset, similarity=None):
+        """
+        Precompute the tone, initial and final distractors of every syllable in dataset,
+        and the acoustic ones if similarity (a ClipSimilarity) is given.
+        """
+        index = dataset.index
+        syllables = index.unique("syllable")
+        first_rows = [int(index.posting("syllable", s)[0]) for s in syllables]
+        initials = index.values("initial_consonant", first_rows).tolist()
+        finals = index.values("final_vowel", first_rows).tolist()
+        tones = index.values("tone", first_rows).tolist()
+        self.pinyin = dict(zip(syllables, dataset.df["pinyin"].iloc[first_rows].astype(str).tolist()))
+
+        by_parts = {(i, f, t): s for s, i, f, t in zip(syllables, initials, finals, tones)}
+        all_tones = sorted(set(tones))
+        initial_partners = _partners(confusable_consonants)
+        final_partners = _partners(confusable_vowels)
+
+        self.distractors = {}
+        for syllable, initial, final, tone in zip(syllables, initials, finals, tones):
+            candidates = {
+                "tone": [(initial, final, t) for t in all_tones if t != tone],
+                "initial": [(i, final, tone) for i in initial_partners.get(initial, [])],
+                "final": [(initial, f, tone) for f in final_partners.get(final, [])],
+            }
+            self.distractors[syllable] = {
+                kind: tuple(by_parts[parts] for parts in keys if parts in by_parts)
+                for kind, keys in candidates.items()
+            }
+            if similarity is not None:
+                self.distractors[syllable]["acoustic"] = tuple(similarity.closest_syllables(syllable, 3))
+        self.syllables = syllables
+
+    def get(self, syllable: str, kind: str = None) -> tuple:
+        """Distractors of syllable, of one kind or of all kinds (tone first)."""
+        table = self.distractors.get(syllable, {})
+        if kind is not None:
+            return table.get(kind, ())
+        return tuple(s for k in distractor_kinds for s in table.get(k, ()))
+
+
+class ListeningTest:
+    def __init__(self, dataset, distractor_index: DistractorIndex = None):
+        """Question generator over dataset; builds the DistractorIndex unless one is given."""
+        self.dataset = dataset
+        self.distractor_index = distractor_index or DistractorIndex(dataset)
+        self._syllable_codes = dataset.index.codes["syllable"]
+        self._syllable_names = dataset.index.categories["syllable"]
+        self._level_rows = {}
+
+    def _rows(self, level):
+        """Candidate clip rows for a level, cached as a list for O(1) random picks."""
+        if level not in self._level_rows:
+            self._level_rows[level] = self.dataset.level_rows(level).tolist()
+        return self._level_rows[level]
+
+    def question(self, level: str = None, n_options: int = 4, rng: random.Random = random) -> Question:
+        """
+        Draw a clip from level (all levels if None) and offer n_options answers.
+        Distractors are mixed across kinds, one of each kind in turn; missing
+        slots are filled with random syllables from the corpus.
+        """
+        row = rng.choice(self._rows(level))
+        answer = self._syllable_names[self._syllable_codes[row]]
+        by_kind = [list(self.distractor_index.get(answer, kind)) for kind in distractor_kinds]
+        for pool in by_kind:
+            rng.shuffle(pool)
+
+        chosen = []
+        while len(chosen) < n_options - 1 and any(by_kind):
+            for pool in by_kind:
+                if pool and len(chosen) < n_options - 1:
+                    candidate = pool.pop()
+                    if candidate not in chosen:
+                        chosen.append(candidate)
+        while len(chosen) < n_options - 1:
+            candidate = rng.choice(self.distractor_index.syllables)
+            if candidate != answer and candidate not in chosen:
+                chosen.append(candidate)
+
+        options = chosen + [answer]
+        rng.shuffle(options)
+        return Question(row, answer, options)
+
+    def generate(self, n_questions: int = 50, level: str = None, n_options: int = 4, seed: int = None) -> list:
+        """Generate a test of n_questions questions; pass seed for a reproducible test."""
+        rng = random.Random(seed)
+        return [self.question(level, n_options, rng) for _ in range(n_questions)]
@@ -6,102 +6,577 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 from collections import defaultdict
+from functools import cached_property, lru_cache
 import os
 import random
 import re
+import threading
+import numpy as np
 import pandas as pd
 from utils.reference_lists import (consonants_ref, vowels_ref, tone_marks, tones_ref, 
                                    easy_consonants,  easy_vowels, medium_consonants, 
                                    medium_vowels, hard_consonants, hard_vowels, 
                                    very_hard_consonants, very_hard_vowels
 )
-from utils.helping_functions import ascii_to_pinyin_full, split_pinyin_syllable
+from utils.helping_functions import derive_label_columns, PinyinConverter
+from utils.configs import (data_dir, dataset_filename, audio_cache_max_bytes,
+                           audio_warmup, audio_warmup_workers, audio_pack_filename,
+                           contour_store_dir, progress_db_filename, corpora, corpus_shard_dir, corpus_folds,
+                           audio_variants_dir, default_audio_variant)
+from utils.clip_index import ClipIndex, index_columns
+from utils.audio_cache import AudioCache
+from utils.audio_pack import AudioPack, pack_index_path
+from utils.contour_store import open_contour_store
+from utils.speaker_norm import SpeakerNormalizer
+from utils.progress_store import ProgressStore
+from utils.dataset_artifact import file_sha256, load_artifact, save_artifact
+from utils.instrumentation import metrics
+from utils.transcode import audio_variants, load_variants_manifest, variants_manifest_path
+from utils.audio_sprite import Sprite, build_sprite
+from utils.pitch import read_clip, resample
+from utils.corpus_loader import CorpusSource, check_unique_keys, open_corpus, parse_corpora
+from utils.drill_tips import attach_tip_codes, format_tip, tip_files_hash, tips_for
+
+# Level name -> (initial consonants, final vowels); zero-initial syllables ("Ø") are easy
+level_definitions = {
+    "easy": (["Ø"] + easy_consonants, easy_vowels),
+    "medium": (medium_consonants, medium_vowels),
+    "hard": (hard_consonants, hard_vowels),
+    "very_hard": (very_hard_consonants, very_hard_vowels),
+}
+
+# Conversion tables between ASCII and marked Pinyin, built on first use
+@lru_cache(maxsize=None)
+def get_pinyin_converter() -> PinyinConverter:
+    """Return the shared PinyinConverter for the reference lists."""
+    return PinyinConverter(consonants_ref, vowels_ref, tone_marks)
+
+
+# Shared in-memory cache of clip bytes, used by every session in the process
+audio_cache = AudioCache(audio_cache_max_bytes)
+metrics.register_collector(lambda: {f"audio_cache_{k}": v for k, v in audio_cache.stats().items()})
+
+# MIME types passed to st.audio for the clip formats in the corpus
+audio_formats = {".mp3": "audio/mpeg", ".wav": "audio/wav"}
+
+
+# Corpus of the TrAT sample when it is loaded on its own, without a corpus column
+sample_corpus = "TrAT"
+
+
+def clip_key(row) -> str:
+    """
+    Key of a dataset row's clip, unique across corpora: "<corpus>/<Name>".
+    The audio pack, contour store, embeddings and variants are keyed on it.
+    """
+    corpus = row.get("corpus")
+    return f"{corpus if isinstance(corpus, str) else sample_corpus}/{row['Name']}"
+
+
+def clip_keys(df: pd.DataFrame) -> np.ndarray:
+    """clip_key() of every row of df, in row order."""
+    corpus = df["corpus"].astype(str) if "corpus" in df.columns else sample_corpus
+    return (corpus + "/" + df["Name"].astype(str)).to_numpy(dtype=object)
+
+
+def clip_speakers(df: pd.DataFrame) -> np.ndarray:
+    """Speaker of every row of df as "<corpus>/<speaker>", since corpora may reuse speaker ids."""
+    corpus = df["corpus"].astype(str) if "corpus" in df.columns else sample_corpus
+    return (corpus + "/" + df["speaker"].astype(str)).to_numpy(dtype=object)
+
+
+def clip_path(row) -> Path:
+    """
+    Resolve the audio file of a dataset row: from its audio_dir column when it was
+    loaded from corpus shards, otherwise from its fold in the TrAT sample.
+    """
+    audio_dir = row.get("audio_dir")
+    if isinstance(audio_dir, str):
+        return Path(audio_dir) / row["Name"]
+    return data_dir / "TrAT" / f"TrAT-fold{int(row['fold'])}" / row["Name"]
+
+
+# Memory-mapped audio pack, opened on first use if one has been built
+_audio_pack = None
+_audio_pack_lock = threading.Lock()
+
+
+def get_audio_pack():
+    """Return the shared AudioPack for audio_pack_filename, or None if no pack has been built."""
+    global _audio_pack
+    if _audio_pack is None:
+        with _audio_pack_lock:
+            if _audio_pack is None and pack_index_path(audio_pack_filename).exists():
+                _audio_pack = AudioPack(audio_pack_filename)
+    return _audio_pack
+
+
+@metrics.timed_function("clip_bytes")
+def clip_bytes(row) -> bytes:
+    """
+    Bytes of a row's clip: copied out of the audio pack when the clip is packed,
+    otherwise read through audio_cache.
+    """
+    pack = get_audio_pack()
+    key = clip_key(row)
+    if pack is not None and key in pack:
+        data, source = bytes(pack.get(key)), "pack"
+    else:
+        data, source = audio_cache.get(clip_path(row)), "cache"
+    metrics.inc("clip_bytes_served", len(data), source=source)
+    return data
+
+
+# Transcoded variants of the clips, read from the variants manifest on first use
+_variant_paths = None
+_variant_paths_lock = threading.Lock()
+
+
+def get_variant_paths() -> dict:
+    """Map (clip key, variant) to the variant's file, for the variants listed in the manifest."""
+    global _variant_paths
+    if _variant_paths is None:
+        with _variant_paths_lock:
+            if _variant_paths is None:
+                manifest = load_variants_manifest(variants_manifest_path(dataset_filename))
+                _variant_paths = {
+                    (key, variant): audio_variants_dir / path
+                    for key, variant, path in manifest[["key", "variant", "path"]].itertuples(index=False)
+                }
+    return _variant_paths
+
+
+def variant_audio(row, variant: str):
+    """
+    (bytes, MIME type) of a row's clip in the given variant, or None if the variant
+    has not been built for it (or is "original").
+    """
+    path = get_variant_paths().get((clip_key(row), variant))
+    if path is None:
+        return None
+    data = audio_cache.get(path)
+    metrics.inc("clip_bytes_served", len(data), source=variant)
+    return data, audio_variants[variant].mime
 
-# TODO: Move hardcoded paths and filenames to configs.py
-# Data directory for sample files
-data_dir = Path(__file__).parent.parent / "data" / "sample"
 
 # Play a single syllable
 def play_a_syllable(df: pd.DataFrame, n: int = None, show_character: bool = False, st=None) -> None: 
-    """Play a single syllable audio."""
+    """
+    Play a single syllable audio. With Streamlit, the clip is served in the variant chosen
+    for the session (st.session_state["audio_variant"]) when it has been transcoded,
+    otherwise the original bytes come from the pack or audio_cache.
+    """
     row = df.sample(1).iloc[0] if n is None else df.loc[n]
-    folder_num = int(row["fold"])
-    file_name = row["Name"]
     pinyin_char = row["pinyin"]
-    file_path = data_dir / "TrAT" / f"TrAT-fold{folder_num}" / file_name
+    file_path = clip_path(row)
     if st:
         if show_character:
             st.write(pinyin_char)
-        st.audio(file_path)
+        session = getattr(st, "session_state", {})
+        audio = variant_audio(row, session.get("audio_variant", default_audio_variant))
+        if audio is None:
+            audio = clip_bytes(row), audio_formats.get(file_path.suffix, "audio/wav")
+        st.audio(audio[0], format=audio[1])
     else:
         # Play audio without Streamlit
         os.startfile(file_path)
 
 
+def show_tips(df: pd.DataFrame, n, st, expanded: bool = False) -> None:
+    """Pronunciation tips for the initial and final of the clip at label n, from its precomputed tip codes."""
+    if "initial_tip" not in df.columns:
+        return
+    tips = tips_for(df.at[n, "initial_tip"], df.at[n, "final_tip"])
+    if tips:
+        with st.expander("Pronunciation tips", expanded=expanded):
+            st.markdown("\n\n".join(format_tip(tip) for tip in tips))
+
+
+# Precomputed waveforms and pitch contours, opened on first use if the store has been built
+_contour_store = None
+_contour_store_lock = threading.Lock()
+
+
+def get_contour_store():
+    """Return the shared ContourStore for contour_store_dir, or None if it has not been built."""
+    global _contour_store
+    if _contour_store is None:
+        with _contour_store_lock:
+            if _contour_store is None:
+                _contour_store = open_contour_store(contour_store_dir)
+    return _contour_store
+
+
+# Speaker-normalized contours over the contour store, built on first use
+_speaker_normalizer = None
+_speaker_normalizer_lock = threading.Lock()
+
+
+def get_speaker_normalizer(dataset):
+    """
+    Return the shared SpeakerNormalizer for the contour store, grouping the store's
+    clips by corpus and speaker column of dataset (entries not in dataset form one
+    unnamed group). Returns None if the store has not been built.
+    """
+    global _speaker_normalizer
+    store = get_contour_store()
+    if store is None:
+        return None
+    with _speaker_normalizer_lock:
+        if _speaker_normalizer is None or _speaker_normalizer.store is not store:
+            rows = pd.Index(dataset.keys).get_indexer(store.names)
+            speakers = clip_speakers(dataset.df)
+            _speaker_normalizer = SpeakerNormalizer(store, np.where(rows >= 0, speakers[rows], ""))
+    return _speaker_normalizer
+
+
+# Learner progress database, shared by every session in the process
+_progress_store = None
+_progress_store_lock = threading.Lock()
+
+
+def get_progress_store() -> ProgressStore:
+    """Return the shared ProgressStore for progress_db_filename, creating it on first use."""
+    global _progress_store
+    if _progress_store is None:
+        with _progress_store_lock:
+            if _progress_store is None:
+                _progress_store = ProgressStore(progress_db_filename)
+    return _progress_store
+
+
+# Draw the tone contour of a syllable
+def plot_tone_contour(df: pd.DataFrame, n: int, st) -> None:
+    """Draw the precomputed F0 contour of row n; does nothing if the clip has no stored contour."""
+    store = get_contour_store()
+    entry = store.row_of.get(clip_key(df.loc[n])) if store is not None else None
+    if entry is None:
+        return
+    contour = pd.DataFrame(
+        {"F0 (Hz)": store.contour(entry)},
+        index=pd.Index(store.contour_times(entry), name="Time (s)"),
+    )
+    st.line_chart(contour, x_label="Time (s)", y_label="F0 (Hz)")
+
+
+# Overlay the contours of several clips, normalized by speaker
+def plot_speaker_contours(dataset, rows, st, mode: str = "semitone") -> None:
+    """
+    Draw the speaker-normalized F0 contours of the clips at row positions rows on one chart,
+    one line per speaker. Does nothing if the contour store has not been built.
+    """
+    normalizer = get_speaker_normalizer(dataset)
+    if normalizer is None:
+        return
+    store = normalizer.store
+    speakers = dataset.df["speaker"].to_numpy()[rows]
+    if "corpus" in dataset.df.columns and dataset.df["corpus"].iloc[rows].nunique() > 1:
+        speakers = clip_speakers(dataset.df.iloc[rows])
+    lines = {}
+    for key, speaker in zip(dataset.keys[rows], speakers):
+        entry = store.row_of.get(key)
+        if entry is not None:
+            lines[speaker] = pd.Series(normalizer.contour(entry, mode), index=store.contour_times(entry))
+    if lines:
+        y_label = "Semitones from speaker mean" if mode == "semitone" else "Speaker z-score"
+        st.line_chart(pd.DataFrame(lines).rename_axis("Time (s)"), x_label="Time (s)", y_label=y_label)
+
+
+def clip_audio(row, variant: str = "original"):
+    """
+    (mono samples, sample rate) of a row's clip for playback, decoded at its own rate
+    from the variant when it has been transcoded, otherwise from the original.
+    """
+    audio = variant_audio(row, variant)
+    return read_clip(audio[0] if audio is not None else clip_bytes(row))
+
+
+@lru_cache(maxsize=128)
+def syllable_sprite(dataset, syllable: str, tone_set: bool = False, variant: str = "original") -> Sprite:
+    """
+    Sprite of every speaker's clip of syllable, or of the syllable in all four tones
+    with tone_set, made from the given audio variant. Built once per syllable and
+    variant and kept in an LRU cache.
+    """
+    if tone_set:
+        syllables = [syllable[:-1] + tone for tone in ["1", "2", "3", "4"]]
+        syllables = [s for s in syllables if s in dataset.index.categories["syllable"]]
+    else:
+        syllables = [syllable]
+    rows = np.concatenate([dataset.index.rows(syllable=s) for s in syllables])
+    clips = dataset.df.iloc[rows]
+    labels = [f"{pinyin} by {speaker}" for pinyin, speaker in zip(clips["pinyin"], clips["speaker"])]
+    decoded = [clip_audio(row, variant) for _, row in clips.iterrows()]
+    # A corpus is recorded at one rate; clips at a lower rate are upsampled to the highest
+    sample_rate = max(rate for _, rate in decoded)
+    waveforms = [resample(samples, rate, sample_rate) for samples, rate in decoded]
+    return build_sprite(waveforms, labels, sample_rate)
+
+
+# Keeps the sprite's player, the last <audio> element above this frame on the page, within
+# one segment. st.audio only seeks to whole seconds, so the frame seeks the player to the
+# segment's exact offset and pauses it at the segment's end. The player itself is served
+# once from Streamlit's media endpoint; choosing another segment only replaces this frame.
+segment_seek_html = """
+<script>
+const start = {start}, end = {end};
+const frame = window.frameElement;
+function attach(tries) {{
+    const players = Array.from(window.parent.document.querySelectorAll("audio"))
+        .filter((a) => a.compareDocumentPosition(frame) & Node.DOCUMENT_POSITION_FOLLOWING);
+    const audio = players[players.length - 1];
+    if (!audio) {{
+        if (tries > 0) setTimeout(() => attach(tries - 1), 100);
+        return;
+    }}
+    for (const [type, handler] of audio.segmentHandlers || []) audio.removeEventListener(type, handler);
+    audio.segmentHandlers = [
+        ["play", () => {{ if (audio.currentTime < start || audio.currentTime >= end) audio.currentTime = start; }}],
+        ["timeupdate", () => {{ if (audio.currentTime >= end) {{ audio.pause(); audio.currentTime = start; }} }}],
+    ];
+    for (const [type, handler] of audio.segmentHandlers) audio.addEventListener(type, handler);
+    audio.currentTime = start;
+}}
+attach(20);
+</script>
+"""
+
+
+def play_sprite(sprite: Sprite, st, key: str) -> None:
+    """One audio player for a sprite, with a selector that seeks to a single clip or plays them all."""
+    options = ["All"] + [segment.label for segment in sprite.segments]
+    choice = st.radio("Play:", options, horizontal=True, key=key)
+    st.audio(sprite.data, format=sprite.mime)
+    if choice == "All":
+        start, end = "0", "Infinity"
+    else:
+        segment = sprite.segments[options.index(choice) - 1]
+        start, end = f"{segment.start:.4f}", f"{segment.end:.4f}"
+    seek = segment_seek_html.format(start=start, end=end)
+    if hasattr(st, "iframe"):
+        st.iframe(seek, height=1)  # the frame only runs the script
+    else:  # Streamlit releases before st.iframe
+        import streamlit.components.v1 as components
+        components.html(seek, height=1)
+
+
 # Play multiple speakers for a syllable
-def play_multiple_speakers(df: pd.DataFrame, syll: str = None, st=None) -> None:
-    """Play audio for multiple speakers for a given syllable."""
+def play_multiple_speakers(df: pd.DataFrame, syll: str = None, st=None, index: ClipIndex = None) -> None:
+    """
+    Play audio for multiple speakers for a given syllable.
+    Pass the ClipIndex built over df to look the syllable up without scanning df.
+    """
     if syll is None:
-        syll = random.choice(df["syllable"].unique())
-    matching_indices = df.index[df["syllable"] == syll].tolist()
+        syll = random.choice(index.unique("syllable") if index is not None else df["syllable"].unique())
+    if index is not None:
+        matching_rows = index.rows(syllable=syll)
+    else:
+        matching_rows = np.flatnonzero((df["syllable"] == syll).to_numpy())
 
     if st:
         st.write(f"Playing all speakers for syllable: {syll}")
-    for indx in sorted(matching_indices):
-        speaker = df.loc[indx]["speaker"]
-        pinyin_char = df.loc[indx]["pinyin"]
-        selected_syll = df.loc[indx]["syllable"]
-        
+    matches = df.iloc[matching_rows][["speaker", "pinyin"]]
+    for indx, speaker, pinyin_char in matches.itertuples(name=None):
         if st:
             st.write(f"{pinyin_char} by {speaker}:")
         play_a_syllable(df, indx, show_character=False, st=st) 
 
 # Write a Class to load the dataset, analyse it, and then preprocess it.
 class AudioFileDataset:
-    def __init__(self, df_filename):
-        """Initialize the dataset."""
+    def __init__(self, df_filename, df: pd.DataFrame = None):
+        """Initialize the dataset. Pass df to reuse an already loaded frame."""
 
-        self.df = pd.read_csv(df_filename)
+        self.df = pd.read_csv(df_filename) if df is None else df
         
+    @metrics.timed_function("preprocess")
     def preprocess(self):
         """
         Preprocess the dataset and further analyze.
         Extracts syllable and speaker, splits syllable into initial consonant,
         final vowel, and tone, and generates filtered datasets for each level.
+        Raises ValueError if a clip key occurs twice.
+        """
+        self.keys = clip_keys(self.df)
+        check_unique_keys(pd.Series(self.keys))
+        derive_label_columns(self.df, consonants_ref, vowels_ref, tone_marks, get_pinyin_converter())
+        attach_tip_codes(self.df)
+        self.build_levels()
+
+    def build_levels(self):
         """
-        # Extract syllable and speaker from the 'Name' column
-        self.df[['syllable', 'speaker']] = self.df['Name'].str.extract(r'^(.*?)_(.*?)_')
-
-        # Split 'syllable' column into initial consonant, final vowel, and tone
-        self.df[['initial_consonant', 'final_vowel', 'tone']] = self.df['syllable'].apply(
-            lambda s: pd.Series(split_pinyin_syllable(s, consonants_ref))
-        )
-        # Replace NaN or empty strings in 'consonant' with the zero initial symbol
-        self.df["initial_consonant"] = self.df["initial_consonant"].fillna("").replace(r"^\s*$", "Ø", regex=True)
-
-        # Apply the function to the 'syllable' column and store result in 'pinyin'
-        self.df["pinyin"] = self.df["syllable"].apply(
-            lambda s: pd.Series(ascii_to_pinyin_full(s, tone_marks, vowels_ref))
-        )
-
-        # Convert 'tone' to string for consistency
-        self.df["tone"] = self.df["tone"].astype(str)
-
-        # Generate the dataset for easy, medium, hard, and very hard levels
-        easy_consonants_with_null = ["Ø"] + easy_consonants
-        self.df_easy = self.df[
-            self.df['initial_consonant'].isin(easy_consonants_with_null) |
-            self.df['final_vowel'].isin(easy_vowels)
-        ]
-        self.df_medium = self.df[
-            self.df['initial_consonant'].isin(medium_consonants) |
-            self.df['final_vowel'].isin(medium_vowels)
-        ]
-        self.df_hard = self.df[
-            self.df['initial_consonant'].isin(hard_consonants) |
-            self.df['final_vowel'].isin(hard_vowels)
-        ]
-        self.df_very_hard = self.df[
-            self.df['initial_consonant'].isin(very_hard_consonants) |
-            self.df['final_vowel'].isin(very_hard_vowels)
-        ]
+        Build the clip index and the posting lists for easy, medium, hard, and very hard levels.
+        A clip belongs to a level if its initial consonant or its final vowel is in that level.
+        """
+        self.index = ClipIndex(self.df, columns=index_columns + ["fold"])
+        self.index.add_postings("level", {
+            level: np.union1d(
+                self.index.posting("initial_consonant", consonants),
+                self.index.posting("final_vowel", vowels),
+            )
+            for level, (consonants, vowels) in level_definitions.items()
+        })
+
+    @cached_property
+    def keys(self) -> np.ndarray:
+        """clip_key() of every row, in row order (built on first use)."""
+        return clip_keys(self.df)
+
+    def level_rows(self, level: str = None) -> np.ndarray:
+        """Row positions of the clips in a level (all clips if level is None)."""
+        return self.index.rows() if level is None else self.index.posting("level", level)
+
+    def syllables(self, level: str = None) -> list:
+        """Sorted syllables available in a level (all levels if None)."""
+        return self.index.unique("syllable", None if level is None else self.level_rows(level))
+
+    # Level subsets are taken from the index on access instead of being stored as copies
+    @property
+    def df_easy(self) -> pd.DataFrame:
+        return self.df.iloc[self.level_rows("easy")]
+
+    @property
+    def df_medium(self) -> pd.DataFrame:
+        return self.df.iloc[self.level_rows("medium")]
+
+    @property
+    def df_hard(self) -> pd.DataFrame:
+        return self.df.iloc[self.level_rows("hard")]
+
+    @property
+    def df_very_hard(self) -> pd.DataFrame:
+        return self.df.iloc[self.level_rows("very_hard")]
+
+
+# Process-wide cache of preprocessed datasets: label file -> (stat key, content hash, dataset)
+_dataset_cache = {}
+_dataset_cache_lock = threading.Lock()
+
+
+@metrics.timed_function("dataset_load")
+def load_dataset(df_filename=dataset_filename, artifact_filename=None) -> AudioFileDataset:
+    """
+    Return the preprocessed dataset for a label file, building it at most once per process.
+
+    The preprocessed columns are persisted as a compiled artifact next to the label file
+    (``<stem>_processed.npz`` unless artifact_filename is given), keyed on the SHA-256 of
+    the label CSV and the tip files. A missing or stale artifact is rebuilt with preprocess() and saved.
+    Later calls in the same process only stat the label file, and re-hash it if it changed.
+    """
+    df_filename = Path(df_filename)
+    if artifact_filename is None:
+        artifact_filename = df_filename.with_name(f"{df_filename.stem}_processed.npz")
+    stat = df_filename.stat()
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    cache_key = str(df_filename.resolve())
+
+    with _dataset_cache_lock:
+        cached = _dataset_cache.get(cache_key)
+        if cached is not None and cached[0] == stat_key:
+            return cached[2]
+
+        source_hash = file_sha256(df_filename) + tip_files_hash()
+        if cached is not None and cached[1] == source_hash:
+            _dataset_cache[cache_key] = (stat_key, source_hash, cached[2])
+            return cached[2]
+
+        df = load_artifact(artifact_filename, source_hash)
+        if df is not None:
+            dataset = AudioFileDataset(df_filename, df=df)
+            dataset.build_levels()
+        else:
+            dataset = AudioFileDataset(df_filename)
+            dataset.preprocess()
+            try:
+                save_artifact(dataset.df, artifact_filename, source_hash)
+            except OSError:
+                pass  # Read-only data volume: keep serving the in-memory copy
+
+        _dataset_cache[cache_key] = (stat_key, source_hash, dataset)
+        return dataset
+
+
+def load_corpus_dataset(sources=None, shard_dir=corpus_shard_dir, folds=None) -> AudioFileDataset:
+    """
+    Return the dataset merged from several corpora (configs.corpora by default, else the
+    TrAT sample), restricted to folds if given. The corpora are ingested into fold shards
+    when missing or stale, and only the shards of the requested folds are loaded; with
+    folds=None every shard is loaded and concatenated into one in-memory frame.
+    Built at most once per process for each set of sources and folds.
+    """
+    if sources is None:
+        sources = parse_corpora(corpora) or [CorpusSource("TrAT", dataset_filename, data_dir / "TrAT")]
+    with _dataset_cache_lock:
+        corpus = open_corpus(sources, shard_dir)
+        cache_key = ("corpus", str(Path(shard_dir).resolve()), None if folds is None else tuple(folds))
+        cached = _dataset_cache.get(cache_key)
+        if cached is not None and cached[1] == corpus.source_hash:
+            return cached[2]
+        dataset = AudioFileDataset(shard_dir, df=corpus.query(fold=folds))
+        dataset.build_levels()
+        _dataset_cache[cache_key] = (None, corpus.source_hash, dataset)
+        return dataset
+
+
+def load_app_dataset() -> AudioFileDataset:
+    """
+    The dataset the apps serve: the corpora of configs.corpora if set, else the TrAT sample.
+    The corpora are loaded whole, since every level and Shuffle draw from all their rows,
+    unless configs.corpus_folds restricts them to some folds.
+    """
+    return load_corpus_dataset(folds=corpus_folds or None) if corpora else load_dataset(dataset_filename)
+
+
+# Warm-up specs already started in this process
+_warmed_up = set()
+_warm_up_lock = threading.Lock()
+
+
+def preload_clips(dataset: AudioFileDataset, level: str = None, fold: int = None,
+                  max_workers: int = audio_warmup_workers) -> int:
+    """
+    Load the clips of a level and/or a fold into audio_cache with a thread pool.
+    Clips in the audio pack are prefetched into the page cache instead.
+    Returns the number of files read from disk.
+    """
+    criteria = {}
+    if level is not None:
+        criteria["level"] = level
+    if fold is not None:
+        criteria["fold"] = int(fold)
+    rows = dataset.index.rows(**criteria)
+    columns = [c for c in ["fold", "Name", "corpus", "audio_dir"] if c in dataset.df.columns]
+    records = dataset.df.iloc[rows][columns].to_dict("records")
+    pack = get_audio_pack()
+    if pack is not None:
+        # Packed clips only need their pages faulted in
+        pack.prefetch(clip_key(r) for r in records)
+        records = [r for r in records if clip_key(r) not in pack]
+    return audio_cache.warm_up([clip_path(r) for r in records], max_workers=max_workers)
+
+
+def warm_up_audio(dataset: AudioFileDataset, spec: str = audio_warmup, background: bool = True) -> None:
+    """
+    Preload the clips named by spec, once per process.
+    spec is a comma-separated list of levels ("easy", "very_hard"), folds ("fold2") or "all".
+    With background=True the preload runs in a daemon thread so the first render is not delayed.
+    """
+    parts = [part.strip().lower() for part in spec.split(",") if part.strip()]
+    with _warm_up_lock:
+        parts = [part for part in parts if part not in _warmed_up]
+        _warmed_up.update(parts)
+    if not parts:
+        return
+
+    def run():
+        for part in parts:
+            if part == "all":
+                preload_clips(dataset)
+            elif part.startswith("fold"):
+                preload_clips(dataset, fold=int(part[len("fold"):]))
+            else:
+                preload_clips(dataset, level=part)
+
+    if background:
+        threading.Thread(target=run, name="audio-warm-up", daemon=True).start()
+    else:
+        run()
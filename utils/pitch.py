@@ -0,0 +1,147 @@
+"""
+Audio decoding and vectorized pitch (F0) tracking for the TrAT clips.
+
+Decoding uses the optional ``soundfile`` package (libsndfile >= 1.1 reads both the
+MP3 and the WAV folds). Without it, only WAV clips can be decoded, via the standard
+library ``wave`` module.
+"""
+import io
+import wave
+from pathlib import Path
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:  # optional dependency
+    soundfile = None
+
+# Analysis settings shared by the contour store, speaking practice and embeddings
+analysis_sample_rate = 16000
+frame_length = 512      # YIN integration window (32 ms at 16 kHz)
+hop_length = 160        # 10 ms between frames
+f0_min = 60.0
+f0_max = 500.0
+
+
+def _read_wav(source):
+    """Decode 8/16/32-bit PCM WAV with the standard library. Returns (samples, sample_rate)."""
+    with wave.open(source, "rb") as wav:
+        sample_rate = wav.getframerate()
+        n_channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float32) / float(np.iinfo(dtype).max)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    return samples.reshape(-1, n_channels), sample_rate
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resample a mono signal by linear interpolation. When downsampling, a moving-average
+    filter as wide as the rate ratio is applied first to limit aliasing; this is
+    adequate for pitch tracking, not for playback.
+    """
+    if sample_rate == target_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+    ratio = sample_rate / target_rate
+    if ratio > 1:
+        width = int(round(ratio))
+        if width > 1:
+            samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    n_out = int(len(samples) / ratio)
+    positions = np.arange(n_out, dtype=np.float64) * ratio
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def read_clip(source):
+    """
+    Decode a clip (path, bytes or file-like) to mono float32 at its own sample rate.
+    Returns (samples, sample_rate).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if soundfile is not None:
+        samples, sample_rate = soundfile.read(source, dtype="float32", always_2d=True)
+    else:
+        is_wav = Path(source).suffix.lower() == ".wav" if isinstance(source, (str, Path)) else True
+        if not is_wav:
+            raise RuntimeError("Decoding MP3 clips requires the 'soundfile' package.")
+        samples, sample_rate = _read_wav(str(source) if isinstance(source, Path) else source)
+    return samples.mean(axis=1), sample_rate
+
+
+def decode_clip(source, target_rate: int = analysis_sample_rate) -> np.ndarray:
+    """
+    Decode a clip (path, bytes or file-like) to mono float32 at target_rate.
+    """
+    samples, sample_rate = read_clip(source)
+    return resample(samples, sample_rate, target_rate)
+
+
+def frame_signal(samples: np.ndarray, length: int, hop: int) -> np.ndarray:
+    """Strided (n_frames, length) view of samples; the tail that does not fill a frame is dropped."""
+    if len(samples) < length:
+        return np.empty((0, length), dtype=samples.dtype)
+    return np.lib.stride_tricks.sliding_window_view(samples, length)[::hop]
+
+
+def yin_frames(frames: np.ndarray, sample_rate: int = analysis_sample_rate,
+               window: int = frame_length, fmin: float = f0_min, fmax: float = f0_max,
+               threshold: float = 0.15, silence_rms: float = 0.01) -> np.ndarray:
+    """
+    YIN pitch estimate for each row of frames, computed for all frames at once.
+    Each frame must hold window + sample_rate / fmin samples. Returns F0 in Hz per
+    frame, with NaN for unvoiced or silent frames.
+    """
+    n_frames, n = frames.shape
+    tau_min = int(sample_rate / fmax)
+    tau_max = min(int(sample_rate / fmin), n - window)
+    if n_frames == 0 or tau_max <= tau_min + 1:
+        return np.full(n_frames, np.nan, dtype=np.float32)
+    x = frames.astype(np.float64)
+
+    # Difference function d(tau) = E(0) + E(tau) - 2 * r(tau), with the cross term from an FFT
+    size = 1 << int(np.ceil(np.log2(n + window)))
+    spec = np.fft.rfft(x, size, axis=1) * np.conj(np.fft.rfft(x[:, :window], size, axis=1))
+    acf = np.fft.irfft(spec, size, axis=1)[:, :tau_max + 1]
+    sq = np.concatenate((np.zeros((n_frames, 1)), np.cumsum(x * x, axis=1)), axis=1)
+    taus = np.arange(tau_max + 1)
+    energy = sq[:, taus + window] - sq[:, taus]
+    diff = np.maximum(energy[:, :1] + energy - 2.0 * acf, 0.0)
+
+    # Cumulative mean normalized difference
+    cumulative = np.cumsum(diff[:, 1:], axis=1)
+    cmnd = np.ones_like(diff)
+    cmnd[:, 1:] = diff[:, 1:] * taus[1:] / np.where(cumulative > 0, cumulative, 1.0)
+
+    # First dip below threshold that is also a local minimum
+    search = cmnd[:, tau_min:tau_max]
+    candidates = (search < threshold) & (search <= cmnd[:, tau_min + 1:tau_max + 1])
+    voiced = candidates.any(axis=1)
+    tau = tau_min + candidates.argmax(axis=1)
+
+    # Parabolic interpolation around the chosen lag
+    rows = np.arange(n_frames)
+    left = cmnd[rows, np.maximum(tau - 1, 0)]
+    centre = cmnd[rows, tau]
+    right = cmnd[rows, np.minimum(tau + 1, tau_max)]
+    denom = left - 2.0 * centre + right
+    shift = np.where(np.abs(denom) > 1e-12, 0.5 * (left - right) / np.where(denom == 0, 1.0, denom), 0.0)
+    period = tau + np.clip(shift, -1.0, 1.0)
+
+    rms = np.sqrt(sq[:, window] / window)
+    f0 = np.where(voiced & (rms >= silence_rms), sample_rate / period, np.nan)
+    return f0.astype(np.float32)
+
+
+def pitch_contour(samples: np.ndarray, sample_rate: int = analysis_sample_rate,
+                  hop: int = hop_length, fmin: float = f0_min, fmax: float = f0_max) -> np.ndarray:
+    """F0 contour of a mono signal, one value every hop samples (NaN where unvoiced)."""
+    length = frame_length + int(sample_rate / fmin) + 1
+    frames = frame_signal(samples, length, hop)
+    return yin_frames(frames, sample_rate, frame_length, fmin, fmax)
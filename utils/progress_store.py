@@ -0,0 +1,273 @@
+"""
+Learner progress stored in a local SQLite database (WAL mode).
+
+Attempts are queued in-process and written in batches by a background thread, so
+callers on the Streamlit script thread never wait on disk. Each batch also updates
+per-syllable and per-level aggregate tables, which dashboards read directly instead
+of re-aggregating the raw attempts. The learners' spaced-repetition states (see
+utils.scheduler) are saved through the same writer, one row per learner, queue and item;
+until a state is written, reads of that queue return it from memory.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple
+
+_schema = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    clip_row INTEGER NOT NULL,
+    syllable TEXT NOT NULL,
+    level TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_user ON attempts (user_id, created_at);
+CREATE TABLE IF NOT EXISTS syllable_stats (
+    user_id TEXT NOT NULL,
+    syllable TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    total_latency_ms REAL NOT NULL,
+    last_attempt_at REAL NOT NULL,
+    PRIMARY KEY (user_id, syllable)
+);
+CREATE TABLE IF NOT EXISTS level_stats (
+    user_id TEXT NOT NULL,
+    level TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    total_latency_ms REAL NOT NULL,
+    last_attempt_at REAL NOT NULL,
+    PRIMARY KEY (user_id, level)
+);
+CREATE TABLE IF NOT EXISTS review_states (
+    user_id TEXT NOT NULL,
+    queue TEXT NOT NULL,
+    item TEXT NOT NULL,
+    easiness REAL NOT NULL,
+    interval_days REAL NOT NULL,
+    repetitions INTEGER NOT NULL,
+    due_at REAL NOT NULL,
+    PRIMARY KEY (user_id, queue, item)
+);
+"""
+
+_upsert_review_state = """
+INSERT INTO review_states (user_id, queue, item, easiness, interval_days, repetitions, due_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, queue, item) DO UPDATE SET
+    easiness = excluded.easiness,
+    interval_days = excluded.interval_days,
+    repetitions = excluded.repetitions,
+    due_at = excluded.due_at
+"""
+
+_upsert_stats = """
+INSERT INTO {table} (user_id, {key}, attempts, correct, total_latency_ms, last_attempt_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, {key}) DO UPDATE SET
+    attempts = attempts + excluded.attempts,
+    correct = correct + excluded.correct,
+    total_latency_ms = total_latency_ms + excluded.total_latency_ms,
+    last_attempt_at = MAX(last_attempt_at, excluded.last_attempt_at)
+"""
+
+_summary_columns = ["attempts", "correct", "accuracy", "mean_latency_ms", "last_attempt_at"]
+
+
+class _ReviewStates(NamedTuple):
+    rows: list      # (user_id, queue, item, easiness, interval_days, repetitions, due_at)
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    """Open a connection in WAL mode with a busy timeout for concurrent processes."""
+    connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class ProgressStore:
+    def __init__(self, db_path, batch_size: int = 500, flush_interval: float = 0.5):
+        """
+        Open (or create) the database at db_path and start the writer thread.
+        Queued attempts are written when batch_size of them are waiting, or
+        flush_interval seconds after the first one arrived.
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        # (user_id, queue, item) -> latest queued review state row the writer has not written yet
+        self._pending_states = {}
+        self._pending_lock = threading.Lock()
+        with _connect(self.db_path) as connection:
+            connection.executescript(_schema)
+        connection.close()
+        self._writer = threading.Thread(target=self._write_loop, name="progress-writer", daemon=True)
+        self._writer.start()
+        # Write whatever is still queued when the process exits
+        atexit.register(self.close, timeout=5)
+
+    def record_attempt(self, user_id: str, clip_row: int, syllable: str, level: str,
+                       answer: str, correct: bool, latency_ms: float, created_at: float = None) -> None:
+        """Queue one attempt; returns immediately."""
+        self._queue.put((
+            user_id, int(clip_row), syllable, level or "shuffle", answer,
+            int(bool(correct)), float(latency_ms), time.time() if created_at is None else created_at,
+        ))
+
+    def save_review_states(self, user_id: str, queue_name: str, records) -> None:
+        """
+        Queue the spaced-repetition states of a learner's queue, as the
+        (item, easiness, interval_days, repetitions, due_at) records of
+        Scheduler.to_records(); returns immediately. Saved items are overwritten.
+        """
+        rows = [(user_id, queue_name, str(item)) + tuple(state) for item, *state in records]
+        with self._pending_lock:
+            for row in rows:
+                self._pending_states[row[:3]] = row
+        self._queue.put(_ReviewStates(rows))
+
+    def review_states(self, user_id: str, queue_name: str) -> list:
+        """
+        Saved (item, easiness, interval_days, repetitions, due_at) records of a learner's
+        queue, including states still queued for the writer; does not wait for it.
+        """
+        # Queued states are dropped from memory only after they are committed, so taking
+        # them before reading the table misses none
+        with self._pending_lock:
+            pending = [row[2:] for key, row in self._pending_states.items() if key[:2] == (user_id, queue_name)]
+        records = {row[0]: row for row in self._reader().execute(
+            "SELECT item, easiness, interval_days, repetitions, due_at FROM review_states "
+            "WHERE user_id = ? AND queue = ?",
+            (user_id, queue_name),
+        )}
+        records.update((row[0], row) for row in pending)
+        return [records[item] for item in sorted(records)]
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything queued so far is written. Returns False on timeout."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = None) -> None:
+        """Write what is queued and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+
+    def _write_loop(self) -> None:
+        """Writer thread: drain the queue into batches and write each in one transaction."""
+        connection = _connect(self.db_path)
+        running = True
+        while running:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write_batch(connection, batch)
+                except sqlite3.Error as exc:
+                    # Keep the writer alive; the failed batch is dropped and reported here
+                    self.last_error = exc
+                self._forget_states(batch)
+            for waiter in waiters:
+                waiter.set()
+        connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch: list) -> None:
+        """Insert a batch of attempts, fold it into the aggregate tables and save review states."""
+        states = [row for item in batch if isinstance(item, _ReviewStates) for row in item.rows]
+        batch = [item for item in batch if not isinstance(item, _ReviewStates)]
+        syllable_totals = defaultdict(lambda: [0, 0, 0.0, 0.0])
+        level_totals = defaultdict(lambda: [0, 0, 0.0, 0.0])
+        for user_id, _, syllable, level, _, correct, latency_ms, created_at in batch:
+            for totals in (syllable_totals[(user_id, syllable)], level_totals[(user_id, level)]):
+                totals[0] += 1
+                totals[1] += correct
+                totals[2] += latency_ms
+                totals[3] = max(totals[3], created_at)
+        with connection:
+            connection.executemany(
+                "INSERT INTO attempts (user_id, clip_row, syllable, level, answer, correct, latency_ms, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            connection.executemany(
+                _upsert_stats.format(table="syllable_stats", key="syllable"),
+                [key + tuple(totals) for key, totals in syllable_totals.items()],
+            )
+            connection.executemany(
+                _upsert_stats.format(table="level_stats", key="level"),
+                [key + tuple(totals) for key, totals in level_totals.items()],
+            )
+            # In queue order, so the latest state of an item wins
+            connection.executemany(_upsert_review_state, states)
+        self.written += len(batch)
+
+    def _forget_states(self, batch: list) -> None:
+        """Drop the review states of a processed batch from memory, unless saved again since."""
+        with self._pending_lock:
+            for item in batch:
+                if isinstance(item, _ReviewStates):
+                    for row in item.rows:
+                        if self._pending_states.get(row[:3]) is row:
+                            del self._pending_states[row[:3]]
+
+    def _reader(self) -> sqlite3.Connection:
+        """Per-thread read connection; WAL lets it read while the writer commits."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = _connect(self.db_path)
+        return connection
+
+    def _summary(self, table: str, key: str, user_id: str) -> list:
+        rows = self._reader().execute(
+            f"SELECT {key}, attempts, correct, CAST(correct AS REAL) / attempts, "
+            f"total_latency_ms / attempts, last_attempt_at FROM {table} WHERE user_id = ? ORDER BY {key}",
+            (user_id,),
+        ).fetchall()
+        return [dict(zip([key] + _summary_columns, row)) for row in rows]
+
+    def syllable_summary(self, user_id: str) -> list:
+        """Per-syllable attempts, correct answers, accuracy and mean latency for a learner."""
+        return self._summary("syllable_stats", "syllable", user_id)
+
+    def level_summary(self, user_id: str) -> list:
+        """Per-level attempts, correct answers, accuracy and mean latency for a learner."""
+        return self._summary("level_stats", "level", user_id)
+
+    def attempts(self, user_id: str = None) -> list:
+        """Raw attempts as tuples (user_id, clip_row, syllable, level, answer, correct, latency_ms, created_at)."""
+        query = "SELECT user_id, clip_row, syllable, level, answer, correct, latency_ms, created_at FROM attempts"
+        if user_id is None:
+            return self._reader().execute(query + " ORDER BY id").fetchall()
+        return self._reader().execute(query + " WHERE user_id = ? ORDER BY id", (user_id,)).fetchall()
@@ -43,3 +43,35 @@ tone_marks = {
     'u': ['u', 'ū', 'ú', 'ǔ', 'ù'],
     'ü': ['ü', 'ǖ', 'ǘ', 'ǚ', 'ǜ']
 }
+
+
+# Groups of initials that learners commonly confuse; used to build minimal-pair distractors
+confusable_consonants = [
+    ["zh", "z", "j"],
+    ["ch", "c", "q"],
+    ["sh", "s", "x"],
+    ["r", "l"],
+    ["n", "l"],
+    ["b", "p"],
+    ["d", "t"],
+    ["g", "k"],
+    ["f", "h"],
+]
+
+# Groups of finals that learners commonly confuse
+confusable_vowels = [
+    ["an", "ang"],
+    ["en", "eng"],
+    ["in", "ing"],
+    ["ian", "iang"],
+    ["uan", "uang"],
+    ["u", "ü"],
+    ["un", "ün"],
+    ["uan", "üan"],
+    ["ie", "üe"],
+    ["ai", "ei"],
+    ["ou", "uo"],
+    ["iu", "ou"],
+    ["ui", "ei"],
+    ["ong", "iong"],
+]
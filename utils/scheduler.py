@@ -0,0 +1,138 @@
+"""
+Spaced-repetition scheduling (SM-2) with a heap-based due queue.
+
+Items are any hashable keys: ASCII syllables ("zhi3") for syllable+tone drills, or
+clip row positions for clip drills. Due items are kept in a min-heap ordered by due
+time, so picking the next item and rescheduling one item are O(log n). Superseded
+heap entries are skipped lazily when they reach the top.
+"""
+import heapq
+import time
+from typing import NamedTuple
+
+seconds_per_day = 86400.0
+
+
+class ReviewState(NamedTuple):
+    easiness: float = 2.5
+    interval_days: float = 0.0
+    repetitions: int = 0
+    due_at: float = 0.0
+
+
+def sm2_update(state: ReviewState, quality: int, now: float, relearn_delay: float = 60.0) -> ReviewState:
+    """
+    Apply one SM-2 review graded quality (0-5) at time now.
+    A failed review (quality < 3) restarts the item and brings it back after
+    relearn_delay seconds, so it is drilled again in the same session.
+    """
+    quality = max(0, min(5, int(quality)))
+    easiness = max(1.3, state.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ReviewState(easiness, 0.0, 0, now + relearn_delay)
+    repetitions = state.repetitions + 1
+    if repetitions == 1:
+        interval = 1.0
+    elif repetitions == 2:
+        interval = 6.0
+    else:
+        interval = state.interval_days * easiness
+    return ReviewState(easiness, interval, repetitions, now + interval * seconds_per_day)
+
+
+class Scheduler:
+    def __init__(self, items, now: float = None, relearn_delay: float = 60.0):
+        """Schedule items, all new and due at now, to be introduced in the given order."""
+        self.relearn_delay = relearn_delay
+        self.states = {}
+        self._heap = []
+        self._seq = 0
+        # Sequence number of each item's live heap entry; older entries are stale
+        self._live = {}
+        self.add(items, now)
+
+    def add(self, items, now: float = None) -> None:
+        """Schedule the items not scheduled yet as new, due at now, in the given order."""
+        now = time.time() if now is None else now
+        for item in items:
+            if item not in self.states:
+                self.states[item] = ReviewState(due_at=now)
+                self._heap.append((now, self._next_seq(item), item))
+        heapq.heapify(self._heap)
+
+    def _next_seq(self, item) -> int:
+        """
+        Sequence number for a new heap entry of item. It also breaks ties in insertion
+        order among items due at the same time.
+        """
+        self._seq += 1
+        self._live[item] = self._seq
+        return self._seq
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def _top(self):
+        """Drop superseded entries from the top of the heap and return the live one, if any."""
+        while self._heap:
+            _, seq, item = self._heap[0]
+            if self._live[item] == seq:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    def next_item(self, now: float = None):
+        """The most overdue item, or None if nothing is due at now."""
+        now = time.time() if now is None else now
+        top = self._top()
+        return top[2] if top is not None and top[0] <= now else None
+
+    def next_due_at(self):
+        """Due time of the earliest item, or None if the scheduler is empty."""
+        top = self._top()
+        return top[0] if top is not None else None
+
+    def review(self, item, quality: int, now: float = None) -> ReviewState:
+        """Grade one item and push its new due time onto the heap."""
+        now = time.time() if now is None else now
+        state = sm2_update(self.states[item], quality, now, self.relearn_delay)
+        self.states[item] = state
+        heapq.heappush(self._heap, (state.due_at, self._next_seq(item), item))
+        # Superseded entries are skipped lazily; compact once they dominate the heap
+        if len(self._heap) > 2 * len(self.states) + 64:
+            self._rebuild()
+        return state
+
+    def bulk_reschedule(self, results, now: float = None) -> None:
+        """
+        Apply many (item, quality) grades at once, e.g. the answers of a finished test,
+        then rebuild the heap in O(n) instead of pushing each item.
+        """
+        now = time.time() if now is None else now
+        for item, quality in results:
+            if item in self.states:
+                self.states[item] = sm2_update(self.states[item], quality, now, self.relearn_delay)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Recreate the heap from the current states, dropping superseded entries."""
+        self._heap = [(state.due_at, self._next_seq(item), item) for item, state in self.states.items()]
+        heapq.heapify(self._heap)
+
+    def due_count(self, now: float = None) -> int:
+        """Number of items due at now (O(n); for display, not for picking items)."""
+        now = time.time() if now is None else now
+        return sum(state.due_at <= now for state in self.states.values())
+
+    def to_records(self) -> list:
+        """Serializable (item, easiness, interval_days, repetitions, due_at) tuples."""
+        return [(item,) + tuple(state) for item, state in self.states.items()]
+
+    @classmethod
+    def from_records(cls, records, relearn_delay: float = 60.0) -> "Scheduler":
+        """Rebuild a scheduler saved with to_records."""
+        scheduler = cls([], relearn_delay=relearn_delay)
+        for item, *state in records:
+            scheduler.states[item] = ReviewState(*state)
+        scheduler._rebuild()
+        return scheduler
@@ -0,0 +1,230 @@
+"""
+Per-speaker pitch statistics and speaker-normalized F0 contours.
+
+The six TrAT speakers have very different pitch ranges, so contours are compared
+in semitones relative to the speaker (log scale, so a rise means the same thing
+for a low and a high voice):
+    - semitone: semitones above or below the speaker's mean pitch
+    - zscore: the same, divided by the speaker's standard deviation
+
+Statistics are kept as running sums (count, sum, sum of squares, min, max) of the
+voiced frames' pitch in semitones, so they can be built for the whole ContourStore
+in one bincount pass and then updated clip by clip without revisiting the corpus.
+They are cached next to the store together with the clips they count (clip key,
+source mtime/size and speaker): when the store gains clips, only the new ones are
+added; when a counted clip changed, moved to another speaker or was removed, the
+statistics are rebuilt from all frames.
+
+Print the statistics of the app's contour store with:
+    python -m utils.speaker_norm
+"""
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from utils.utils import atomic_write
+
+# Pitch in semitones is measured from this frequency
+reference_hz = 100.0
+normalization_modes = ["semitone", "zscore"]
+
+
+def hz_to_semitones(f0: np.ndarray) -> np.ndarray:
+    """Semitones above reference_hz; NaN (unvoiced) stays NaN."""
+    return 12.0 * np.log2(np.asarray(f0, dtype=np.float64) / reference_hz)
+
+
+class SpeakerStats:
+    def __init__(self, speakers, count=None, total=None, total_sq=None, minimum=None, maximum=None,
+                 clips=None):
+        """
+        Running pitch statistics (in semitones) per speaker; empty unless arrays are given.
+        clips lists the clips counted, one row per clip key with its source mtime, size and
+        speaker; it is kept up to date by the caller and saved with the statistics.
+        """
+        self.speakers = list(speakers)
+        self.clips = clips if clips is not None else pd.DataFrame(
+            {"mtime": np.empty(0, np.int64), "size": np.empty(0, np.int64), "speaker": np.empty(0, str)},
+            index=pd.Index([], dtype=object, name="key"))
+        n = len(self.speakers)
+        self.count = np.zeros(n, dtype=np.int64) if count is None else np.asarray(count, dtype=np.int64)
+        self.total = np.zeros(n) if total is None else np.asarray(total, dtype=np.float64)
+        self.total_sq = np.zeros(n) if total_sq is None else np.asarray(total_sq, dtype=np.float64)
+        self.minimum = np.full(n, np.inf) if minimum is None else np.asarray(minimum, dtype=np.float64)
+        self.maximum = np.full(n, -np.inf) if maximum is None else np.asarray(maximum, dtype=np.float64)
+        self.code_of = {speaker: i for i, speaker in enumerate(self.speakers)}
+
+    @classmethod
+    def from_frames(cls, f0: np.ndarray, speaker_codes: np.ndarray, speakers) -> "SpeakerStats":
+        """Statistics of all frames at once; speaker_codes[i] indexes speakers for frame f0[i]."""
+        semitones = hz_to_semitones(f0)
+        voiced = ~np.isnan(semitones)
+        semitones, codes = semitones[voiced], np.asarray(speaker_codes)[voiced]
+        n = len(speakers)
+        stats = cls(
+            speakers,
+            count=np.bincount(codes, minlength=n),
+            total=np.bincount(codes, weights=semitones, minlength=n),
+            total_sq=np.bincount(codes, weights=semitones * semitones, minlength=n),
+        )
+        np.minimum.at(stats.minimum, codes, semitones)
+        np.maximum.at(stats.maximum, codes, semitones)
+        return stats
+
+    def update(self, speaker: str, f0: np.ndarray) -> None:
+        """Add the voiced frames of one more clip by speaker (a new speaker is added)."""
+        if speaker not in self.code_of:
+            self.code_of[speaker] = len(self.speakers)
+            self.speakers.append(speaker)
+            self.count = np.append(self.count, 0)
+            self.total = np.append(self.total, 0.0)
+            self.total_sq = np.append(self.total_sq, 0.0)
+            self.minimum = np.append(self.minimum, np.inf)
+            self.maximum = np.append(self.maximum, -np.inf)
+        semitones = hz_to_semitones(f0)
+        semitones = semitones[~np.isnan(semitones)]
+        if len(semitones) == 0:
+            return
+        code = self.code_of[speaker]
+        self.count[code] += len(semitones)
+        self.total[code] += semitones.sum()
+        self.total_sq[code] += (semitones * semitones).sum()
+        self.minimum[code] = min(self.minimum[code], semitones.min())
+        self.maximum[code] = max(self.maximum[code], semitones.max())
+
+    @property
+    def mean(self) -> np.ndarray:
+        """Mean pitch per speaker, in semitones above reference_hz."""
+        return self.total / np.maximum(self.count, 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        """Standard deviation of pitch per speaker, in semitones."""
+        variance = self.total_sq / np.maximum(self.count, 1) - self.mean ** 2
+        return np.sqrt(np.maximum(variance, 0.0))
+
+    def table(self) -> pd.DataFrame:
+        """One row per speaker: voiced frames, mean pitch (Hz), std and range (semitones)."""
+        return pd.DataFrame({
+            "speaker": self.speakers,
+            "frames": self.count,
+            "mean_hz": (reference_hz * 2.0 ** (self.mean / 12.0)).round(1),
+            "std_semitones": self.std.round(2),
+            "min_hz": (reference_hz * 2.0 ** (self.minimum / 12.0)).round(1),
+            "max_hz": (reference_hz * 2.0 ** (self.maximum / 12.0)).round(1),
+            "range_semitones": (self.maximum - self.minimum).round(2),
+        })
+
+    def save(self, path) -> None:
+        """Write the statistics and the clips they count to an .npz file atomically."""
+        path = Path(path)
+        atomic_write(path, lambda f: np.savez(
+            f, speakers=np.array(self.speakers, dtype=str), count=self.count, total=self.total,
+            total_sq=self.total_sq, minimum=self.minimum, maximum=self.maximum,
+            clip_keys=self.clips.index.to_numpy(dtype=str), clip_mtimes=self.clips["mtime"].to_numpy(),
+            clip_sizes=self.clips["size"].to_numpy(), clip_speakers=self.clips["speaker"].to_numpy(dtype=str)))
+
+    @classmethod
+    def load(cls, path) -> "SpeakerStats":
+        """Statistics saved at path, or None if missing or in an older format."""
+        if not Path(path).exists():
+            return None
+        with np.load(path, allow_pickle=False) as saved:
+            if "clip_keys" not in saved.files:
+                return None
+            clips = pd.DataFrame(
+                {"mtime": saved["clip_mtimes"], "size": saved["clip_sizes"],
+                 "speaker": saved["clip_speakers"].astype(object)},
+                index=pd.Index(saved["clip_keys"].astype(object), name="key"),
+            )
+            return cls(saved["speakers"].tolist(), saved["count"], saved["total"], saved["total_sq"],
+                       saved["minimum"], saved["maximum"], clips)
+
+
+def _normalize(semitones: np.ndarray, mean, std, mode: str) -> np.ndarray:
+    """Apply a normalization mode given the speaker mean and std (scalars or per-frame arrays)."""
+    if mode == "semitone":
+        return semitones - mean
+    if mode == "zscore":
+        return (semitones - mean) / np.where(std > 0, std, 1.0)
+    raise ValueError(f"Unknown normalization mode {mode!r}; expected one of {normalization_modes}")
+
+
+def _added_entries(stats: SpeakerStats, clips: pd.DataFrame) -> np.ndarray:
+    """
+    Positions in clips of the clips stats does not count yet, or None if a clip it counts
+    is no longer in clips or has another mtime, size or speaker there.
+    """
+    counted = stats.clips
+    positions = clips.index.get_indexer(counted.index)
+    if (positions < 0).any():
+        return None
+    current = clips.iloc[positions]
+    if not ((current["mtime"].to_numpy() == counted["mtime"].to_numpy()).all()
+            and (current["size"].to_numpy() == counted["size"].to_numpy()).all()
+            and (current["speaker"].to_numpy() == counted["speaker"].to_numpy()).all()):
+        return None
+    return np.setdiff1d(np.arange(len(clips)), positions)
+
+
+class SpeakerNormalizer:
+    def __init__(self, store, entry_speakers):
+        """
+        Speaker-normalized contours for every entry of a ContourStore.
+        entry_speakers[i] is the speaker of store entry i. Statistics cached in the store
+        directory are reused and updated with the clips added since; they are rebuilt
+        from all frames if a counted clip changed or is gone.
+        """
+        self.store = store
+        speakers, codes = np.unique(np.asarray(entry_speakers, dtype=str), return_inverse=True)
+        lengths = np.diff(store.contour_offsets)
+        # Speaker code of every frame in the store's flat contour column
+        self._frame_codes = np.repeat(codes, lengths)
+        self._normalized = {}
+
+        clips = pd.DataFrame(
+            {"mtime": np.asarray(store.mtimes), "size": np.asarray(store.sizes),
+             "speaker": speakers[codes].astype(object)},
+            index=pd.Index(store.names, dtype=object, name="key"),
+        )
+        stats_path = store.store_dir / "speaker_stats.npz"
+        self.stats = SpeakerStats.load(stats_path)
+        added = _added_entries(self.stats, clips) if self.stats is not None else None
+        if added is None:
+            self.stats = SpeakerStats.from_frames(np.asarray(store.contours), self._frame_codes, speakers.tolist())
+        else:
+            for entry in added:
+                self.stats.update(clips["speaker"].iat[entry], np.asarray(store.contour(entry)))
+        if added is None or len(added):
+            self.stats.clips = clips
+            try:
+                self.stats.save(stats_path)
+            except OSError:
+                pass  # Read-only data volume: keep the in-memory statistics
+        # Stats may list speakers in another order than codes when loaded from disk
+        self._frame_codes = np.array([self.stats.code_of[s] for s in speakers], dtype=np.int64)[self._frame_codes]
+
+    def normalized_column(self, mode: str = "semitone") -> np.ndarray:
+        """Normalized contours of all entries as one flat float32 column (computed once per mode)."""
+        if mode not in self._normalized:
+            codes = self._frame_codes
+            semitones = hz_to_semitones(np.asarray(self.store.contours))
+            self._normalized[mode] = _normalize(
+                semitones, self.stats.mean[codes], self.stats.std[codes], mode,
+            ).astype(np.float32)
+        return self._normalized[mode]
+
+    def contour(self, entry: int, mode: str = "semitone") -> np.ndarray:
+        """Normalized contour of store entry, aligned with store.contour_times(entry)."""
+        offsets = self.store.contour_offsets
+        return self.normalized_column(mode)[offsets[entry]:offsets[entry + 1]]
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.main_functions import get_speaker_normalizer, load_app_dataset
+
+    normalizer = get_speaker_normalizer(load_app_dataset())
+    if normalizer is None:
+        sys.exit("Build the contour store first: python -m utils.contour_store")
+    print(normalizer.stats.table().to_string(index=False))
@@ -0,0 +1,207 @@
+"""
+Speaking practice: incremental pitch features for learner audio and DTW scoring
+against the six reference speakers of a syllable.
+
+Learner audio is pushed as a stream of chunks. Frame energy and F0 are computed as
+soon as each frame is complete, so when the learner stops speaking only the last
+partial frame and the DTW remain. Reference contours come from the precomputed
+ContourStore and are prepared once per syllable, so scoring never decodes or
+analyses a reference clip.
+
+Try it offline by feeding a TrAT clip back in as the learner:
+    python -m utils.speaking --syllable ba2 --speaker FV1
+"""
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from utils.pitch import (analysis_sample_rate, frame_length, hop_length, f0_min, f0_max,
+                         frame_signal, resample, yin_frames)
+
+# Contours are resampled to this many points before DTW
+contour_points = 40
+# Distance (in semitones) at which the score drops to about 37
+score_scale = 2.0
+
+
+class StreamingPitchTracker:
+    def __init__(self, sample_rate: int = analysis_sample_rate):
+        """Incremental frame energy and F0 for audio arriving at sample_rate, in chunks."""
+        self.sample_rate = sample_rate
+        self._window = frame_length + int(analysis_sample_rate / f0_min) + 1
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._f0 = []
+        self._energy = []
+
+    def push(self, chunk: np.ndarray) -> int:
+        """Add a chunk of mono samples and analyse every frame it completes. Returns new frames."""
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if chunk.ndim > 1:
+            chunk = chunk.mean(axis=1)
+        chunk = resample(chunk, self.sample_rate, analysis_sample_rate)
+        self._buffer = np.concatenate((self._buffer, chunk))
+        frames = frame_signal(self._buffer, self._window, hop_length)
+        if len(frames) == 0:
+            return 0
+        self._f0.append(yin_frames(frames, analysis_sample_rate, frame_length, f0_min, f0_max))
+        head = frames[:, :frame_length]
+        self._energy.append(np.sqrt(np.mean(head * head, axis=1)).astype(np.float32))
+        # Keep only the samples the next frame still needs
+        self._buffer = self._buffer[len(frames) * hop_length:]
+        return len(frames)
+
+    @property
+    def f0(self) -> np.ndarray:
+        """F0 per frame so far (Hz, NaN where unvoiced)."""
+        return np.concatenate(self._f0) if self._f0 else np.empty(0, dtype=np.float32)
+
+    @property
+    def energy(self) -> np.ndarray:
+        """RMS energy per frame so far."""
+        return np.concatenate(self._energy) if self._energy else np.empty(0, dtype=np.float32)
+
+
+def normalized_contour(f0: np.ndarray, points: int = contour_points) -> np.ndarray:
+    """
+    Voiced part of an F0 contour in semitones relative to its own median,
+    resampled to a fixed number of points. Returns None if too little is voiced.
+    Using the median as reference removes the speaker's pitch range, so a learner
+    can be compared with any of the reference voices.
+    """
+    f0 = np.asarray(f0, dtype=np.float64)
+    voiced = np.flatnonzero(~np.isnan(f0))
+    if len(voiced) < 3:
+        return None
+    # Trim unvoiced edges, then interpolate over gaps inside the syllable
+    segment = f0[voiced[0]:voiced[-1] + 1]
+    inside = ~np.isnan(segment)
+    positions = np.arange(len(segment))
+    segment = np.interp(positions, positions[inside], segment[inside])
+    semitones = 12.0 * np.log2(segment / np.median(segment))
+    return np.interp(np.linspace(0, len(segment) - 1, points), positions, semitones)
+
+
+def dtw_distances(query: np.ndarray, references: np.ndarray) -> np.ndarray:
+    """
+    DTW distance from query (n,) to each row of references (r, m), computed for all
+    references at once along anti-diagonals. Distances are normalized by n + m.
+    """
+    n, m = len(query), references.shape[1]
+    cost = np.abs(query[None, :, None] - references[:, None, :])
+    acc = np.full((len(references), n + 1, m + 1), np.inf)
+    acc[:, 0, 0] = 0.0
+    for k in range(2, n + m + 1):
+        i = np.arange(max(1, k - m), min(n, k - 1) + 1)
+        j = k - i
+        best = np.minimum(np.minimum(acc[:, i - 1, j - 1], acc[:, i - 1, j]), acc[:, i, j - 1])
+        acc[:, i, j] = cost[:, i - 1, j - 1] + best
+    return acc[:, n, m] / (n + m)
+
+
+class ReferenceContours:
+    def __init__(self, dataset, store):
+        """Normalized reference contours per syllable, prepared on first use and then cached."""
+        self.dataset = dataset
+        self.store = store
+        self.for_syllable = lru_cache(maxsize=None)(self._for_syllable)
+
+    def _for_syllable(self, syllable: str):
+        """(speakers, contours) of the clips of syllable that have a usable stored contour."""
+        rows = self.dataset.index.rows(syllable=syllable)
+        speakers, contours = [], []
+        keys = self.dataset.keys[rows].tolist()
+        for key, speaker in zip(keys, self.dataset.index.values("speaker", rows).tolist()):
+            entry = self.store.row_of.get(key)
+            contour = normalized_contour(self.store.contour(entry)) if entry is not None else None
+            if contour is not None:
+                speakers.append(speaker)
+                contours.append(contour)
+        return speakers, np.array(contours).reshape(len(contours), contour_points)
+
+    def precompute(self, syllables=None) -> None:
+        """Prepare the references of syllables (all syllables by default) ahead of use."""
+        for syllable in (self.dataset.syllables() if syllables is None else syllables):
+            self.for_syllable(syllable)
+
+
+def score_attempt(f0: np.ndarray, syllable: str, references: ReferenceContours) -> dict:
+    """
+    Score a learner F0 contour against the reference speakers of syllable.
+    Returns the DTW distance to each speaker, the closest speaker, a 0-100 score,
+    and the tone whose references the attempt is closest to. Returns None if the
+    attempt is (almost) entirely unvoiced or the syllable has no references.
+    """
+    query = normalized_contour(f0)
+    speakers, contours = references.for_syllable(syllable)
+    if query is None or not speakers:
+        return None
+    distances = dtw_distances(query, contours)
+    best = int(np.argmin(distances))
+
+    # Compare with the references of the same syllable in every tone
+    base, tone = syllable[:-1], syllable[-1]
+    tone_distances = {}
+    for other in ["1", "2", "3", "4"]:
+        _, other_contours = references.for_syllable(base + other) if other != tone else (speakers, contours)
+        if len(other_contours):
+            tone_distances[other] = float(dtw_distances(query, other_contours).min())
+    return {
+        "syllable": syllable,
+        "distances": dict(zip(speakers, distances.round(3).tolist())),
+        "closest_speaker": speakers[best],
+        "score": round(100.0 * float(np.exp(-distances[best] / score_scale)), 1),
+        "heard_tone": min(tone_distances, key=tone_distances.get) if tone_distances else None,
+        "contour": query,
+        "reference_contour": contours[best],
+    }
+
+
+def score_recording(samples: np.ndarray, sample_rate: int, syllable: str,
+                    references: ReferenceContours, chunk_size: int = 2048) -> dict:
+    """Stream a recording through a StreamingPitchTracker in chunks, then score it."""
+    tracker = StreamingPitchTracker(sample_rate)
+    for start in range(0, len(samples), chunk_size):
+        tracker.push(samples[start:start + chunk_size])
+    return score_attempt(tracker.f0, syllable, references)
+
+
+if __name__ == "__main__":
+    import argparse
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.main_functions import load_dataset, clip_path, get_contour_store
+    from utils.pitch import decode_clip
+
+    parser = argparse.ArgumentParser(description="Score a TrAT clip as if a learner had recorded it.")
+    parser.add_argument("--syllable", default="ba2", help="syllable of the clip to feed in")
+    parser.add_argument("--speaker", default="FV1", help="speaker of the clip to feed in")
+    parser.add_argument("--target", default=None, help="syllable to score against (default: --syllable)")
+    parser.add_argument("--chunk-size", type=int, default=2048)
+    args = parser.parse_args()
+
+    dataset = load_dataset()
+    store = get_contour_store()
+    if store is None:
+        sys.exit("Build the contour store first: python -m utils.contour_store")
+    references = ReferenceContours(dataset, store)
+    references.precompute()
+
+    rows = dataset.index.rows(syllable=args.syllable, speaker=args.speaker)
+    if len(rows) == 0:
+        sys.exit(f"No clip for {args.syllable} by {args.speaker}")
+    samples = decode_clip(clip_path(dataset.df.iloc[rows[0]]))
+
+    start = time.perf_counter()
+    tracker = StreamingPitchTracker()
+    for offset in range(0, len(samples), args.chunk_size):
+        tracker.push(samples[offset:offset + args.chunk_size])
+    # Only scoring happens after the learner stops speaking
+    stopped = time.perf_counter()
+    result = score_attempt(tracker.f0, args.target or args.syllable, references)
+    done = time.perf_counter()
+    if result is None:
+        sys.exit("The clip is not voiced enough to score.")
+    print(f"score {result['score']} vs {result['syllable']}, closest speaker {result['closest_speaker']}, "
+          f"heard tone {result['heard_tone']}")
+    print("distances:", result["distances"])
+    print(f"streaming analysis {1000 * (stopped - start):.1f} ms, scoring after stop {1000 * (done - stopped):.1f} ms")
@@ -0,0 +1,155 @@
+"""
+Offline transcoding of the clips into trimmed, loudness-normalized, low-bitrate variants.
+
+Each variant is made by ffmpeg in a process pool:
+    - leading and trailing silence trimmed (silenceremove, run forwards and on the reversed clip)
+    - loudness normalized with loudnorm (EBU R128)
+    - encoded mono at the variant's codec and bitrate
+Files are written to <variants dir>/<variant>/<corpus>/<stem><ext>, following the clip
+key "<corpus>/<Name>", and the results are recorded in a CSV manifest next to the label
+file (TrATLabelFile_variants.csv: key, variant, path, bytes, source_mtime, source_size).
+Clips whose source is unchanged since the last run are not transcoded again.
+
+Transcode the app's dataset (configs.corpora, else the sample; needs ffmpeg with
+libopus on PATH) with:
+    python -m utils.transcode [--variants opus16,opus32] [--workers N]
+"""
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+import pandas as pd
+from utils.utils import atomic_write
+
+
+class AudioVariant(NamedTuple):
+    codec: str          # ffmpeg encoder
+    bitrate: str        # ffmpeg bitrate, e.g. "16k"
+    extension: str      # file extension of the output
+    mime: str           # MIME type passed to st.audio
+
+
+audio_variants = {
+    "opus16": AudioVariant("libopus", "16k", ".opus", "audio/ogg"),
+    "opus32": AudioVariant("libopus", "32k", ".opus", "audio/ogg"),
+}
+
+# Variant a session gets for each bandwidth setting; "original" serves the source clips
+bandwidth_variants = {
+    "Original quality": "original",
+    "Standard (32 kbps)": "opus32",
+    "Data saver (16 kbps)": "opus16",
+}
+
+# Trim below -45 dBFS at both ends, then normalize loudness
+trim_and_normalize = (
+    "silenceremove=start_periods=1:start_threshold=-45dB:start_silence=0.05,"
+    "areverse,"
+    "silenceremove=start_periods=1:start_threshold=-45dB:start_silence=0.05,"
+    "areverse,"
+    "loudnorm=I=-18:TP=-1.5:LRA=11"
+)
+
+manifest_columns = ["key", "variant", "path", "bytes", "source_mtime", "source_size"]
+
+
+def ffmpeg_command(source, target, variant: AudioVariant) -> list:
+    """The ffmpeg command line that makes one variant of one clip."""
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(source),
+        "-af", trim_and_normalize, "-ac", "1",
+        "-c:a", variant.codec, "-b:a", variant.bitrate, "-application", "voip",
+        str(target),
+    ]
+
+
+def _transcode_clip(job):
+    """Worker: transcode one clip to a temporary name and move it into place. Returns its size."""
+    source, target, variant = job
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(target, lambda f: subprocess.run(ffmpeg_command(source, f.name, variant),
+                                                  check=True, capture_output=True))
+    return target.stat().st_size
+
+
+def variants_manifest_path(label_file) -> Path:
+    """Manifest of the variants of a label file's clips, e.g. TrATLabelFile_variants.csv."""
+    label_file = Path(label_file)
+    return label_file.with_name(f"{label_file.stem}_variants.csv")
+
+
+def load_variants_manifest(path) -> pd.DataFrame:
+    """The manifest at path, or an empty one if it does not exist or has other columns."""
+    if Path(path).exists():
+        manifest = pd.read_csv(path, dtype={"key": str, "variant": str, "path": str})
+        if list(manifest.columns) == manifest_columns:
+            return manifest
+    return pd.DataFrame(columns=manifest_columns)
+
+
+def transcode_clips(keys, paths, variants_dir, manifest_path, variants=None, max_workers: int = None) -> int:
+    """
+    Make the variants (all audio_variants by default) of the clips (keys[i], paths[i]).
+    Clips whose manifest entry matches the source mtime and size are skipped.
+    Returns the number of files transcoded.
+    """
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("Transcoding needs ffmpeg on PATH.")
+    variants_dir = Path(variants_dir)
+    variants = list(audio_variants) if variants is None else list(variants)
+    previous = load_variants_manifest(manifest_path)
+    previous = {(r.key, r.variant): r for r in previous.itertuples(index=False)}
+
+    records, jobs = [], []
+    for key, path in zip(keys, paths):
+        stat = os.stat(path)
+        for variant in variants:
+            spec = audio_variants[variant]
+            relative = Path(variant) / Path(key).with_suffix(spec.extension)
+            record = {"key": key, "variant": variant, "path": relative.as_posix(), "bytes": 0,
+                      "source_mtime": stat.st_mtime_ns, "source_size": stat.st_size}
+            old = previous.get((key, variant))
+            if (old is not None and old.source_mtime == stat.st_mtime_ns and old.source_size == stat.st_size
+                    and (variants_dir / old.path).exists()):
+                record["bytes"] = old.bytes
+            else:
+                jobs.append((len(records), (str(path), str(variants_dir / relative), spec)))
+            records.append(record)
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            sizes = pool.map(_transcode_clip, [job for _, job in jobs], chunksize=8)
+            for (i, _), size in zip(jobs, sizes):
+                records[i]["bytes"] = size
+
+    # Keep the entries of variants not rebuilt in this run
+    kept = [r._asdict() for key, r in previous.items() if key[1] not in variants]
+    manifest = pd.DataFrame(kept + records, columns=manifest_columns)
+    atomic_write(manifest_path, lambda f: manifest.to_csv(f, index=False), mode="w")
+    return len(jobs)
+
+
+if __name__ == "__main__":
+    import argparse
+    sys.path.append(str(Path(__file__).parent.parent))
+    from utils.configs import dataset_filename, audio_variants_dir
+    from utils.main_functions import load_app_dataset, clip_path
+
+    parser = argparse.ArgumentParser(description="Transcode the clips into low-bitrate variants.")
+    parser.add_argument("--variants", default=",".join(audio_variants))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        sys.exit("Transcoding needs ffmpeg (with libopus) on PATH.")
+    dataset = load_app_dataset()
+    records = dataset.df.to_dict("records")
+    transcoded = transcode_clips(
+        dataset.keys, [clip_path(r) for r in records],
+        audio_variants_dir, variants_manifest_path(dataset_filename), variants=args.variants.split(","), max_workers=args.workers,
+    )
+    print(f"Transcoded {transcoded} files into {audio_variants_dir}")
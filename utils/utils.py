@@ -0,0 +1,27 @@
+"""General-purpose helpers shared by the utils modules."""
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write(path, writer, mode: str = "wb") -> None:
+    """
+    Write a file atomically: writer(f) fills a temporary file next to path, which is
+    flushed to disk, made world-readable and moved over path. On any error the
+    temporary file is removed and path is left untouched, so concurrent readers never
+    see a partially written file. The temporary name keeps path's suffix (tools such
+    as ffmpeg pick the format from it; they can write to f.name).
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=path.suffix)
+    os.close(fd)
+    try:
+        with open(tmp, mode) as f:
+            writer(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,131 @@
+"""
+Nearest-neighbour search over unit-length float32 vectors (see utils.embeddings).
+
+    - BruteForceIndex: one matrix product against every vector; exact
+    - IVFIndex: k-means partitions the vectors into lists and a query only scans
+      the n_probe lists with the closest centroids; approximate, for large corpora
+
+Both return (rows, scores) arrays of shape (n_queries, k), best match first, where
+score is the dot product (cosine similarity for unit vectors). When fewer than k rows
+are left after exclusions, the remaining entries are row -1 with score -inf.
+"""
+import numpy as np
+
+# Corpora up to this size are searched exactly
+exact_search_max = 50_000
+
+
+def _top_k(scores: np.ndarray, k: int):
+    """
+    Column positions and values of the k largest scores in each row, in descending order.
+    Entries scoring -inf (excluded) come back as position -1.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), dtype=np.int64), np.empty((len(scores), 0), dtype=np.float32)
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(k), scores.shape)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+    return np.where(np.isneginf(top_scores), -1, top), top_scores
+
+
+def _as_queries(queries) -> np.ndarray:
+    """Queries as a (n, d) float32 array."""
+    return np.atleast_2d(np.asarray(queries, dtype=np.float32))
+
+
+def _exclude(scores: np.ndarray, rows: np.ndarray, exclude) -> None:
+    """Set the score of excluded rows to -inf; exclude is one collection of rows per query."""
+    if exclude is None:
+        return
+    for q, excluded in enumerate(exclude):
+        if len(excluded):
+            scores[q, np.isin(rows if rows.ndim == 1 else rows[q], excluded)] = -np.inf
+
+
+class BruteForceIndex:
+    def __init__(self, vectors: np.ndarray):
+        """Exact index over the rows of vectors."""
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search(self, queries, k: int = 10, exclude=None):
+        """The k rows most similar to each query; exclude gives rows to skip per query."""
+        queries = _as_queries(queries)
+        scores = queries @ self.vectors.T
+        _exclude(scores, np.arange(len(self.vectors)), exclude)
+        return _top_k(scores, k)
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids (unit length), shape (n_clusters, d)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # Reseed empty clusters with random vectors
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = sums / np.where(empty[:, None], 1.0, norms)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    def __init__(self, vectors: np.ndarray, n_lists: int = None, n_probe: int = 8,
+                 n_iter: int = 10, train_size: int = 50_000, seed: int = 0):
+        """
+        Inverted-file index over the rows of vectors. Centroids are trained on at most
+        train_size vectors; the vectors are then stored grouped by list, contiguously,
+        with CSR-style offsets, so scanning a list is a slice.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        self.n_lists = n_lists or max(1, min(n, int(4 * np.sqrt(n))))
+        self.n_probe = n_probe
+        rng = np.random.default_rng(seed)
+        train = vectors[rng.choice(n, min(n, train_size), replace=False)]
+        self.centroids = kmeans(train, self.n_lists, n_iter, seed)
+
+        labels = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 65536):
+            labels[start:start + 65536] = np.argmax(vectors[start:start + 65536] @ self.centroids.T, axis=1)
+        order = np.argsort(labels, kind="stable")
+        self.rows = order
+        self.vectors = vectors[order]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=self.n_lists))))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def search(self, queries, k: int = 10, exclude=None, n_probe: int = None):
+        """The (approximately) k rows most similar to each query; exclude gives rows to skip per query."""
+        queries = _as_queries(queries)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = _top_k(queries @ self.centroids.T, n_probe)[0]
+        result_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        result_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for q, lists in enumerate(probes):
+            positions = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            scores = (self.vectors[positions] @ queries[q])[None, :]
+            rows = self.rows[positions]
+            _exclude(scores, rows, None if exclude is None else [exclude[q]])
+            top, top_scores = _top_k(scores, k)
+            result_rows[q, :top.shape[1]] = np.where(top[0] >= 0, rows[top[0]], -1)
+            result_scores[q, :top.shape[1]] = top_scores[0]
+        return result_rows, result_scores
+
+
+def build_vector_index(vectors: np.ndarray, **ivf_options):
+    """Exact index for small corpora, IVFIndex above exact_search_max vectors."""
+    if len(vectors) <= exact_search_max:
+        return BruteForceIndex(vectors)
+    return IVFIndex(vectors, **ivf_options)